@@ -1,12 +1,56 @@
 # fetch_real_data.py
 import yfinance as yf
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+from ohlcv_store import get_store
 
-def fetch_stock_data(ticker: str, period: str = '6mo', interval: str = '1d') -> pd.DataFrame:
+def _clean(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Standardizes a raw yfinance frame to lowercase OHLCV columns.
+    """
+    if isinstance(data.columns, pd.MultiIndex):
+        # Newer yfinance versions return (field, ticker) columns even for one ticker
+        data = data.droplevel(-1, axis=1)
+
+    data = data.rename(columns={
+        "Open": "open",
+        "High": "high",
+        "Low": "low",
+        "Close": "close",
+        "Volume": "volume"
+    })
+
+    data.index = pd.to_datetime(data.index)
+    return data[['open', 'high', 'low', 'close', 'volume']].dropna()
+
+
+def yfinance_provider(ticker: str, start, end, interval: str = '1d') -> pd.DataFrame:
+    """
+    Downloads bars for [start, end) from yfinance.
+    """
+    data = yf.download(
+        ticker,
+        start=start,
+        end=end,
+        interval=interval,
+        progress=False
+    )
+    if data is None or data.empty:
+        return pd.DataFrame()
+    return _clean(data)
+
+
+def fetch_stock_data(ticker: str, period: str = '6mo', interval: str = '1d',
+                     use_cache: bool = True) -> pd.DataFrame:
     """
     Fetches historical stock data for a given ticker using yfinance.
     Cleans and standardizes the data for ML model usage.
+    With use_cache, bars are served from the local OHLCV store and only the
+    missing range is downloaded.
     """
     try:
         print(f"📈 Fetching real data for {ticker} ...")
@@ -14,30 +58,15 @@ def fetch_stock_data(ticker: str, period: str = '6mo', interval: str = '1d') ->
         start = end - timedelta(days=180)  # ✅ numeric days (not string)
 
         # Fetch data
-        data = yf.download(
-            ticker,
-            start=start,
-            end=end,
-            interval=interval,
-            progress=False
-        )
+        if use_cache:
+            data = get_store().read(ticker, start, end, yfinance_provider, interval=interval)
+        else:
+            data = yfinance_provider(ticker, start, end, interval)
 
         if data is None or data.empty:
             print(f"⚠️ No data returned for {ticker}")
             return pd.DataFrame()
 
-        # Clean up and rename columns
-        data = data.rename(columns={
-            "Open": "open",
-            "High": "high",
-            "Low": "low",
-            "Close": "close",
-            "Volume": "volume"
-        })
-
-        data.index = pd.to_datetime(data.index)
-        data = data[['open', 'high', 'low', 'close', 'volume']].dropna()
-
         print(f"✅ {ticker} data fetched: {len(data)} records")
         return data
 
@@ -46,18 +75,92 @@ def fetch_stock_data(ticker: str, period: str = '6mo', interval: str = '1d') ->
         return pd.DataFrame()
 
 
+@dataclass
+class Panel:
+    """
+    OHLCV bars for several tickers aligned on one shared date index.
+    `frame` has (ticker, field) MultiIndex columns; tickers that could not
+    be fetched are listed in `errors` with the reason.
+    """
+    frame: pd.DataFrame
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def tickers(self) -> List[str]:
+        return list(self.frame.columns.get_level_values(0).unique())
+
+    def field_frame(self, name: str = 'close') -> pd.DataFrame:
+        """
+        One field for every ticker (tickers as columns), e.g. the price
+        frame expected by simple_stress_test.
+        """
+        return self.frame.xs(name, axis=1, level=1)
+
+    def ticker(self, ticker: str) -> pd.DataFrame:
+        """
+        The OHLCV frame of one ticker, as returned by fetch_stock_data.
+        """
+        return self.frame[ticker].dropna()
+
+
+def fetch_many(tickers: List[str], period: str = '6mo', interval: str = '1d',
+               provider: Callable = yfinance_provider, max_concurrency: int = 8,
+               retries: int = 3, backoff: float = 0.5, use_cache: bool = True) -> Panel:
+    """
+    Fetches several tickers concurrently (at most `max_concurrency` requests
+    in flight), retrying failed downloads with exponential backoff.
+    `provider(ticker, start, end, interval)` can be replaced by a local stub.
+    """
+    end = datetime.now()
+    start = end - timedelta(days=180)
+    tickers = list(dict.fromkeys(tickers))
+
+    def fetch_one(ticker):
+        last_error = None
+        for attempt in range(retries):
+            try:
+                if use_cache:
+                    data = get_store().read(ticker, start, end, provider, interval=interval)
+                else:
+                    data = provider(ticker, start, end, interval)
+                if data is None or data.empty:
+                    return None, "No data returned"
+                return data, None
+            except Exception as e:
+                last_error = e
+                if attempt < retries - 1:
+                    time.sleep(backoff * 2 ** attempt)
+        return None, str(last_error)
+
+    frames, errors = {}, {}
+    if tickers:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(tickers)))) as pool:
+            for ticker, (data, error) in zip(tickers, pool.map(fetch_one, tickers)):
+                if error is None:
+                    frames[ticker] = data
+                else:
+                    print(f"❌ Error fetching data for {ticker}: {error}")
+                    errors[ticker] = error
+
+    if frames:
+        panel = pd.concat(frames, axis=1).sort_index()
+    else:
+        panel = pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=[None, None]))
+    print(f"✅ Fetched {len(frames)}/{len(tickers)} tickers")
+    return Panel(frame=panel, errors=errors)
+
+
 if __name__ == "__main__":
     # Test the function directly
     tickers = ["AAPL", "GOOGL"]
-    all_data = {}
+    panel = fetch_many(tickers)
 
-    for ticker in tickers:
-        df = fetch_stock_data(ticker)
-        if not df.empty:
-            all_data[ticker] = df
-            print(f"{ticker}: {len(df)} rows")
+    for ticker in panel.tickers:
+        print(f"{ticker}: {len(panel.ticker(ticker))} rows")
 
-    if not all_data:
+    if not panel.tickers:
         print("⚠️ No valid data fetched for any ticker.")
+    elif panel.errors:
+        print(f"⚠️ Failed tickers: {panel.errors}")
     else:
-        print("✅ All tickers processed successfully.")
\ No newline at end of file
+        print("✅ All tickers processed successfully.")
@@ -0,0 +1,337 @@
+# jobs.py
+
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+DEFAULT_JOB_DIR = os.environ.get(
+    "VANTAGE_JOB_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_store")
+)
+
+ACTIVE_STATES = ("queued", "running")
+FINAL_STATES = ("succeeded", "failed", "cancelled")
+
+# A job function takes (params, progress) and returns a JSON-serializable result
+JobFn = Callable[[dict, Callable[[float, str], None]], dict]
+
+
+class JobCancelled(Exception):
+    """Raised from a progress callback once cancellation was requested."""
+
+
+def _write_json(path: str, payload: dict):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def scaled(progress: Callable[[float, str], None], start: float, end: float):
+    """
+    Progress callback mapping a sub-task's [0, 1] onto [start, end] of the job.
+    """
+    return lambda fraction, message="": progress(start + (end - start) * fraction, message)
+
+
+class _JobContext:
+    """
+    Job-side view of a job directory: status updates, progress and
+    cancellation checks. Runs inside the pool's worker process.
+    """
+
+    def __init__(self, job_dir: str, min_interval: float = 0.2):
+        self.job_dir = job_dir
+        self.min_interval = min_interval
+        self._last_write = 0.0
+
+    def cancel_requested(self) -> bool:
+        return os.path.exists(os.path.join(self.job_dir, "cancel"))
+
+    def update(self, **fields):
+        path = os.path.join(self.job_dir, "status.json")
+        status = _read_json(path) or {}
+        status.update(fields, updated_at=time.time())
+        _write_json(path, status)
+
+    def progress(self, fraction: float, message: str = ""):
+        if self.cancel_requested():
+            raise JobCancelled()
+        now = time.monotonic()
+        # Chunked loops can report thousands of times; throttle the writes
+        if fraction >= 1.0 or now - self._last_write >= self.min_interval:
+            self._last_write = now
+            self.update(progress=round(min(max(fraction, 0.0), 1.0), 4), message=message)
+
+
+def _run_job(job_dir: str, fn: JobFn, params: dict):
+    job = _JobContext(job_dir)
+    if job.cancel_requested():
+        job.update(state="cancelled", finished_at=time.time())
+        return
+    job.update(state="running", started_at=time.time(), worker_pid=os.getpid())
+    try:
+        result = fn(params, job.progress)
+    except JobCancelled:
+        job.update(state="cancelled", finished_at=time.time())
+    except Exception as e:
+        job.update(state="failed", error=str(e), finished_at=time.time())
+    else:
+        _write_json(os.path.join(job_dir, "result.json"), result)
+        job.update(state="succeeded", progress=1.0, finished_at=time.time())
+
+
+class JobManager:
+    """
+    Long-running work (training, large stress tests) run on a local process
+    pool and tracked by job id.
+
+    Job state lives on disk under `root`, one directory per job, so any
+    server worker process can answer status, result and cancel requests for
+    a job another worker started. Submitting the same kind and parameters
+    while an identical job is queued or running returns that job's id
+    instead of starting a second computation. Cancellation is cooperative:
+    queued jobs never start, running jobs stop at their next progress call.
+    """
+
+    def __init__(self, root: str = DEFAULT_JOB_DIR, max_workers: int = 2,
+                 keep_for: float = 24 * 3600):
+        self.root = root
+        self.max_workers = max_workers
+        self.keep_for = keep_for
+        self.kinds: Dict[str, JobFn] = {}
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "inflight"), exist_ok=True)
+
+    def register(self, kind: str, fn: JobFn):
+        """`fn` must be a module-level function so it can be pickled to the pool."""
+        self.kinds[kind] = fn
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # One pool per server process, created after any pre-fork
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    @staticmethod
+    def dedup_key(kind: str, params: dict) -> str:
+        canonical = json.dumps({"kind": kind, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+    def submit(self, kind: str, params: dict) -> Tuple[str, bool]:
+        """
+        Queue a job. Returns (job_id, deduplicated), where `deduplicated`
+        is True if an identical in-flight job was reused.
+        """
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown job kind '{kind}'. Choose one of {sorted(self.kinds)}.")
+        self._prune()
+        key = self.dedup_key(kind, params)
+        marker = os.path.join(self.root, "inflight", key)
+
+        job_id = uuid.uuid4().hex[:16]
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+        _write_json(os.path.join(job_dir, "status.json"), {
+            "id": job_id, "kind": kind, "params": params, "state": "queued",
+            "progress": 0.0, "message": "", "owner_pid": os.getpid(),
+            "submitted_at": time.time(), "updated_at": time.time()
+        })
+
+        # The marker is claimed with link(), which fails atomically if another
+        # process already holds it; the status file exists before the claim
+        tmp = f"{marker}.{job_id}"
+        with open(tmp, "w") as f:
+            f.write(job_id)
+        try:
+            while True:
+                try:
+                    os.link(tmp, marker)
+                    break
+                except FileExistsError:
+                    existing = self._read_marker(marker)
+                    status = self.status(existing) if existing else None
+                    if status is not None and status["state"] in ACTIVE_STATES \
+                            and not self._cancel_requested(existing):
+                        shutil.rmtree(job_dir, ignore_errors=True)
+                        return existing, True
+                    self._release_marker(marker, existing)
+        finally:
+            os.remove(tmp)
+
+        try:
+            future = self._executor().submit(_run_job, job_dir, self.kinds[kind], params)
+        except Exception as e:
+            self._finish(job_id, marker, "failed", f"Could not start job: {e}")
+            raise
+        future.add_done_callback(lambda f: self._on_done(f, job_id, marker))
+        return job_id, False
+
+    @staticmethod
+    def _read_marker(marker: str) -> Optional[str]:
+        try:
+            with open(marker) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _release_marker(self, marker: str, job_id: Optional[str]):
+        # Only remove the marker if it still points at this job
+        if self._read_marker(marker) == job_id:
+            try:
+                os.remove(marker)
+            except FileNotFoundError:
+                pass
+
+    def _finish(self, job_id: str, marker: str, state: str, error: Optional[str] = None):
+        status = self.status(job_id)
+        if status is not None and status["state"] in ACTIVE_STATES:
+            job = _JobContext(self._job_dir(job_id))
+            job.update(state=state, error=error, finished_at=time.time())
+        self._release_marker(marker, job_id)
+
+    def _on_done(self, future, job_id: str, marker: str):
+        if future.cancelled():
+            self._finish(job_id, marker, "cancelled")
+        elif future.exception() is not None:
+            # The worker process died (e.g. killed for memory)
+            self._finish(job_id, marker, "failed", str(future.exception()) or "Worker process exited")
+        else:
+            self._finish(job_id, marker, "failed", "Job exited without a result")
+
+    def status(self, job_id: str) -> Optional[dict]:
+        if not job_id or os.sep in job_id or job_id.startswith("."):
+            return None
+        status = _read_json(os.path.join(self._job_dir(job_id), "status.json"))
+        if status is not None and status["state"] in ACTIVE_STATES \
+                and not _pid_alive(status["owner_pid"]):
+            # The server process that owned the pool is gone, so is the job
+            status.update(state="failed", error="Server worker exited")
+        return status
+
+    def result(self, job_id: str) -> Optional[dict]:
+        status = self.status(job_id)
+        if status is None or status["state"] != "succeeded":
+            return None
+        return _read_json(os.path.join(self._job_dir(job_id), "result.json"))
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        return os.path.exists(os.path.join(self._job_dir(job_id), "cancel"))
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Request cancellation. Returns the job's status, or None if unknown.
+        A queued job is marked cancelled at once; a running one stops at its
+        next progress call. Either way it is no longer reused by submit().
+        """
+        status = self.status(job_id)
+        if status is None or status["state"] in FINAL_STATES:
+            return status
+        open(os.path.join(self._job_dir(job_id), "cancel"), "w").close()
+        marker = os.path.join(self.root, "inflight", self.dedup_key(status["kind"], status["params"]))
+        if status["state"] == "queued":
+            # _run_job checks the cancel file before it starts, so the job
+            # never runs; the pool's done callback leaves this state alone
+            self._finish(job_id, marker, "cancelled")
+            return self.status(job_id)
+        self._release_marker(marker, job_id)
+        return dict(status, cancel_requested=True)
+
+    def events(self, job_id: str, poll: float = 0.25, timeout: Optional[float] = None
+               ) -> Iterator[dict]:
+        """
+        Yield the job's status every time it changes, ending with its final
+        state (or when `timeout` seconds pass).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        last = None
+        while True:
+            status = self.status(job_id)
+            if status is None:
+                return
+            if status != last:
+                last = status
+                yield status
+            if status["state"] in FINAL_STATES:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            time.sleep(poll)
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_for
+        for name in os.listdir(self.root):
+            if name == "inflight":
+                continue
+            status = _read_json(os.path.join(self.root, name, "status.json"))
+            if status is not None and status["state"] in FINAL_STATES \
+                    and status.get("finished_at", status["updated_at"]) < cutoff:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+
+# Example with a toy job kind
+def _count_job(params, progress):
+    for i in range(params["steps"]):
+        time.sleep(params.get("delay", 0.1))
+        progress((i + 1) / params["steps"], f"step {i + 1}")
+    return {"counted": params["steps"]}
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    manager = JobManager(root=tempfile.mkdtemp(), max_workers=2)
+    manager.register("count", _count_job)
+
+    first, _ = manager.submit("count", {"steps": 10})
+    second, deduplicated = manager.submit("count", {"steps": 10})
+    print(f"Identical submission reused job {first}: {deduplicated and first == second}")
+
+    doomed, _ = manager.submit("count", {"steps": 50})
+    time.sleep(0.5)
+    manager.cancel(doomed)
+
+    for status in manager.events(first):
+        print(f"{status['state']:>9} {status['progress']:.0%} {status['message']}")
+    print("Result:", manager.result(first))
+    time.sleep(1)
+    print("Cancelled job:", manager.status(doomed)["state"])
+
+    # Occupy both pool workers so the next job stays queued
+    for i in range(2):
+        manager.submit("count", {"steps": 20, "delay": 0.05 * (i + 1)})
+    queued, _ = manager.submit("count", {"steps": 30})
+    print("Queued job cancelled at once:", manager.cancel(queued)["state"])
+    resubmitted, deduplicated = manager.submit("count", {"steps": 30})
+    print(f"Resubmission after cancel starts a new job: {resubmitted != queued and not deduplicated}")
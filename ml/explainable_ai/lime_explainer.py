@@ -1,9 +1,63 @@
 # lime_explainer.py
 
+import hashlib
+import multiprocessing
+import os
 import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from lime.lime_tabular import LimeTabularExplainer
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+# Set in each pool worker so the fitted explainer is inherited, not re-fit
+_worker_explainer = None
+
+
+def _as_dict(exp) -> Dict[str, Any]:
+    # predicted_value is the model output on LIME's first perturbed row,
+    # which is the sample itself, so no extra predict call is needed
+    return {
+        "predicted_value": float(exp.predicted_value),
+        "explanation": exp.as_list(),
+        "weights": exp.local_exp[1] if 1 in exp.local_exp else exp.local_exp[0]
+    }
+
+
+def _digest(rows: np.ndarray) -> str:
+    return hashlib.sha1(np.ascontiguousarray(rows).tobytes()).hexdigest()
+
+
+def _perturb(explainer, sample, seed, num_samples):
+    # The neighbourhood explain_instance draws first for this seed, from
+    # LIME's own sampler (private, but there is no public hook for it)
+    explainer.random_state.seed(seed)
+    _, rows = explainer._LimeTabularExplainer__data_inverse(sample, num_samples)
+    return rows
+
+
+def _fit_local(explainer, sample, seed, predictions, digest, num_features, num_samples):
+    # Same seed, so LIME regenerates exactly the rows that were predicted
+    def replay(rows):
+        if _digest(rows) != digest:
+            raise RuntimeError("Perturbations changed between passes")
+        return predictions
+    explainer.random_state.seed(seed)
+    exp = explainer.explain_instance(sample, replay, num_features=num_features,
+                                     num_samples=num_samples)
+    return _as_dict(exp)
+
+
+def _init_worker(explainer):
+    global _worker_explainer
+    _worker_explainer = explainer
+
+
+def _perturb_task(args):
+    return _perturb(_worker_explainer, *args)
+
+
+def _fit_task(args):
+    return _fit_local(_worker_explainer, *args)
 
 class LimeExplainer:
     """
@@ -17,7 +71,7 @@ class LimeExplainer:
         self.class_names = class_names
         self.explainer = None
 
-    def fit(self, X_train: np.ndarray):
+    def fit(self, X_train: np.ndarray, random_state: Optional[int] = None):
         """
         Fit the LimeTabularExplainer on training data distribution.
         """
@@ -25,7 +79,8 @@ class LimeExplainer:
             X_train,
             feature_names=self.feature_names,
             mode="regression",
-            discretize_continuous=True
+            discretize_continuous=True,
+            random_state=random_state
         )
 
     def explain(self, model_predict_fn, sample: np.ndarray, num_features: int = 5) -> Dict[str, Any]:
@@ -46,27 +101,77 @@ class LimeExplainer:
             num_features=num_features
         )
 
-        return {
-            "predicted_value": float(model_predict_fn(sample.reshape(1, -1))[0]),
-            "explanation": exp.as_list(),
-            "weights": exp.local_exp[1] if 1 in exp.local_exp else exp.local_exp[0]
-        }
+        return _as_dict(exp)
+
+    def explain_many(self, model_predict_fn, samples: np.ndarray, num_features: int = 5,
+                     num_samples: int = 5000, seed: Optional[int] = None,
+                     workers: Optional[int] = None,
+                     max_rows_per_call: int = 500_000) -> List[Dict[str, Any]]:
+        """
+        Explain many rows at once, in input order.
+
+        Perturbations for all samples are generated first and scored with
+        as few `model_predict_fn` calls as possible (up to
+        `max_rows_per_call` rows each). The local models are then fit across
+        a process pool that inherits the already fitted explainer. Sample i
+        is explained with its own seed derived from `seed`, so a fixed seed
+        reproduces the same explanations for any `workers`.
+        """
+        if self.explainer is None:
+            raise ValueError("Call fit() with training data before explain_many()")
+        samples = np.atleast_2d(np.asarray(samples))
+        seeds = np.random.SeedSequence(seed).generate_state(len(samples)).tolist()
+
+        # Workers inherit the explainer (its kernel is a closure and cannot
+        # be pickled), so the pool needs fork
+        workers = workers or min(len(samples), os.cpu_count() or 1)
+        pool = None
+        if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+            pool = ProcessPoolExecutor(max_workers=workers,
+                                       mp_context=multiprocessing.get_context("fork"),
+                                       initializer=_init_worker, initargs=(self.explainer,))
+        else:
+            _init_worker(self.explainer)
+
+        def run(task, jobs):
+            if pool is None:
+                return [task(job) for job in jobs]
+            return list(pool.map(task, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+        try:
+            perturbed = run(_perturb_task, [(sample, s, num_samples) for sample, s in zip(samples, seeds)])
+
+            # One large predict call per chunk of rows instead of one per sample
+            rows = np.concatenate(perturbed)
+            predictions = np.concatenate([
+                np.asarray(model_predict_fn(rows[start:start + max_rows_per_call])).reshape(-1)
+                for start in range(0, len(rows), max_rows_per_call)
+            ])
+            bounds = np.cumsum([0] + [len(p) for p in perturbed])
+
+            return run(_fit_task, [(sample, s, predictions[bounds[i]:bounds[i + 1]],
+                                    _digest(perturbed[i]), num_features, num_samples)
+                                   for i, (sample, s) in enumerate(zip(samples, seeds))])
+        finally:
+            if pool is not None:
+                pool.shutdown()
 
 
 if __name__ == "__main__":
-    from sklearn.datasets import load_boston
+    import time
+    from sklearn.datasets import make_regression
     from sklearn.ensemble import RandomForestRegressor
     from sklearn.model_selection import train_test_split
 
-    X, y = load_boston(return_X_y=True)
+    X, y = make_regression(n_samples=2000, n_features=10, noise=0.1, random_state=0)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
 
-    model = RandomForestRegressor().fit(X_train, y_train)
+    model = RandomForestRegressor(n_estimators=50, random_state=0).fit(X_train, y_train)
 
 
     explainer = LimeExplainer(feature_names=[f"f{i}" for i in range(X.shape[1])])
-    explainer.fit(X_train)
+    explainer.fit(X_train, random_state=0)
 
     sample = X_test[0]
     explanation = explainer.explain(model.predict, sample)
@@ -74,4 +179,26 @@ if __name__ == "__main__":
     print("Predicted value:", explanation["predicted_value"])
     print("Top contributing features:")
     for feat, val in explanation["explanation"]:
-        print(f"  {feat}: {val:+.4f}")
\ No newline at end of file
+        print(f"  {feat}: {val:+.4f}")
+
+    # Portfolio-sized run: serial explain() vs explain_many()
+    calls = []
+    def counted_predict(rows):
+        calls.append(len(rows))
+        return model.predict(rows)
+
+    samples = X_test[:40]
+    start = time.perf_counter()
+    for row in samples:
+        explainer.explain(counted_predict, row)
+    serial, serial_calls = time.perf_counter() - start, len(calls)
+
+    for workers in sorted({1, os.cpu_count() or 1}):
+        calls.clear()
+        start = time.perf_counter()
+        first = explainer.explain_many(counted_predict, samples, seed=7, workers=workers)
+        print(f"{len(samples)} samples | explain() loop {serial:.2f}s ({serial_calls} predict calls)"
+              f" | explain_many, {workers} worker(s) {time.perf_counter() - start:.2f}s"
+              f" ({len(calls)} predict calls)")
+    again = explainer.explain_many(model.predict, samples, seed=7, workers=1)
+    print(f"Same seed reproduces the explanations: {first == again}")
@@ -1,11 +1,14 @@
 # shap_explainer.py
 
-import shap
 import numpy as np
 import pandas as pd
 import torch
-from ensemble_model import SimpleEnsemble
-from typing import List, Union
+import xgboost as xgb
+from ml.prediction.ensemble_model import SimpleEnsemble
+from ml.prediction.series_frame import column_block
+from typing import List, Optional, Sequence
+
+XGB_FEATURES = ['close_mean', 'volume_mean']
 
 class SHAPExplainer:
     """
@@ -16,29 +19,64 @@ class SHAPExplainer:
     def __init__(self, model: SimpleEnsemble, feature_columns: List[str]):
         self.model = model
         self.feature_columns = feature_columns
+        self.booster = model.xgb.get_booster()
 
-    def explain_xgb(self, df: pd.DataFrame, max_display: int = 10):
+    def xgb_rows(self, df: pd.DataFrame, rows: Optional[Sequence[int]] = None):
         """
-        Explain XGBoost predictions using TreeExplainer.
+        XGBoost features for the requested windows only, in the rows of
+        prepare_xgb(df): row k averages df.iloc[k:k + seq_len], and row -1
+        is the window predict() uses. Returns (features, window end dates).
         """
-        xgb_features = self.model.prepare_xgb(df)
-        explainer = shap.TreeExplainer(self.model.xgb)
-        shap_values = explainer.shap_values(xgb_features)
-        
-        # Create a DataFrame for visualization
-        shap_df = pd.DataFrame(shap_values, columns=['close_mean', 'volume_mean'])
-        print("\nSHAP values for XGBoost (first row):")
-        print(shap_df.head(1))
-        
-        # Optional: visualize
-        shap.summary_plot(shap_values, xgb_features, feature_names=['close_mean', 'volume_mean'], max_display=max_display)
+        seq_len = self.model.seq_len
+        num_rows = len(df) - seq_len
+        if num_rows <= 0:
+            return np.empty((0, len(XGB_FEATURES))), df.index[:0]
+        rows = range(num_rows) if rows is None else rows
+        positions = np.array([r + num_rows if r < 0 else r for r in rows], dtype=int)
+        if ((positions < 0) | (positions >= num_rows)).any():
+            raise IndexError(f"rows must be in [-{num_rows}, {num_rows})")
+
+        # float64 like window_means, so features match prepare_xgb exactly
+        values = np.asarray(column_block(df, ['close', 'volume']), dtype=np.float64)
+        features = np.stack([values[k:k + seq_len].mean(axis=0) for k in positions])
+        return features, df.index[positions + seq_len - 1]
+
+    def explain_xgb(self, df: pd.DataFrame, max_display: int = 10,
+                    rows: Optional[Sequence[int]] = None, plot: bool = False,
+                    show: bool = True):
+        """
+        Exact TreeSHAP values for XGBoost predictions from the booster's
+        native pred_contribs, for `rows` only (default: every window).
+        The 'bias' column is the expected model output; each row's values
+        sum to its prediction. Plots only when `plot` is set.
+        """
+        xgb_features, dates = self.xgb_rows(df, rows)
+        contribs = self.booster.predict(xgb.DMatrix(xgb_features), pred_contribs=True)
+        shap_df = pd.DataFrame(contribs, columns=XGB_FEATURES + ['bias'], index=dates)
+
+        if plot:
+            import shap
+            shap.summary_plot(contribs[:, :-1], xgb_features, feature_names=XGB_FEATURES,
+                              max_display=max_display, show=show)
         return shap_df
 
-    def explain_lstm(self, df: pd.DataFrame, max_display: int = 10):
+    def explain_lstm(self, df: pd.DataFrame, max_display: int = 10, plot: bool = True,
+                     method: str = 'kernel', group: Optional[str] = None, steps: int = 32,
+                     max_rows: Optional[int] = 256):
         """
         Explain LSTM predictions using KernelExplainer.
         Warning: KernelExplainer can be slow for large datasets.
+
+        method='gradients' uses Integrated Gradients instead (see
+        gradient_attribution), with a budget of `steps` per window over the
+        latest `max_rows` windows, optionally grouped per 'channel' or 'time'.
         """
+        if method == 'gradients':
+            from ml.explainable_ai.gradient_attribution import LSTMGradientExplainer
+            return LSTMGradientExplainer(self.model, steps=steps, max_rows=max_rows).explain(df, group=group)
+        if method != 'kernel':
+            raise ValueError("Unsupported method. Choose 'kernel' or 'gradients'.")
+        import shap
         lstm_features = self.model.prepare_lstm(df).numpy()
         lstm_features = lstm_features.reshape(lstm_features.shape[0], -1)  # flatten for SHAP
 
@@ -59,17 +97,19 @@ class SHAPExplainer:
         print(shap_df.head(1))
 
         # Optional: visualize
-        shap.summary_plot(shap_values, lstm_features, feature_names=shap_df.columns[:max_display], max_display=max_display)
+        if plot:
+            shap.summary_plot(shap_values, lstm_features, feature_names=shap_df.columns[:max_display], max_display=max_display)
         return shap_df
 
-    def explain(self, df: pd.DataFrame, model_type: str = 'xgb', max_display: int = 10):
+    def explain(self, df: pd.DataFrame, model_type: str = 'xgb', max_display: int = 10,
+                plot: bool = True):
         """
         Generic method to choose model type for explanation.
         """
         if model_type == 'xgb':
-            return self.explain_xgb(df, max_display=max_display)
+            return self.explain_xgb(df, max_display=max_display, plot=plot)
         elif model_type == 'lstm':
-            return self.explain_lstm(df, max_display=max_display)
+            return self.explain_lstm(df, max_display=max_display, plot=plot)
         else:
             raise ValueError("Unsupported model_type. Choose 'xgb' or 'lstm'.")
 
@@ -94,4 +134,6 @@ if __name__ == "__main__":
     # Explain predictions
     explainer = SHAPExplainer(model, feature_columns=features)
     xgb_shap = explainer.explain(df, model_type='xgb')
+    print("\nSHAP values for XGBoost (latest window):")
+    print(xgb_shap.tail(1))
     lstm_shap = explainer.explain(df, model_type='lstm')
\ No newline at end of file
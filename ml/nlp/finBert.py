@@ -9,19 +9,149 @@ class FinBertSentiment:
     FinBERT-based sentiment analysis for financial text.
     """
 
-    def __init__(self, model_name="yiyanghkust/finbert-tone"):
-        self.tokenizer = BertTokenizer.from_pretrained(model_name)
-        self.model = BertForSequenceClassification.from_pretrained(model_name)
+    labels = ["Neutral", "Positive", "Negative"]
+    backends = ("torch", "int8", "onnx")
+
+    def __init__(self, model_name="yiyanghkust/finbert-tone", model=None, tokenizer=None,
+                 max_length=512, cache=None, backend="torch", onnx_path=None):
+        """
+        backend: "torch" (fp32), "int8" (torch dynamic int8 quantization of
+        the Linear layers) or "onnx" (ONNX Runtime; the model is exported to
+        `onnx_path`, or a temporary file, on first use).
+        """
+        if backend not in self.backends:
+            raise ValueError(f"Unsupported backend. Choose one of {self.backends}.")
+        self.model_name = model_name
+        self.backend = backend
+        self.tokenizer = tokenizer or BertTokenizer.from_pretrained(model_name)
+        self.model = model or BertForSequenceClassification.from_pretrained(model_name)
         self.model.eval()
+        self.max_length = max_length
+        self.cache = cache
+        self.session = None
+
+        if backend == "int8":
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif backend == "onnx":
+            self.session = self._onnx_session(onnx_path)
+
+    @property
+    def cache_name(self):
+        # Backends give slightly different scores, so they never share entries
+        return f"{self.model_name}:{self.backend}"
+
+    def _onnx_session(self, onnx_path):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The 'onnx' backend requires onnxruntime (pip install onnxruntime)")
+        import os
+        import tempfile
+
+        if onnx_path is None:
+            onnx_path = os.path.join(tempfile.mkdtemp(), "finbert.onnx")
+        if not os.path.exists(onnx_path):
+            dummy = self.tokenizer(["export"], return_tensors="pt")
+            names = ["input_ids", "token_type_ids", "attention_mask"]
+            dynamic = {0: "batch", 1: "sequence"}
+            torch.onnx.export(
+                self.model,
+                (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+                onnx_path,
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["logits"],
+                dynamic_axes={**{name: dynamic for name in names}, "logits": {0: "batch"}},
+                opset_version=17,
+                dynamo=False
+            )
+        self.onnx_path = onnx_path
+        return ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
 
     def predict(self, text):
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True)
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts, batch_size=32):
+        """
+        Sentiment for many texts. Texts are sorted by token length and cut
+        into batches of similar length, so each batch is padded only to its
+        own longest text. Results come back in input order. With a cache,
+        only texts not seen before (after normalization) reach the model.
+        """
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._predict_uncached(texts, batch_size)
+
+        keys = [self.cache.key(text, self.cache_name) for text in texts]
+        found = self.cache.get_many(keys)
+        misses = {}
+        for k, text in zip(keys, texts):
+            if k not in found and k not in misses:
+                misses[k] = text
+        if misses:
+            scored = self._predict_uncached(list(misses.values()), batch_size)
+            new = dict(zip(misses.keys(), scored))
+            self.cache.put_many(new)
+            found.update(new)
+        return [found[k] for k in keys]
+
+    def _predict_uncached(self, texts, batch_size):
+        probs = self.predict_proba(texts, batch_size)
+        confidence, sentiment_idx = probs.max(dim=1)
+        return [(self.labels[label_idx], conf)
+                for label_idx, conf in zip(sentiment_idx.tolist(), confidence.tolist())]
+
+    def predict_proba(self, texts, batch_size=32):
+        """
+        (len(texts), 3) class probabilities in input order, using
+        length-bucketed batches. Bypasses the cache.
+        """
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)
+        order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+
+        probs = torch.empty((len(texts), len(self.labels)))
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            batch = self.tokenizer.pad(
+                {key: [encoded[key][i] for i in idx] for key in encoded.keys()},
+                return_tensors="pt"
+            )
+            probs[idx] = self._probabilities(batch)
+        return probs
+
+    def _probabilities(self, batch):
+        if self.session is not None:
+            feeds = {i.name: batch[i.name].numpy() for i in self.session.get_inputs()}
+            logits = torch.from_numpy(self.session.run(["logits"], feeds)[0])
+            return F.softmax(logits, dim=1)
         with torch.no_grad():
-            outputs = self.model(**inputs)
-            probs = F.softmax(outputs.logits, dim=1)
-        sentiment_idx = torch.argmax(probs, dim=1).item()
-        labels = ["Neutral", "Positive", "Negative"]
-        return labels[sentiment_idx], probs[0][sentiment_idx].item()
+            outputs = self.model(**batch)
+            return F.softmax(outputs.logits, dim=1)
+
+
+def tiny_finbert(seed=0, vocab_size=1000, **kwargs):
+    """
+    Randomly initialized miniature BERT with a throwaway vocabulary, for
+    benchmarks and tests that must not download the real FinBERT weights.
+    """
+    import os
+    import tempfile
+    from transformers import BertConfig
+
+    torch.manual_seed(seed)
+    words = [f"w{i}" for i in range(vocab_size)]
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list("abcdefghijklmnopqrstuvwxyz") + words
+    vocab_path = os.path.join(tempfile.mkdtemp(), "vocab.txt")
+    with open(vocab_path, "w") as f:
+        f.write("\n".join(vocab))
+
+    tokenizer = BertTokenizer(vocab_path)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=64, num_hidden_layers=2,
+                        num_attention_heads=2, intermediate_size=128, num_labels=3)
+    model = BertForSequenceClassification(config)
+    return FinBertSentiment(model_name="tiny-bert", model=model, tokenizer=tokenizer, **kwargs)
 
 # Example usage
 if __name__ == "__main__":
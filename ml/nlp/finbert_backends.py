@@ -0,0 +1,84 @@
+# ml/nlp/finbert_backends.py
+
+import os
+import time
+from typing import Dict, List
+
+from ml.nlp.finBert import FinBertSentiment
+
+
+def check_parity(reference: FinBertSentiment, candidate: FinBertSentiment,
+                 texts: List[str]) -> Dict[str, float]:
+    """
+    Compare a quantized/ONNX backend against the fp32 reference on `texts`.
+    """
+    ref = reference.predict_proba(texts)
+    cand = candidate.predict_proba(texts)
+    diff = (ref - cand).abs()
+    return {
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "label_agreement": float((ref.argmax(dim=1) == cand.argmax(dim=1)).float().mean())
+    }
+
+
+def model_size_mb(finbert: FinBertSentiment) -> float:
+    """
+    Serialized size of the weights the backend actually runs with.
+    """
+    if finbert.session is not None:
+        return os.path.getsize(finbert.onnx_path) / 2 ** 20
+    import torch
+
+    def tensor_bytes(value):
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(v) for v in value)
+        return 0
+
+    return sum(tensor_bytes(v) for v in finbert.model.state_dict().values()) / 2 ** 20
+
+
+def rss_mb() -> float:
+    """
+    Resident set size of this process (Linux), or nan elsewhere.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+# Latency / memory benchmark on a small locally constructed BERT
+if __name__ == "__main__":
+    import random
+    from ml.nlp.finBert import tiny_finbert
+
+    rng = random.Random(0)
+    texts = [" ".join(f"w{rng.randrange(1000)}" for _ in range(rng.randint(5, 60)))
+             for _ in range(512)]
+
+    reference = tiny_finbert(seed=0)
+    for backend in FinBertSentiment.backends:
+        before = rss_mb()
+        finbert = reference if backend == "torch" else tiny_finbert(seed=0, backend=backend)
+        loaded = rss_mb() - before
+
+        finbert.predict_batch(texts[:32])  # warm-up
+        start = time.perf_counter()
+        for text in texts[:128]:
+            finbert.predict(text)
+        single_ms = (time.perf_counter() - start) / 128 * 1000
+        start = time.perf_counter()
+        finbert.predict_batch(texts)
+        batch_rate = len(texts) / (time.perf_counter() - start)
+
+        parity = check_parity(reference, finbert, texts)
+        print(f"{backend:>5} | {single_ms:6.2f} ms/text single | {batch_rate:7.0f} texts/s batched"
+              f" | weights {model_size_mb(finbert):6.2f} MB | +RSS {loaded:6.1f} MB"
+              f" | max |dp| {parity['max_abs_diff']:.4f} agreement {parity['label_agreement']:.1%}")
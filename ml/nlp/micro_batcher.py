@@ -0,0 +1,146 @@
+# ml/nlp/micro_batcher.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+
+class MicroBatcher:
+    """
+    Merges items submitted concurrently from many threads into batched
+    calls of `batch_fn(items) -> results`.
+
+    A batch is flushed when it reaches `max_batch_size` items or when its
+    oldest item has waited `max_latency_ms`, whichever comes first. At most
+    `max_pending` items may be queued or in progress; submissions that would
+    exceed it raise queue.Full so callers can shed load. When a batched
+    call fails, its items are retried one at a time so only the futures of
+    the items that fail on their own get the exception.
+    """
+
+    def __init__(self, batch_fn: Callable[[list], list], max_batch_size: int = 64,
+                 max_latency_ms: float = 10.0, max_pending: Optional[int] = None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.max_pending = max_pending
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._closed = False
+        self._start_lock = threading.Lock()
+        self._start_worker()
+
+    def _start_worker(self):
+        # Threads do not survive fork(), so a batcher created before a
+        # pre-fork server forks restarts its worker in each child process.
+        self._pid = os.getpid()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, args=(self._queue,),
+                                        name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item) -> Future:
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: list) -> List[Future]:
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._start_worker()
+        with self._pending_lock:
+            if self.max_pending is not None and self._pending + len(items) > self.max_pending:
+                raise queue.Full(f"{self._pending} items pending (max {self.max_pending})")
+            self._pending += len(items)
+        futures = []
+        for item in items:
+            future = Future()
+            self._queue.put((item, future))
+            futures.append(future)
+        return futures
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _resolve(self, batch):
+        results = list(self.batch_fn([item for item, _ in batch]))
+        if len(results) != len(batch):
+            raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _run(self, jobs):
+        while True:
+            first = jobs.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_latency
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = jobs.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+
+            try:
+                self._resolve(batch)
+            except Exception:
+                # One caller's bad item must not fail everyone merged into
+                # the batch, so a failed batch is retried item by item
+                for entry in batch:
+                    try:
+                        self._resolve([entry])
+                    except Exception as e:
+                        if not entry[1].done():
+                            entry[1].set_exception(e)
+            with self._pending_lock:
+                self._pending -= len(batch)
+
+            if stop:
+                return
+
+
+# Benchmark with a tiny randomly initialized BERT (no download needed)
+if __name__ == "__main__":
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    from ml.nlp.finBert import tiny_finbert
+
+    finbert = tiny_finbert()
+    rng = random.Random(0)
+    texts = [" ".join(f"w{rng.randrange(1000)}" for _ in range(rng.randint(5, 40)))
+             for _ in range(2000)]
+
+    start = time.perf_counter()
+    for text in texts[:500]:
+        finbert.predict(text)
+    single = 500 / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    finbert.predict_batch(texts)
+    batched = len(texts) / (time.perf_counter() - start)
+
+    batcher = MicroBatcher(finbert.predict_batch, max_batch_size=64, max_latency_ms=5)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=32) as clients:
+        list(clients.map(lambda t: batcher.submit(t).result(), texts))
+    micro = len(texts) / (time.perf_counter() - start)
+    batcher.close()
+
+    print(f"one text per call: {single:8.0f} texts/s")
+    print(f"predict_batch:     {batched:8.0f} texts/s")
+    print(f"micro-batched:     {micro:8.0f} texts/s (32 concurrent clients)")
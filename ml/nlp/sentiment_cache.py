@@ -0,0 +1,121 @@
+# ml/nlp/sentiment_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+
+def normalize_text(text: str, lowercase: bool = False) -> str:
+    """
+    Canonical form used for cache keys: NFKC, collapsed whitespace and,
+    for uncased models, lowercase.
+    """
+    text = " ".join(unicodedata.normalize("NFKC", text).split())
+    return text.lower() if lowercase else text
+
+
+class SentimentCache:
+    """
+    Sentiment results keyed by a hash of (model name, normalized text).
+
+    A bounded in-memory LRU sits in front of an optional SQLite file so
+    results survive restarts. Hit/miss counters cover both layers.
+    """
+
+    def __init__(self, max_items: int = 100_000, db_path: Optional[str] = None,
+                 lowercase: bool = False):
+        self.max_items = max_items
+        self.lowercase = lowercase
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self._db = None
+        self._db_pid = None
+        if db_path:
+            self._connection()
+
+    def _connection(self):
+        # SQLite connections must not be shared across fork(); each process
+        # opens its own on first use.
+        if self.db_path is None:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db_pid = os.getpid()
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment ("
+                "key TEXT PRIMARY KEY, label TEXT NOT NULL, confidence REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def key(self, text: str, model_name: str) -> str:
+        normalized = normalize_text(text, self.lowercase)
+        return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[str, float]]:
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for k in keys:
+                if k in self._memory:
+                    self._memory.move_to_end(k)
+                    found[k] = self._memory[k]
+
+            missing = [k for k in keys if k not in found]
+            db = self._connection()
+            if missing and db is not None:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = db.execute(
+                        f"SELECT key, label, confidence FROM sentiment "
+                        f"WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for k, label, confidence in rows:
+                        found[k] = (label, confidence)
+                        self._remember(k, (label, confidence))
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, Tuple[str, float]]):
+        with self._lock:
+            for k, value in items.items():
+                self._remember(k, value)
+            db = self._connection()
+            if db is not None and items:
+                db.executemany(
+                    "INSERT OR REPLACE INTO sentiment (key, label, confidence) VALUES (?, ?, ?)",
+                    [(k, label, float(conf)) for k, (label, conf) in items.items()]
+                )
+                db.commit()
+
+    def _remember(self, k, value):
+        self._memory[k] = value
+        self._memory.move_to_end(k)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_items": len(self._memory)
+            }
+
+    def close(self):
+        if self._db is not None and self._db_pid == os.getpid():
+            self._db.close()
+        self._db = None
+        self.db_path = None
@@ -0,0 +1,303 @@
+# backtest.py
+
+import os
+import json
+import itertools
+import numpy as np
+import pandas as pd
+import torch
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ml.prediction.ensemble_model import SimpleEnsemble
+from ml.prediction.windowing import window_means, sliding_windows
+
+MEMBERS = ('xgb', 'lstm', 'prophet')
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+@dataclass
+class BacktestResult:
+    params: dict
+    weights: Tuple[float, float, float]
+    metrics: Dict[str, Dict[str, float]]
+    predictions: pd.DataFrame
+
+
+class FeatureCache:
+    """
+    Window features for a whole series, built once per seq_len and sliced
+    by every fold and every configuration. Row r holds the window ending
+    at bar r + seq_len - 1 and targets the close of bar r + seq_len, so a
+    fold trained on bars [0, t) uses rows [0, t - seq_len) without seeing
+    later data.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._windows = {}
+
+    def windows(self, seq_len: int):
+        # Same windows as SimpleEnsemble.prepare_xgb / prepare_lstm
+        if seq_len not in self._windows:
+            ohlcv = np.ascontiguousarray(self.df[OHLCV_COLUMNS].values, dtype=np.float32)
+            self._windows[seq_len] = (
+                window_means(self.df[['close', 'volume']].values, seq_len),
+                torch.from_numpy(sliding_windows(ohlcv, seq_len))
+            )
+        return self._windows[seq_len]
+
+
+def error_metrics(actual: np.ndarray, predicted: np.ndarray, previous: np.ndarray) -> Dict[str, float]:
+    errors = predicted - actual
+    return {
+        'mae': float(np.mean(np.abs(errors))),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'mape': float(np.mean(np.abs(errors) / np.abs(actual))),
+        'direction': float(np.mean(np.sign(predicted - previous) == np.sign(actual - previous)))
+    }
+
+
+def combine(predictions: pd.DataFrame, weights: Sequence[float]) -> np.ndarray:
+    weights = np.asarray(weights, dtype=np.float64)
+    return predictions[list(MEMBERS)].values @ (weights / weights.sum())
+
+
+def score(predictions: pd.DataFrame, weights: Sequence[float]) -> Dict[str, Dict[str, float]]:
+    """
+    Error metrics for each member and for the weighted ensemble.
+    """
+    actual, previous = predictions['actual'].values, predictions['previous'].values
+    metrics = {m: error_metrics(actual, predictions[m].values, previous) for m in MEMBERS}
+    metrics['ensemble'] = error_metrics(actual, combine(predictions, weights), previous)
+    return metrics
+
+
+def walk_forward(df: pd.DataFrame,
+                 params: Optional[dict] = None,
+                 initial: Optional[int] = None,
+                 step: int = 20,
+                 max_folds: Optional[int] = None,
+                 use_prophet: bool = True,
+                 cache: Optional[FeatureCache] = None) -> BacktestResult:
+    """
+    Walk-forward backtest of SimpleEnsemble(**params) on OHLCV `df`.
+
+    The first fold trains on the first `initial` bars and predicts the
+    next `step` closes one step ahead; each later fold extends the
+    training window by `step` bars and is retrained from scratch.
+    Member predictions are kept so ensemble weights can be re-scored
+    without retraining. params={'forecaster': 'fourier'} puts the Fourier
+    model in the 'prophet' column; use_prophet=False leaves the slot empty.
+    """
+    params = dict(params or {})
+    seq_len = params.get('seq_len', 30)
+    n = len(df)
+    initial = initial or max(3 * seq_len, n // 2)
+    if initial <= seq_len + 1 or initial >= n:
+        raise ValueError("initial must leave room for training windows and at least one test bar.")
+    cache = cache or FeatureCache(df)
+    xgb_X, lstm_X = cache.windows(seq_len)
+    close = df['close'].values
+
+    starts = list(range(initial, n, step))
+    if max_folds is not None:
+        starts = starts[-max_folds:]
+
+    frames = []
+    for fold, t in enumerate(starts):
+        end = min(t + step, n)
+        model = SimpleEnsemble(**params)
+        if not use_prophet:
+            model.forecaster = None
+        model.train(df.iloc[:t], features=(xgb_X[:t - seq_len], lstm_X[:t - seq_len]))
+
+        rows = slice(t - seq_len, end - seq_len)
+        xgb_pred = model.xgb.predict(xgb_X[rows]).astype(np.float64)
+        model.lstm.eval()
+        with torch.no_grad():
+            lstm_pred = model.lstm(lstm_X[rows]).numpy().ravel().astype(np.float64)
+        if model.forecaster is not None:
+            future = pd.DataFrame({'ds': df.index[t:end]})
+            prophet_pred = model.forecaster.predict(future)['yhat'].values
+        else:
+            # Same substitution SimpleEnsemble.predict makes without a forecaster
+            prophet_pred = (xgb_pred + lstm_pred) / 2
+
+        frames.append(pd.DataFrame({
+            'fold': fold,
+            'actual': close[t:end],
+            'previous': close[t - 1:end - 1],
+            'xgb': xgb_pred,
+            'lstm': lstm_pred,
+            'prophet': prophet_pred
+        }, index=df.index[t:end]))
+
+    predictions = pd.concat(frames)
+    weights = model.weights
+    predictions['ensemble'] = combine(predictions, weights)
+    return BacktestResult(params=params, weights=weights,
+                          metrics=score(predictions, weights), predictions=predictions)
+
+
+def weight_grid(step: float = 0.1) -> np.ndarray:
+    """
+    Every (xgb, lstm, prophet) weight vector on the simplex in `step` increments.
+    """
+    k = int(round(1 / step))
+    return np.array([(a, b, k - a - b) for a in range(k + 1) for b in range(k + 1 - a)],
+                    dtype=np.float64) / k
+
+
+def best_weights(predictions: pd.DataFrame, step: float = 0.1,
+                 metric: str = 'rmse') -> Tuple[float, float, float]:
+    """
+    Ensemble weights minimizing `metric` over the recorded member predictions,
+    evaluated for the whole grid in one matrix product.
+    """
+    grid = weight_grid(step)
+    combined = predictions[list(MEMBERS)].values @ grid.T
+    actual = predictions['actual'].values[:, None]
+    errors = combined - actual
+    if metric == 'mae':
+        loss = np.abs(errors).mean(axis=0)
+    elif metric == 'mape':
+        loss = (np.abs(errors) / np.abs(actual)).mean(axis=0)
+    elif metric == 'rmse':
+        loss = np.sqrt((errors ** 2).mean(axis=0))
+    else:
+        raise ValueError("Unsupported metric. Choose 'rmse', 'mae' or 'mape'.")
+    return tuple(float(w) for w in grid[np.argmin(loss)])
+
+
+# Worker state for search(): the series and its feature cache are set up
+# once per process and reused by every configuration it evaluates
+_search_state = None
+
+
+def _init_search(df, backtest_kwargs, single_thread=True):
+    global _search_state
+    if single_thread:
+        # One process per core; intra-op threads would oversubscribe them
+        torch.set_num_threads(1)
+    _search_state = (FeatureCache(df), backtest_kwargs)
+
+
+def _run_config(params):
+    cache, backtest_kwargs = _search_state
+    result = walk_forward(cache.df, params, cache=cache, **backtest_kwargs)
+    return params, result.predictions
+
+
+def _config_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+def _load_checkpoint(path: str) -> Dict[str, pd.DataFrame]:
+    done = {}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written line from an interrupted run
+                done[record['key']] = pd.DataFrame(
+                    record['predictions'], index=pd.to_datetime(record['index'])
+                )
+    return done
+
+
+def search(df: pd.DataFrame,
+           param_grid: Dict[str, Sequence],
+           weight_step: float = 0.1,
+           metric: str = 'rmse',
+           workers: Optional[int] = None,
+           checkpoint: Optional[str] = None,
+           **backtest_kwargs) -> List[BacktestResult]:
+    """
+    Walk-forward backtest of every hyperparameter combination in
+    `param_grid`, each with its best ensemble weights, best first.
+
+    Configurations run in parallel on `workers` processes (default: every
+    core), each process reusing one FeatureCache. Finished configurations
+    are appended to the JSONL `checkpoint` file and skipped when search()
+    is run again with the same file, so an interrupted search resumes where
+    it stopped. Weights are searched afterwards on the recorded member
+    predictions, without retraining.
+    """
+    names = sorted(param_grid)
+    configs = [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+    done = _load_checkpoint(checkpoint)
+    pending = [c for c in configs if _config_key(c) not in done]
+    if done:
+        print(f"Resuming: {len(configs) - len(pending)} of {len(configs)} configurations already done")
+
+    def record(params, predictions):
+        done[_config_key(params)] = predictions
+        if checkpoint:
+            with open(checkpoint, "a") as f:
+                f.write(json.dumps({
+                    'key': _config_key(params),
+                    'params': params,
+                    'index': [d.isoformat() for d in predictions.index],
+                    'predictions': predictions.to_dict(orient='list')
+                }) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_search,
+                                 initargs=(df, backtest_kwargs)) as pool:
+            for future in as_completed([pool.submit(_run_config, c) for c in pending]):
+                record(*future.result())
+    else:
+        _init_search(df, backtest_kwargs, single_thread=False)
+        for params in pending:
+            record(*_run_config(params))
+
+    results = []
+    for params in configs:
+        predictions = done[_config_key(params)]
+        weights = best_weights(predictions, weight_step, metric)
+        predictions = predictions.assign(ensemble=combine(predictions, weights))
+        results.append(BacktestResult(params=dict(params, weights=list(weights)), weights=weights,
+                                      metrics=score(predictions, weights), predictions=predictions))
+    results.sort(key=lambda r: r.metrics['ensemble'][metric])
+    return results
+
+
+# Example: small search on a synthetic random walk, then resume from the checkpoint
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    rows = 500
+    rng = np.random.default_rng(0)
+    close = 100 * np.cumprod(1 + rng.normal(0.0005, 0.015, rows))
+    df = pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.003, rows)),
+        'high': close * 1.01,
+        'low': close * 0.99,
+        'close': close,
+        'volume': rng.integers(1_000_000, 5_000_000, rows).astype(float)
+    }, index=pd.date_range("2022-01-03", periods=rows, freq="B"))
+
+    baseline = walk_forward(df, step=25, max_folds=4, use_prophet=False)
+    print("Default hyperparameters, equal weights:")
+    for member, m in baseline.metrics.items():
+        print(f"  {member:>8} | RMSE {m['rmse']:7.3f} | MAE {m['mae']:7.3f} | direction {m['direction']:.0%}")
+
+    checkpoint = os.path.join(tempfile.mkdtemp(), "search.jsonl")
+    grid = {'n_estimators': [25, 50, 100], 'lstm_epochs': [5, 20], 'lstm_lr': [0.01, 0.05]}
+    start = time.perf_counter()
+    results = search(df, grid, checkpoint=checkpoint, step=25, max_folds=4, use_prophet=False)
+    print(f"\n{len(results)} configurations in {time.perf_counter() - start:.1f}s; best three:")
+    for r in results[:3]:
+        print(f"  {r.params} | ensemble RMSE {r.metrics['ensemble']['rmse']:.3f}")
+
+    start = time.perf_counter()
+    search(df, grid, checkpoint=checkpoint, step=25, max_folds=4, use_prophet=False)
+    print(f"Rerun from checkpoint in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,196 @@
+# batched_lstm.py
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from typing import Dict, List
+
+from ml.prediction.windowing import sliding_windows
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+CLOSE_IDX = OHLCV_COLUMNS.index('close')
+
+
+class MultiTickerLSTM(nn.Module):
+    """
+    One LSTM body shared by every ticker, with either a shared linear head
+    or one head per ticker selected by `ticker_ids`.
+    """
+
+    def __init__(self, num_tickers, input_size=5, hidden_size=50, per_ticker_heads=True):
+        super().__init__()
+        self.lstm = nn.LSTM(input_size, hidden_size, batch_first=True)
+        num_heads = num_tickers if per_ticker_heads else 1
+        self.head_weight = nn.Parameter(torch.randn(num_heads, hidden_size) / hidden_size ** 0.5)
+        self.head_bias = nn.Parameter(torch.zeros(num_heads))
+        self.per_ticker_heads = per_ticker_heads
+
+    def forward(self, x, ticker_ids):
+        out, _ = self.lstm(x)
+        out = out[:, -1, :]
+        if self.per_ticker_heads:
+            weight, bias = self.head_weight[ticker_ids], self.head_bias[ticker_ids]
+        else:
+            weight, bias = self.head_weight[0], self.head_bias[0]
+        return (out * weight).sum(dim=1, keepdim=True) + bias.reshape(-1, 1)
+
+
+class BatchedLSTMForecaster:
+    """
+    Trains and runs one LSTM over many tickers at once.
+
+    Each ticker's windows are normalized with that ticker's own per-channel
+    mean/std, stacked into a single batch tensor and pushed through the
+    model together, so a whole portfolio is one forward pass. Training
+    shuffles the stacked windows into mini-batches of `batch_size`.
+    """
+
+    def __init__(self, seq_len=30, hidden_size=50, per_ticker_heads=True, epochs=5, lr=0.01,
+                 batch_size=4096):
+        self.seq_len = seq_len
+        self.hidden_size = hidden_size
+        self.per_ticker_heads = per_ticker_heads
+        self.epochs = epochs
+        self.lr = lr
+        self.batch_size = batch_size
+        self.tickers: List[str] = []
+        self.ticker_index: Dict[str, int] = {}
+        self.stats: Dict[str, tuple] = {}
+        self.model = None
+
+    def _normalized(self, ticker, df):
+        mean, std = self.stats[ticker]
+        data = df[OHLCV_COLUMNS].to_numpy(dtype=np.float32)
+        return (data - mean) / std
+
+    def _stack(self, frames: Dict[str, pd.DataFrame]):
+        windows, ids, targets, order = [], [], [], []
+        for ticker, df in frames.items():
+            if ticker not in self.stats or len(df) <= self.seq_len:
+                continue
+            data = self._normalized(ticker, df)
+            w = sliding_windows(data, self.seq_len)
+            windows.append(w)
+            ids.append(np.full(len(w), self.ticker_index[ticker], dtype=np.int64))
+            targets.append(data[-len(w):, CLOSE_IDX])
+            order.append(ticker)
+
+        if not windows:
+            return None, None, None, []
+        X = torch.from_numpy(np.concatenate(windows))
+        ticker_ids = torch.from_numpy(np.concatenate(ids))
+        y = torch.from_numpy(np.concatenate(targets)).reshape(-1, 1)
+        return X, ticker_ids, y, order
+
+    def fit(self, frames: Dict[str, pd.DataFrame]):
+        self.tickers = list(frames.keys())
+        self.ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.stats = {}
+        for ticker, df in frames.items():
+            data = df[OHLCV_COLUMNS].values.astype(np.float32)
+            std = data.std(axis=0)
+            std[std == 0] = 1.0
+            self.stats[ticker] = (data.mean(axis=0), std)
+
+        self.model = MultiTickerLSTM(len(self.tickers), hidden_size=self.hidden_size,
+                                     per_ticker_heads=self.per_ticker_heads)
+        X, ticker_ids, y, _ = self._stack(frames)
+        if X is None:
+            print("Not enough data to train the batched LSTM.")
+            return self
+
+        opt = torch.optim.Adam(self.model.parameters(), lr=self.lr)
+        loss_fn = nn.MSELoss()
+        self.model.train()
+        for epoch in range(self.epochs):
+            # Mini-batches bound activation memory when many tickers are stacked
+            for batch in torch.randperm(len(X)).split(self.batch_size):
+                opt.zero_grad()
+                loss = loss_fn(self.model(X[batch], ticker_ids[batch]), y[batch])
+                loss.backward()
+                opt.step()
+        return self
+
+    def predict(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, float]:
+        """
+        Next-close prediction for every known ticker in `frames`, computed in
+        a single forward pass over each ticker's latest `seq_len` bars.
+        """
+        if self.model is None:
+            raise ValueError("Call fit() before predict()")
+        order = [t for t, df in frames.items() if t in self.stats and len(df) >= self.seq_len]
+        if not order:
+            return {}
+        X = torch.from_numpy(np.stack([self._normalized(t, frames[t].iloc[-self.seq_len:]) for t in order]))
+        ticker_ids = torch.tensor([self.ticker_index[t] for t in order], dtype=torch.int64)
+
+        self.model.eval()
+        with torch.no_grad():
+            preds = self.model(X, ticker_ids).numpy().ravel()
+
+        results = {}
+        for ticker, pred in zip(order, preds):
+            mean, std = self.stats[ticker]
+            results[ticker] = float(pred * std[CLOSE_IDX] + mean[CLOSE_IDX])
+        return results
+
+
+# Throughput comparison against the per-ticker SimpleLSTM path
+if __name__ == "__main__":
+    import time
+    from ml.prediction.ensemble_model import SimpleEnsemble
+
+    seq_len, rows = 30, 180
+    for num_tickers in (50, 200, 500):
+        frames = {}
+        for t in range(num_tickers):
+            dates = pd.date_range("2024-01-01", periods=rows)
+            frames[f"T{t}"] = pd.DataFrame(
+                np.random.rand(rows, 5) * 100 + 50, columns=OHLCV_COLUMNS, index=dates
+            )
+
+        forecaster = BatchedLSTMForecaster(seq_len=seq_len)
+        t0 = time.perf_counter()
+        forecaster.fit(frames)
+        batched_train = time.perf_counter() - t0
+        train_seqs = num_tickers * (rows - seq_len) * forecaster.epochs
+
+        forecaster.predict(frames)  # warm-up
+        t0 = time.perf_counter()
+        forecaster.predict(frames)
+        batched_infer = time.perf_counter() - t0
+
+        # Current path: SimpleEnsemble's LSTM stage trained per ticker (the
+        # same full-batch loop as SimpleEnsemble.train, without the other
+        # members), on the first 50 tickers
+        baseline = list(frames.values())[:50]
+        t0 = time.perf_counter()
+        for df in baseline:
+            ensemble = SimpleEnsemble(seq_len=seq_len, lstm_epochs=forecaster.epochs, forecaster="fourier")
+            lstm_X = ensemble.prepare_lstm(df)
+            lstm_y = torch.tensor(df['close'].values[seq_len:].reshape(-1, 1), dtype=torch.float32)
+            opt = torch.optim.Adam(ensemble.lstm.parameters(), lr=ensemble.lstm_lr)
+            ensemble.lstm.train()
+            for epoch in range(ensemble.lstm_epochs):
+                opt.zero_grad()
+                loss = nn.functional.mse_loss(ensemble.lstm(lstm_X), lstm_y)
+                loss.backward()
+                opt.step()
+        single_train = time.perf_counter() - t0
+        single_seqs = len(baseline) * (rows - seq_len) * forecaster.epochs
+
+        # ... and one window and forward pass per ticker at inference
+        ensemble.lstm.eval()
+        with torch.no_grad():
+            ensemble.lstm(ensemble.prepare_lstm(frames["T0"], last_only=True))  # warm-up
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            for df in frames.values():
+                ensemble.lstm(ensemble.prepare_lstm(df, last_only=True))
+        single_infer = time.perf_counter() - t0
+
+        print(f"{num_tickers:>4} tickers | train batched {train_seqs / batched_train:10.0f} seq/s"
+              f" vs per-ticker {single_seqs / single_train:10.0f} seq/s"
+              f" | infer batched {num_tickers / batched_infer:10.0f} seq/s"
+              f" vs per-ticker {num_tickers / single_infer:10.0f} seq/s")
@@ -0,0 +1,136 @@
+# combiner.py
+
+import math
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import pandas as pd
+
+MEMBERS = ('xgb', 'lstm', 'prophet')
+
+
+class InverseErrorCombiner:
+    """
+    Ensemble weights learned from out-of-sample residuals.
+
+    Each member's weight is proportional to 1 / EWMA of its squared
+    one-step-ahead error (half-life `halflife` observations), updated one
+    observation at a time. A member with fewer than `min_observations`
+    residuals gets the average weight of the measured ones.
+
+    A member in `skippable` whose weight falls below `skip_below` is
+    skipped: the ensemble neither trains nor runs it. After
+    `revisit_after` further observations it is re-enabled with a fresh
+    error estimate, so a member that starts to help again can return.
+    """
+
+    def __init__(self, members: Sequence[str] = MEMBERS, halflife: float = 20.0,
+                 min_observations: int = 20, skip_below: float = 0.05,
+                 skippable: Sequence[str] = ('prophet',), revisit_after: int = 250):
+        self.members = tuple(members)
+        self.halflife = halflife
+        self.min_observations = min_observations
+        self.skip_below = skip_below
+        self.skippable = tuple(skippable)
+        self.revisit_after = revisit_after
+        self.mse: Dict[str, Optional[float]] = {m: None for m in self.members}
+        self.counts: Dict[str, int] = {m: 0 for m in self.members}
+        self.skipped: Dict[str, int] = {}
+
+    @property
+    def alpha(self) -> float:
+        return 1.0 - 0.5 ** (1.0 / self.halflife)
+
+    def is_active(self, member: str) -> bool:
+        return member not in self.skipped
+
+    def observe(self, predictions: Dict[str, Optional[float]], actual: float):
+        """
+        Record one bar's out-of-sample member predictions against the
+        realized value. Missing or failed members (None/NaN) are ignored.
+        """
+        for member, pred in predictions.items():
+            if member not in self.mse or pred is None or not math.isfinite(pred):
+                continue
+            error = (pred - actual) ** 2
+            previous = self.mse[member]
+            self.mse[member] = error if previous is None else previous + self.alpha * (error - previous)
+            self.counts[member] += 1
+
+        for member in list(self.skipped):
+            self.skipped[member] += 1
+            if self.skipped[member] >= self.revisit_after:
+                del self.skipped[member]
+                self.mse[member], self.counts[member] = None, 0
+        self._update_skips()
+
+    def observe_frame(self, predictions: pd.DataFrame):
+        """
+        Replay recorded predictions (member columns plus 'actual'), e.g.
+        from backtest.walk_forward, in time order.
+        """
+        columns = [m for m in self.members if m in predictions.columns]
+        for row in predictions[columns + ['actual']].itertuples(index=False):
+            values = row._asdict()
+            actual = values.pop('actual')
+            self.observe(values, actual)
+
+    def _update_skips(self):
+        weights = self.weights()
+        active = [m for m in self.members if self.is_active(m)]
+        for member in self.skippable:
+            # Never skip the last member standing
+            if member in weights and weights[member] < self.skip_below and len(active) > 1:
+                self.skipped[member] = 0
+                active.remove(member)
+
+    def weights(self, available: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        Normalized weights over the `available` members (default: all
+        active ones). Skipped and unavailable members get no weight.
+        """
+        available = self.members if available is None else tuple(available)
+        candidates = [m for m in self.members if m in available and self.is_active(m)]
+        if not candidates:
+            return {}
+        measured = {m: 1.0 / max(self.mse[m], 1e-12) for m in candidates
+                    if self.counts[m] >= self.min_observations}
+        if not measured:
+            return {m: 1.0 / len(candidates) for m in candidates}
+        # Members still short of min_observations get an average share
+        neutral = sum(measured.values()) / len(measured)
+        inverse = {m: measured.get(m, neutral) for m in candidates}
+        total = sum(inverse.values())
+        return {m: v / total for m, v in inverse.items()}
+
+    def combine(self, predictions: Dict[str, Optional[float]]) -> Tuple[Optional[float], Dict[str, float]]:
+        """
+        Weighted prediction over the members that produced a value,
+        together with the weights used.
+        """
+        available = [m for m, p in predictions.items() if p is not None and math.isfinite(p)]
+        weights = self.weights(available)
+        if not weights:
+            return None, {}
+        return sum(w * predictions[m] for m, w in weights.items()), weights
+
+    def to_dict(self) -> dict:
+        return {
+            'members': list(self.members),
+            'halflife': self.halflife,
+            'min_observations': self.min_observations,
+            'skip_below': self.skip_below,
+            'skippable': list(self.skippable),
+            'revisit_after': self.revisit_after,
+            'mse': self.mse,
+            'counts': self.counts,
+            'skipped': self.skipped
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "InverseErrorCombiner":
+        combiner = cls(state['members'], state['halflife'], state['min_observations'],
+                       state['skip_below'], state['skippable'], state['revisit_after'])
+        combiner.mse.update(state['mse'])
+        combiner.counts.update(state['counts'])
+        combiner.skipped.update(state['skipped'])
+        return combiner
@@ -6,12 +6,19 @@ os.environ["OMP_NUM_THREADS"] = "1"
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-from prophet import Prophet
 import torch
 import torch.nn as nn
 from sklearn.preprocessing import StandardScaler
+from ml.prediction.windowing import window_means, sliding_windows
+import joblib
+import json
+import time
 from datetime import datetime
 from dataclasses import dataclass
+from typing import Dict, Optional
+from ml.prediction.combiner import InverseErrorCombiner
+from ml.prediction.forecasters import FourierTrendForecaster, make_forecaster
+from ml.prediction.series_frame import OHLCV_COLUMNS, SeriesFrame, as_frame, column_block
 
 @dataclass
 class PredictionResult:
@@ -20,6 +27,8 @@ class PredictionResult:
     lstm: float
     prophet: float
     timestamp: datetime
+    # Weights the ensemble actually used; failed or skipped members are absent
+    weights: Optional[Dict[str, float]] = None
 
 
 class SimpleLSTM(nn.Module):
@@ -34,41 +43,102 @@ class SimpleLSTM(nn.Module):
         return self.fc(out)
 
 
+def prophet_warm_start_params(model):
+    """
+    Fitted parameters of a Prophet model in the form accepted by
+    Prophet.fit(init=...), so a refit starts from the previous optimum.
+    """
+    params = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        params[name] = model.params[name][0][0]
+    for name in ['delta', 'beta']:
+        params[name] = model.params[name][0]
+    return params
+
+
 class SimpleEnsemble:
-    def __init__(self, seq_len=30):
+    def __init__(self, seq_len=30, n_estimators=50, lstm_epochs=5, lstm_lr=0.01,
+                 weights=(1 / 3, 1 / 3, 1 / 3), combiner=None, forecaster="prophet"):
+        """
+        weights: (xgb, lstm, prophet) weights of the ensemble average;
+        they are normalized to sum to 1.
+        combiner: optional InverseErrorCombiner. When set, it replaces the
+        fixed weights, learns from the out-of-sample residuals seen in
+        update(), and may skip members entirely.
+        forecaster: model in the time-series slot, "prophet", "fourier"
+        (vectorized trend + seasonality, see forecasters.py) or None. It is
+        the ensemble's 'prophet' member whichever backend fills it.
+        """
         self.seq_len = seq_len
-        self.xgb = xgb.XGBRegressor(n_estimators=50, verbosity=0)
+        self.n_estimators = n_estimators
+        self.lstm_epochs = lstm_epochs
+        self.lstm_lr = lstm_lr
+        self.weights = tuple(float(w) / sum(weights) for w in weights)
+        self.combiner = combiner
+        self.xgb = xgb.XGBRegressor(n_estimators=n_estimators, verbosity=0)
         self.lstm = SimpleLSTM()
+        self.forecaster_name = forecaster
         try:
-            self.prophet = Prophet(daily_seasonality=False)
+            self.forecaster = make_forecaster(forecaster)
         except Exception as e:
-            print(f"Prophet initialization failed: {e}")
-            self.prophet = None
+            print(f"Forecaster initialization failed: {e}")
+            self.forecaster = None
         self.scaler = StandardScaler()
         self.device = 'cpu'
+        self.is_trained = False
+        self.history = None
+
+    @property
+    def prophet(self):
+        # Older name of the forecaster slot
+        return self.forecaster
+
+    @prophet.setter
+    def prophet(self, value):
+        self.forecaster = value
+
+    def forecaster_fitted(self):
+        if isinstance(self.forecaster, FourierTrendForecaster):
+            return self.forecaster.is_fitted
+        return self.forecaster is not None and self.forecaster.history is not None
+
+    def runs(self, member):
+        # Members the combiner skips are neither trained nor predicted
+        return self.combiner is None or self.combiner.is_active(member)
+
+    def get_params(self):
+        return {
+            'seq_len': self.seq_len,
+            'n_estimators': self.n_estimators,
+            'lstm_epochs': self.lstm_epochs,
+            'lstm_lr': self.lstm_lr,
+            'weights': list(self.weights),
+            'forecaster': self.forecaster_name
+        }
 
-    def prepare_xgb(self, df):
+    # The prep methods take a DataFrame or a SeriesFrame; a SeriesFrame's
+    # OHLCV block reaches the LSTM without being copied
+
+    def prepare_xgb(self, df, last_only=False):
         if len(df) <= self.seq_len:
             return np.empty((0, 2))
 
-        features = []
-        for i in range(self.seq_len, len(df)):
-            window = df.iloc[i - self.seq_len:i]
-            features.append([
-                float(window['close'].mean()),
-                float(window['volume'].mean())
-            ])
-        return np.array(features)
+        if last_only:
+            df = df.tail(self.seq_len + 1)
+        return window_means(column_block(df, ['close', 'volume']), self.seq_len, last_only=last_only)
 
-    def prepare_lstm(self, df):
+    def prepare_lstm(self, df, last_only=False):
         if len(df) <= self.seq_len:
             return torch.tensor([])
 
-        data = df[['open', 'high', 'low', 'close', 'volume']].values
-        sequences = [data[i - self.seq_len:i] for i in range(self.seq_len, len(data))]
-        return torch.tensor(np.array(sequences), dtype=torch.float32)
+        if last_only:
+            df = df.tail(self.seq_len + 1)
+        data = np.ascontiguousarray(column_block(df, OHLCV_COLUMNS), dtype=np.float32)
+        return torch.from_numpy(sliding_windows(data, self.seq_len, last_only=last_only))
 
     def prepare_prophet(self, df):
+        if isinstance(df, SeriesFrame):
+            return pd.DataFrame({'ds': df.index, 'y': df['close']})
         df_reset = df.copy().reset_index()
         df_reset.columns = [c.lower() for c in df_reset.columns]
         if "date" in df_reset.columns:
@@ -83,10 +153,18 @@ class SimpleEnsemble:
         df_reset = df_reset.rename(columns={"close": "y"})
         return df_reset[["ds", "y"]]
 
-    def train(self, df):
+    def train(self, df, progress=None, features=None):
+        """
+        Fit all members on `df`. `progress(fraction, message)`, if given, is
+        called after each training stage and may raise to abort training.
+        `features` optionally supplies precomputed (prepare_xgb(df),
+        prepare_lstm(df)), e.g. slices of windows cached across backtest folds.
+        """
+        report = progress or (lambda fraction, message: None)
         print("Training ensemble model ...")
-        xgb_X = self.prepare_xgb(df)
-        y = df['close'].values[self.seq_len:]
+        self.history = as_frame(df)[OHLCV_COLUMNS].copy()
+        xgb_X, lstm_X = features if features is not None else (self.prepare_xgb(df), None)
+        y = np.asarray(df['close'])[self.seq_len:]
 
         if xgb_X.shape[0] == 0 or y.shape[0] == 0:
             print("Not enough data to train the model.")
@@ -98,16 +176,18 @@ class SimpleEnsemble:
             print("XGBoost trained successfully.")
         except Exception as e:
             print(f"XGBoost training failed: {e}")
+        report(0.3, "xgboost")
 
         try:
             print("Training LSTM ...")
-            lstm_X = self.prepare_lstm(df)
+            if lstm_X is None:
+                lstm_X = self.prepare_lstm(df)
             lstm_y = torch.tensor(y.reshape(-1, 1), dtype=torch.float32)
             if len(lstm_X) > 1:
-                opt = torch.optim.Adam(self.lstm.parameters(), lr=0.01)
+                opt = torch.optim.Adam(self.lstm.parameters(), lr=self.lstm_lr)
                 loss_fn = nn.MSELoss()
                 self.lstm.train()
-                for epoch in range(5):
+                for epoch in range(self.lstm_epochs):
                     opt.zero_grad()
                     pred = self.lstm(lstm_X)
                     loss = loss_fn(pred, lstm_y)
@@ -116,56 +196,289 @@ class SimpleEnsemble:
                 print("LSTM trained successfully.")
         except Exception as e:
             print(f"LSTM training failed: {e}")
+        report(0.6, "lstm")
 
-        if self.prophet is not None:
+        if self.forecaster is not None and self.runs('prophet'):
             try:
-                print("🔹 Training Prophet ...")
+                print(f"🔹 Training {self.forecaster_name} ...")
                 prop_df = self.prepare_prophet(df)
-                self.prophet.fit(prop_df)
-                print("Prophet trained successfully.")
+                self.forecaster.fit(prop_df)
+                print(f"{self.forecaster_name} trained successfully.")
             except Exception as e:
-                print(f"Prophet training failed: {e}")
-                self.prophet = None
+                print(f"{self.forecaster_name} training failed: {e}")
+                self.forecaster = None
+        report(1.0, self.forecaster_name or "forecaster")
 
-    def predict(self, df):
-        print(f"Making predictions for {df.index[-1].strftime('%Y-%m-%d')}")
+        self.is_trained = True
+
+    def update(self, new_rows, xgb_rounds=10, lstm_steps=3, lstm_lr=0.005,
+               context_windows=20, update_prophet=True, max_xgb_rounds=None):
+        """
+        Warm-start refresh after new bars arrive, instead of a full train().
+
+        XGBoost keeps boosting from the existing booster for `xgb_rounds`
+        (once that would exceed `max_xgb_rounds` trees, default twice
+        n_estimators, it is refit from scratch on the full history so
+        repeated updates don't grow the booster without bound), the LSTM
+        takes `lstm_steps` optimizer steps from its current weights and
+        Prophet is refit initialized from its previous parameters (the
+        Fourier forecaster is cheap enough to refit outright). Only the
+        windows ending in the new bars (plus `context_windows` recent ones)
+        are rebuilt.
+        """
+        new_rows = as_frame(new_rows)
+        if not self.is_trained or self.history is None:
+            full = new_rows if self.history is None else pd.concat([self.history, new_rows])
+            self.train(full)
+            return
+
+        new_rows = new_rows[new_rows.index > self.history.index[-1]]
+        if new_rows.empty:
+            return
+
+        start = time.perf_counter()
+        self.history = pd.concat([self.history, new_rows[OHLCV_COLUMNS]])
+        num_windows = min(len(new_rows) + context_windows, len(self.history) - self.seq_len)
+        recent = self.history.iloc[-(self.seq_len + num_windows):]
+        y = recent['close'].values[self.seq_len:]
+        if self.combiner is not None:
+            self.observe_residuals(recent, len(new_rows))
 
         try:
-            xgb_X = self.prepare_xgb(df)
-            if xgb_X.shape[0] == 0:
-                raise ValueError("Insufficient data for XGBoost.")
-            xgb_pred = float(self.xgb.predict(xgb_X[-1].reshape(1, -1))[0])
+            booster = self.xgb.get_booster()
+            if booster.num_boosted_rounds() + xgb_rounds > (max_xgb_rounds or 2 * self.n_estimators):
+                self.xgb.fit(self.prepare_xgb(self.history), self.history['close'].values[self.seq_len:])
+            else:
+                xgb_X = self.prepare_xgb(recent)
+                n_estimators = self.xgb.get_params()['n_estimators']
+                self.xgb.set_params(n_estimators=xgb_rounds)
+                try:
+                    self.xgb.fit(xgb_X, y, xgb_model=booster)
+                finally:
+                    self.xgb.set_params(n_estimators=n_estimators)
         except Exception as e:
-            print(f"XGBoost prediction failed: {e}")
-            xgb_pred = float(df['close'].iloc[-1])
+            print(f"XGBoost update failed: {e}")
 
         try:
-            lstm_X = self.prepare_lstm(df)
+            lstm_X = self.prepare_lstm(recent)
+            lstm_y = torch.tensor(y.reshape(-1, 1), dtype=torch.float32)
+            opt = torch.optim.Adam(self.lstm.parameters(), lr=lstm_lr)
+            loss_fn = nn.MSELoss()
+            self.lstm.train()
+            for step in range(lstm_steps):
+                opt.zero_grad()
+                loss = loss_fn(self.lstm(lstm_X), lstm_y)
+                loss.backward()
+                opt.step()
             self.lstm.eval()
-            with torch.no_grad():
-                lstm_pred = float(self.lstm(lstm_X[-1].unsqueeze(0)).item())
         except Exception as e:
-            print(f"LSTM prediction failed: {e}")
-            lstm_pred = float(df['close'].iloc[-1])
+            print(f"LSTM update failed: {e}")
 
+        if update_prophet and self.forecaster is not None and self.runs('prophet'):
+            try:
+                if isinstance(self.forecaster, FourierTrendForecaster) or not self.forecaster_fitted():
+                    # Never fitted (e.g. skipped by the combiner until now) or cheap to refit
+                    self.forecaster = make_forecaster(self.forecaster_name).fit(self.prepare_prophet(self.history))
+                else:
+                    warm = make_forecaster("prophet")
+                    warm.fit(self.prepare_prophet(self.history), init=prophet_warm_start_params(self.forecaster))
+                    self.forecaster = warm
+            except Exception as e:
+                print(f"{self.forecaster_name} update failed: {e}")
+
+        print(f"Ensemble updated with {len(new_rows)} new bar(s) in {time.perf_counter() - start:.3f}s")
+
+    def member_predictions(self, recent, count):
+        """
+        Next-bar predictions of every member for the last `count` bars of
+        `recent`, each made from the bars before it. A failed or skipped
+        member maps to None.
+        """
+        targets = recent.index[-count:]
+        preds = {}
+        try:
+            preds['xgb'] = self.xgb.predict(self.prepare_xgb(recent)[-count:]).astype(float) \
+                if self.runs('xgb') else None
+        except Exception as e:
+            print(f"XGBoost prediction failed: {e}")
+            preds['xgb'] = None
         try:
-            if self.prophet is not None:
-                future = pd.DataFrame({'ds': [df.index[-1] + pd.Timedelta(days=1)]})
-                prophet_pred = float(self.prophet.predict(future)['yhat'].iloc[0])
+            if self.runs('lstm'):
+                self.lstm.eval()
+                with torch.no_grad():
+                    preds['lstm'] = self.lstm(self.prepare_lstm(recent)[-count:]).numpy().ravel().astype(float)
             else:
-                prophet_pred = (xgb_pred + lstm_pred) / 2
+                preds['lstm'] = None
         except Exception as e:
-            print(f"Prophet prediction failed: {e}")
-            prophet_pred = (xgb_pred + lstm_pred) / 2
+            print(f"LSTM prediction failed: {e}")
+            preds['lstm'] = None
+        try:
+            if self.forecaster is not None and self.runs('prophet'):
+                preds['prophet'] = self.forecaster.predict(pd.DataFrame({'ds': targets}))['yhat'].values
+            else:
+                preds['prophet'] = None
+        except Exception as e:
+            print(f"{self.forecaster_name} prediction failed: {e}")
+            preds['prophet'] = None
+        return preds
+
+    def observe_residuals(self, recent, count):
+        """
+        Score the current members on the newest `count` bars before they
+        are trained on, and feed the out-of-sample residuals to the combiner.
+        """
+        count = min(count, len(recent) - self.seq_len)
+        if count <= 0:
+            return
+        preds = self.member_predictions(recent, count)
+        actual = recent['close'].values[-count:]
+        for i in range(count):
+            self.combiner.observe({m: None if p is None else float(p[i]) for m, p in preds.items()},
+                                  float(actual[i]))
+
+    def predict(self, df):
+        print(f"Making predictions for {df.index[-1].strftime('%Y-%m-%d')}")
+        result = self.predict_features(
+            self.prepare_xgb(df, last_only=True) if self.runs('xgb') else None,
+            self.prepare_lstm(df, last_only=True) if self.runs('lstm') else None,
+            df.index[-1], float(np.asarray(df['close'])[-1])
+        )
+        print(f"Predictions done → XGB: {result.xgb:.2f}, LSTM: {result.lstm:.2f}, "
+              f"Prophet: {result.prophet:.2f}, Ensemble: {result.ensemble:.2f}")
+        return result
+
+    def predict_features(self, xgb_X, lstm_X, last_date, last_close, forecast=True):
+        """
+        Prediction for the bar after `last_date` from last-window features
+        as prepare_xgb / prepare_lstm(df, last_only=True) build them, e.g.
+        kept up to date bar by bar by streaming.py. A member whose features
+        are None is left out; forecast=False leaves out the forecaster.
+        """
+        preds = {'xgb': None, 'lstm': None, 'prophet': None}
+
+        if xgb_X is not None and self.runs('xgb'):
+            try:
+                if xgb_X.shape[0] == 0:
+                    raise ValueError("Insufficient data for XGBoost.")
+                preds['xgb'] = float(self.xgb.predict(xgb_X)[0])
+            except Exception as e:
+                print(f"XGBoost prediction failed: {e}")
 
-        ensemble_pred = float((xgb_pred + lstm_pred + prophet_pred) / 3)
+        if lstm_X is not None and self.runs('lstm'):
+            try:
+                self.lstm.eval()
+                with torch.no_grad():
+                    preds['lstm'] = float(self.lstm(lstm_X).item())
+            except Exception as e:
+                print(f"LSTM prediction failed: {e}")
+
+        if forecast and self.forecaster is not None and self.runs('prophet'):
+            try:
+                future = pd.DataFrame({'ds': [last_date + pd.Timedelta(days=1)]})
+                preds['prophet'] = float(self.forecaster.predict(future)['yhat'].iloc[0])
+            except Exception as e:
+                print(f"{self.forecaster_name} prediction failed: {e}")
+
+        # Failed and skipped members get no weight instead of a stand-in value
+        if self.combiner is not None:
+            ensemble_pred, weights = self.combiner.combine(preds)
+        else:
+            fixed = dict(zip(('xgb', 'lstm', 'prophet'), self.weights))
+            total = sum(fixed[m] for m, p in preds.items() if p is not None)
+            weights = {m: fixed[m] / total for m, p in preds.items() if p is not None} if total > 0 else {}
+            ensemble_pred = sum(w * preds[m] for m, w in weights.items()) if weights else None
+        if ensemble_pred is None:
+            ensemble_pred = last_close
+        ensemble_pred = float(ensemble_pred)
 
-        print(f"Predictions done → XGB: {xgb_pred:.2f}, LSTM: {lstm_pred:.2f}, Prophet: {prophet_pred:.2f}, Ensemble: {ensemble_pred:.2f}")
+        # Member fields keep their previous display fallbacks
+        xgb_pred = preds['xgb'] if preds['xgb'] is not None else last_close
+        lstm_pred = preds['lstm'] if preds['lstm'] is not None else last_close
+        prophet_pred = preds['prophet'] if preds['prophet'] is not None else (xgb_pred + lstm_pred) / 2
 
         return PredictionResult(
             ensemble=ensemble_pred,
             xgb=xgb_pred,
             lstm=lstm_pred,
             prophet=prophet_pred,
-            timestamp=datetime.now()
-        )
\ No newline at end of file
+            timestamp=datetime.now(),
+            weights=weights
+        )
+
+    def save(self, path):
+        """
+        Persist every fitted component into the directory `path`.
+        XGBoost uses its native JSON format, the LSTM its state_dict and
+        Prophet the prophet.serialize JSON (the Fourier forecaster its
+        coefficients in fourier.json), so nothing depends on pickling
+        this class.
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "params.json"), "w") as f:
+            json.dump(self.get_params(), f)
+        combiner_path = os.path.join(path, "combiner.json")
+        if self.combiner is not None:
+            with open(combiner_path, "w") as f:
+                json.dump(self.combiner.to_dict(), f)
+        elif os.path.exists(combiner_path):
+            os.remove(combiner_path)
+        self.xgb.save_model(os.path.join(path, "xgb.json"))
+        torch.save(self.lstm.state_dict(), os.path.join(path, "lstm.pt"))
+        joblib.dump(self.scaler, os.path.join(path, "scaler.joblib"))
+        if self.history is not None:
+            self.history.to_pickle(os.path.join(path, "history.pkl"))
+
+        prophet_path = os.path.join(path, "prophet.json")
+        fourier_path = os.path.join(path, "fourier.json")
+        for stale in (prophet_path, fourier_path):
+            if os.path.exists(stale):
+                os.remove(stale)
+        if isinstance(self.forecaster, FourierTrendForecaster):
+            with open(fourier_path, "w") as f:
+                json.dump(self.forecaster.to_dict(), f)
+        elif self.forecaster is not None and self.forecaster_fitted():
+            from prophet.serialize import model_to_json
+            with open(prophet_path, "w") as f:
+                f.write(model_to_json(self.forecaster))
+
+    @classmethod
+    def load(cls, path, seq_len=30):
+        """
+        Rebuild a trained ensemble from a directory written by save().
+        """
+        params = {'seq_len': seq_len}
+        params_path = os.path.join(path, "params.json")
+        if os.path.exists(params_path):
+            with open(params_path) as f:
+                params = json.load(f)
+        model = cls(**params)
+        combiner_path = os.path.join(path, "combiner.json")
+        if os.path.exists(combiner_path):
+            with open(combiner_path) as f:
+                model.combiner = InverseErrorCombiner.from_dict(json.load(f))
+        model.xgb.load_model(os.path.join(path, "xgb.json"))
+        model.lstm.load_state_dict(torch.load(os.path.join(path, "lstm.pt"), map_location=model.device))
+        model.lstm.eval()
+        model.scaler = joblib.load(os.path.join(path, "scaler.joblib"))
+        history_path = os.path.join(path, "history.pkl")
+        if os.path.exists(history_path):
+            model.history = pd.read_pickle(history_path)
+
+        prophet_path = os.path.join(path, "prophet.json")
+        fourier_path = os.path.join(path, "fourier.json")
+        if os.path.exists(prophet_path):
+            from prophet.serialize import model_from_json
+            with open(prophet_path) as f:
+                model.forecaster = model_from_json(f.read())
+        elif os.path.exists(fourier_path):
+            with open(fourier_path) as f:
+                model.forecaster = FourierTrendForecaster.from_dict(json.load(f))
+        elif model.combiner is not None and not model.combiner.is_active('prophet'):
+            # Skipped by the combiner and never fitted; keep an empty slot
+            # so it can be fitted when the combiner revisits it
+            pass
+        else:
+            model.forecaster = None
+
+        model.is_trained = True
+        return model
@@ -0,0 +1,334 @@
+# model_registry.py
+
+import os
+import copy
+import json
+import time
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml.prediction.combiner import InverseErrorCombiner
+from ml.prediction.ensemble_model import SimpleEnsemble
+from ml.prediction.series_frame import SeriesFrame, _nanoseconds, as_frame, column_block
+from ml.prediction.tickers import TICKER_PATTERN, normalize_ticker
+
+DEFAULT_MODEL_DIR = os.environ.get(
+    "VANTAGE_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "model_store")
+)
+
+# Model in the ensemble's time-series slot for newly trained models
+DEFAULT_FORECASTER = os.environ.get("VANTAGE_FORECASTER", "prophet")
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Stable content hash of the OHLCV data (index included), used to decide
+    whether a stored model was trained on exactly this data. The int64
+    nanosecond index and the float32 OHLCV block are hashed, so a DataFrame
+    and the equivalent SeriesFrame map to the same key.
+    """
+    index = df._index if isinstance(df, SeriesFrame) else _nanoseconds(df.index)
+    values = np.ascontiguousarray(column_block(df, OHLCV_COLUMNS), dtype=np.float32)
+    digest = hashlib.sha1(np.ascontiguousarray(index, dtype=np.int64).tobytes())
+    digest.update(values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class RegistryEntry:
+    model: SimpleEnsemble
+    trained_at: float
+    fingerprint: str
+
+
+class ModelRegistry:
+    """
+    Keeps trained SimpleEnsemble models keyed by (ticker, seq_len, data fingerprint).
+
+    Models live on disk under `root` and are loaded on demand into a small
+    in-memory LRU cache. A model is only retrained when the data fingerprint
+    changes or the stored model is older than `max_age` seconds. When the
+    new data just appends up to `max_update_rows` bars to what the latest
+    model saw, that model is warm-started with SimpleEnsemble.update().
+    New models use `forecaster` ("prophet" or "fourier") in the ensemble's
+    forecaster slot.
+    """
+
+    def __init__(self, root: str = DEFAULT_MODEL_DIR, max_models: int = 32,
+                 max_age: Optional[float] = 24 * 3600, max_update_rows: int = 5,
+                 forecaster: Optional[str] = DEFAULT_FORECASTER):
+        self.root = os.path.abspath(root)
+        self.forecaster = forecaster
+        self.max_models = max_models
+        self.max_age = max_age
+        self.max_update_rows = max_update_rows
+        self._cache: "OrderedDict[Tuple[str, int, str], RegistryEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks = {}
+
+    def _model_dir(self, ticker: str, seq_len: int, fingerprint: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, normalize_ticker(ticker), str(seq_len), fingerprint))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Model path for {ticker!r} escapes the model store")
+        return path
+
+    def _is_fresh(self, trained_at: float) -> bool:
+        return self.max_age is None or (time.time() - trained_at) <= self.max_age
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _remember(self, key, entry: RegistryEntry):
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_models:
+                self._cache.popitem(last=False)
+
+    def _forget(self, entry: RegistryEntry):
+        with self._lock:
+            for key in [k for k, e in self._cache.items() if e is entry]:
+                del self._cache[key]
+
+    def _lookup(self, key) -> Optional[RegistryEntry]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if not self._is_fresh(entry.trained_at):
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry
+
+    def _load_from_disk(self, key) -> Optional[RegistryEntry]:
+        ticker, seq_len, fingerprint = key
+        path = self._model_dir(ticker, seq_len, fingerprint)
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if not self._is_fresh(meta["trained_at"]):
+                return None
+            model = SimpleEnsemble.load(path, seq_len=seq_len)
+            return RegistryEntry(model=model, trained_at=meta["trained_at"], fingerprint=fingerprint)
+        except Exception as e:
+            print(f"⚠️ Could not load stored model {path}: {e}")
+            return None
+
+    def _save_to_disk(self, key, entry: RegistryEntry, df: pd.DataFrame):
+        ticker, seq_len, fingerprint = key
+        path = self._model_dir(ticker, seq_len, fingerprint)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            entry.model.save(tmp_path)
+            with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+                json.dump({
+                    "ticker": ticker,
+                    "seq_len": seq_len,
+                    "fingerprint": fingerprint,
+                    "trained_at": entry.trained_at,
+                    "rows": len(df),
+                    "last_timestamp": pd.Timestamp(df.index[-1]).isoformat()
+                }, f)
+            # Replaces an expired model for the same data; other fingerprints
+            # are only removed once they have expired too (in-progress
+            # saves of other threads are left alone)
+            parent = os.path.dirname(path)
+            for name in os.listdir(parent):
+                if ".tmp" not in name and name != key[2] and self._expired_on_disk(os.path.join(parent, name)):
+                    shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ Could not persist model for {ticker}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def preload(self) -> int:
+        """
+        Load every fresh stored model into memory (newest first, up to
+        `max_models`), e.g. before a pre-fork server forks its workers.
+        Returns the number of models loaded.
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        found = []
+        for ticker in os.listdir(self.root):
+            if not TICKER_PATTERN.match(ticker):
+                continue
+            ticker_dir = os.path.join(self.root, ticker)
+            for seq_len in (os.listdir(ticker_dir) if os.path.isdir(ticker_dir) else []):
+                if not seq_len.isdigit():
+                    continue
+                seq_dir = os.path.join(ticker_dir, seq_len)
+                for fingerprint in os.listdir(seq_dir):
+                    meta_path = os.path.join(seq_dir, fingerprint, "meta.json")
+                    if ".tmp-" not in fingerprint and os.path.exists(meta_path):
+                        found.append((os.path.getmtime(meta_path), (ticker, int(seq_len), fingerprint)))
+
+        loaded = 0
+        for _, key in sorted(found, reverse=True)[:self.max_models]:
+            if self._lookup(key) is None:
+                entry = self._load_from_disk(key)
+                if entry is None:
+                    continue
+                self._remember(key, entry)
+            loaded += 1
+        return loaded
+
+    def _expired_on_disk(self, path: str) -> bool:
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                return not self._is_fresh(json.load(f)["trained_at"])
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def _latest(self, ticker: str, seq_len: int) -> Optional[RegistryEntry]:
+        """
+        Most recently trained fresh model for (ticker, seq_len), whatever its data.
+        """
+        ticker = normalize_ticker(ticker)
+        with self._lock:
+            entries = [(k, e) for k, e in self._cache.items() if k[:2] == (ticker, seq_len)]
+        if entries:
+            key, entry = max(entries, key=lambda item: item[1].trained_at)
+            if self._is_fresh(entry.trained_at):
+                return entry
+            # Stale in memory; another process may have stored a newer model
+
+        parent = os.path.dirname(self._model_dir(ticker, seq_len, "_"))
+        if not os.path.isdir(parent):
+            return None
+        stored = []
+        for fingerprint in os.listdir(parent):
+            try:
+                with open(os.path.join(parent, fingerprint, "meta.json")) as f:
+                    stored.append((json.load(f)["trained_at"], fingerprint))
+            except (OSError, ValueError, KeyError):
+                continue  # in-progress save or unreadable entry
+        for _, fingerprint in sorted(stored, reverse=True):
+            entry = self._load_from_disk((ticker, seq_len, fingerprint))
+            if entry is not None:
+                return entry
+        return None
+
+    def _try_update(self, entry: RegistryEntry, df: pd.DataFrame) -> Optional[SimpleEnsemble]:
+        """
+        A copy of `entry`'s model updated with the bars `df` appends to its
+        history, or None when `df` is not such an extension. The cached
+        model itself is left untouched for concurrent readers of its key.
+        """
+        df = as_frame(df)
+        model = entry.model
+        if model.history is None or model.history.empty:
+            return None
+        last = model.history.index[-1]
+        if last not in df.index:
+            return None
+
+        # The overlap must match what the model was trained on
+        overlap = df.loc[:last, OHLCV_COLUMNS].tail(model.seq_len + 1)
+        seen = model.history[OHLCV_COLUMNS].tail(len(overlap))
+        if len(overlap) != len(seen) or not (overlap.values == seen.values).all():
+            return None
+
+        new_rows = df[df.index > last]
+        if new_rows.empty or len(new_rows) > self.max_update_rows:
+            return None
+        model = copy.deepcopy(model)
+        model.update(new_rows)
+        return model
+
+    def _get_entry(self, key) -> Optional[RegistryEntry]:
+        entry = self._lookup(key)
+        if entry is None:
+            entry = self._load_from_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+        return entry
+
+    def get(self, ticker: str, df: pd.DataFrame, seq_len: int = 30) -> Optional[SimpleEnsemble]:
+        """
+        Return a stored model for exactly this data, or None.
+        """
+        entry = self._get_entry((normalize_ticker(ticker), seq_len, data_fingerprint(df)))
+        return entry.model if entry else None
+
+    def get_or_train(self, ticker: str, df: pd.DataFrame, seq_len: int = 30,
+                     progress: Optional[Callable[[float, str], None]] = None) -> SimpleEnsemble:
+        """
+        Return a trained model for `df`, training and persisting one only if
+        no fresh model exists for this (ticker, seq_len, fingerprint).
+        `progress` is passed to SimpleEnsemble.train for full retrains.
+        """
+        return self.get_or_train_entry(ticker, df, seq_len, progress).model
+
+    def get_or_train_entry(self, ticker: str, df: pd.DataFrame, seq_len: int = 30,
+                           progress: Optional[Callable[[float, str], None]] = None) -> RegistryEntry:
+        """
+        get_or_train() with the registry entry, whose (fingerprint,
+        trained_at) identify the model version, e.g. for caches of results
+        derived from the model.
+        """
+        ticker = normalize_ticker(ticker)
+        key = (ticker, seq_len, data_fingerprint(df))
+        # One lock per (ticker, seq_len), not per fingerprint: the lock table
+        # stays bounded, and updates of one model's lineage never race
+        with self._key_lock(key[:2]):
+            entry = self._get_entry(key)
+            if entry is not None:
+                return entry
+
+            previous = self._latest(ticker, seq_len)
+            updated = self._try_update(previous, df) if previous is not None else None
+            if updated is not None:
+                # Updates keep the original training time, so max_age still
+                # forces a periodic full retrain
+                model, trained_at = updated, previous.trained_at
+                print(f"🔁 Updated model for {ticker} ({previous.fingerprint} → {key[2]})")
+                self._forget(previous)
+            else:
+                print(f"🔁 Training new model for {ticker} ({key[2]})")
+                # The learned combiner outlives retrains, so its residual
+                # history (and any member it skips) carries over. It is copied
+                # so training never mutates the one readers of `previous` use
+                combiner = copy.deepcopy(previous.model.combiner) if previous is not None else None
+                model = SimpleEnsemble(seq_len=seq_len, combiner=combiner or InverseErrorCombiner(),
+                                       forecaster=self.forecaster)
+                trained_at = time.time()
+                model.train(df, progress=progress)
+            entry = RegistryEntry(model=model, trained_at=trained_at, fingerprint=key[2])
+            if model.is_trained:
+                self._save_to_disk(key, entry, df)
+                self._remember(key, entry)
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_default_registry = None
+
+
+def get_registry() -> ModelRegistry:
+    """
+    Process-wide registry shared by the API and the prediction scripts.
+    """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ModelRegistry()
+    return _default_registry
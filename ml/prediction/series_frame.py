@@ -0,0 +1,194 @@
+# series_frame.py
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _nanoseconds(index) -> np.ndarray:
+    # Whatever the index's unit; timezone-aware indexes are stored as UTC
+    return np.asarray(pd.DatetimeIndex(index), dtype='datetime64[ns]').view(np.int64)
+
+
+class SeriesFrame:
+    """
+    Compact in-memory time series: one C-contiguous float32 (rows x columns)
+    block and an int64 nanosecond date index (timezone-aware dates are
+    kept as UTC).
+
+    Columns, row ranges and column runs are NumPy views of the block, and
+    torch() wraps it with torch.from_numpy, so handing a series to the
+    models never copies it. The ensemble's prep methods, the registry and
+    the stress tests accept a SeriesFrame wherever they take a DataFrame.
+    """
+
+    def __init__(self, index, values: np.ndarray, columns: Sequence[str] = OHLCV_COLUMNS):
+        values = np.ascontiguousarray(values, dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != len(columns):
+            raise ValueError(f"values must be (rows, {len(columns)}), got {values.shape}")
+        index = np.asarray(index)
+        if index.dtype != np.int64:
+            index = _nanoseconds(index)
+        if len(index) != len(values):
+            raise ValueError("index and values must have the same number of rows")
+        self._index = np.ascontiguousarray(index, dtype=np.int64)
+        self.values = values
+        self.columns = list(columns)
+        self._positions = {c: i for i, c in enumerate(self.columns)}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> "SeriesFrame":
+        columns = list(df.columns if columns is None else columns)
+        return cls(_nanoseconds(df.index), df[columns].to_numpy(dtype=np.float32), columns)
+
+    @classmethod
+    def from_arrays(cls, index, columns: Dict[str, np.ndarray]) -> "SeriesFrame":
+        """
+        Build from per-column arrays, written straight into the float32 block.
+        """
+        values = np.empty((len(index), len(columns)), dtype=np.float32)
+        for i, column in enumerate(columns.values()):
+            values[:, i] = column
+        return cls(_nanoseconds(index), values, list(columns))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self._index.nbytes
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        # Wraps the int64 buffer without copying it
+        return pd.DatetimeIndex(self._index.view('datetime64[ns]'), copy=False)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.values[:, self._positions[column]]
+
+    def select(self, columns: Sequence[str]) -> np.ndarray:
+        """
+        (rows, len(columns)) values. A view when the columns are a run of
+        adjacent columns in block order (e.g. all of OHLCV), else a copy.
+        """
+        positions = [self._positions[c] for c in columns]
+        first = positions[0]
+        if positions == list(range(first, first + len(positions))):
+            return self.values[:, first:first + len(positions)]
+        return self.values[:, positions]
+
+    def rows(self, start: Optional[int] = None, stop: Optional[int] = None) -> "SeriesFrame":
+        frame = SeriesFrame.__new__(SeriesFrame)
+        frame._index, frame.values = self._index[start:stop], self.values[start:stop]
+        frame.columns, frame._positions = self.columns, self._positions
+        return frame
+
+    def tail(self, n: int) -> "SeriesFrame":
+        return self.rows(max(len(self) - n, 0))
+
+    def torch(self):
+        # torch is only imported by callers that need tensors
+        import torch
+        return torch.from_numpy(self.values)
+
+    def returns(self, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Simple returns of `columns` in float64, the same rows as
+        df[columns].pct_change().dropna().values.
+        """
+        prices = self.select(columns or self.columns).astype(np.float64)
+        rets = prices[1:] / prices[:-1] - 1
+        return rets[~np.isnan(rets).any(axis=1)]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns)
+
+
+def column_block(data, columns: Sequence[str]) -> np.ndarray:
+    """
+    (rows, len(columns)) values of a SeriesFrame (a view where possible)
+    or a DataFrame.
+    """
+    if isinstance(data, SeriesFrame):
+        return data.select(columns)
+    return data[list(columns)].values
+
+
+def as_frame(data) -> pd.DataFrame:
+    return data.to_frame() if isinstance(data, SeriesFrame) else data
+
+
+# Memory/throughput benchmark against the DataFrame path
+if __name__ == "__main__":
+    import io
+    import time
+    import contextlib
+    import tracemalloc
+    from ml.prediction.ensemble_model import SimpleEnsemble
+    # The class the models check against, not this script's __main__ copy
+    from ml.prediction import series_frame as shared
+
+    def ohlcv_arrays(rows, rng):
+        close = 100 + np.cumsum(rng.normal(0, 1, rows))
+        return {
+            'open': close + rng.normal(0, 0.5, rows),
+            'high': close + 1,
+            'low': close - 1,
+            'close': close,
+            'volume': rng.integers(1000, 5000, rows).astype(np.float64)
+        }
+
+    def measure(fn, repeats):
+        tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeats):
+                fn()
+        elapsed = (time.perf_counter() - start) / repeats
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak
+
+    rng = np.random.default_rng(0)
+    model = SimpleEnsemble(seq_len=30, forecaster=None)
+    arrays = ohlcv_arrays(300, rng)
+    dates = pd.date_range("2022-01-01", periods=300, freq="D")
+    model.train(pd.DataFrame(arrays, index=dates))
+
+    for rows, repeats in ((100, 200), (10_000, 20), (1_000_000, 3)):
+        arrays = ohlcv_arrays(rows, rng)
+        dates = pd.date_range("2000-01-01", periods=rows, freq="min")
+
+        def frame_path():
+            df = pd.DataFrame(arrays, index=dates)
+            return model.prepare_xgb(df), model.prepare_lstm(df)
+
+        def series_path():
+            frame = shared.SeriesFrame.from_arrays(dates, arrays)
+            return model.prepare_xgb(frame), model.prepare_lstm(frame)
+
+        frame_time, frame_peak = measure(frame_path, repeats)
+        series_time, series_peak = measure(series_path, repeats)
+        df = pd.DataFrame(arrays, index=dates)
+        frame = shared.SeriesFrame.from_arrays(dates, arrays)
+        assert np.allclose(model.prepare_xgb(df), model.prepare_xgb(frame), rtol=1e-5)
+        print(f"{rows:>9} rows | container {df.memory_usage(index=True).sum() / 1e6:8.2f} MB vs {frame.nbytes / 1e6:8.2f} MB"
+              f" | prep {frame_time * 1e3:9.2f} ms vs {series_time * 1e3:9.2f} ms"
+              f" | peak {frame_peak / 1e6:8.2f} MB vs {series_peak / 1e6:8.2f} MB")
+
+    # One prediction request end to end
+    arrays = ohlcv_arrays(100, rng)
+    dates = pd.date_range(end="2024-01-01", periods=100, freq="D")
+    frame_time, _ = measure(lambda: model.predict(pd.DataFrame(arrays, index=dates)), 50)
+    series_time, _ = measure(lambda: model.predict(shared.SeriesFrame.from_arrays(dates, arrays)), 50)
+    print(f"predict(): DataFrame {frame_time * 1e3:.2f} ms vs SeriesFrame {series_time * 1e3:.2f} ms")
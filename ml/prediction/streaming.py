@@ -0,0 +1,569 @@
+# streaming.py
+
+import json
+import time
+import asyncio
+import itertools
+import numpy as np
+import pandas as pd
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from statistics import NormalDist
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Mapping, Optional, Union
+
+from ml.prediction.ensemble_model import SimpleEnsemble
+from ml.prediction.series_frame import OHLCV_COLUMNS
+
+# One-sided normal quantiles and tail densities for parametric VaR / ES
+_Z95, _Z99 = NormalDist().inv_cdf(0.05), NormalDist().inv_cdf(0.01)
+_ES95 = NormalDist().pdf(_Z95) / 0.05
+
+
+@dataclass
+class Bar:
+    ticker: str
+    timestamp: pd.Timestamp
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    # time.perf_counter() when the source received the bar
+    received_at: float = 0.0
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "Bar":
+        return cls(
+            ticker=str(record['ticker']).upper(),
+            timestamp=pd.Timestamp(record['timestamp']),
+            **{c: float(record[c]) for c in OHLCV_COLUMNS},
+            received_at=time.perf_counter()
+        )
+
+    def to_dict(self) -> dict:
+        record = {c: getattr(self, c) for c in OHLCV_COLUMNS}
+        return dict(record, ticker=self.ticker, timestamp=self.timestamp.isoformat())
+
+
+@dataclass
+class StreamUpdate:
+    ticker: str
+    timestamp: pd.Timestamp
+    close: float
+    predictions: Dict[str, float]
+    weights: Dict[str, float]
+    risk: Dict[str, float]
+    # Source receipt to hand-off to subscribers, in milliseconds
+    latency_ms: float = 0.0
+    stages_ms: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return dict(asdict(self), timestamp=self.timestamp.isoformat())
+
+
+class RingBuffer:
+    """
+    Last `capacity` rows of a (rows, width) series, float32 by default.
+
+    Every row is written twice, at i and i + capacity, so the latest n rows
+    are always one contiguous slice: last(n) is a view that can go straight
+    to torch.from_numpy. A view is only valid until the next append.
+    """
+
+    def __init__(self, capacity: int, width: int, dtype=np.float32):
+        self.capacity = capacity
+        self._data = np.zeros((2 * capacity, width), dtype=dtype)
+        self._next = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, row):
+        self._data[self._next] = row
+        self._data[self._next + self.capacity] = row
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def last(self, n: Optional[int] = None) -> np.ndarray:
+        n = self.count if n is None else min(n, self.count)
+        end = self._next + self.capacity
+        return self._data[end - n:end]
+
+
+class TickerState:
+    """
+    Rolling state of one ticker, updated in O(1) per bar.
+
+    Holds the last seq_len + 1 OHLCV bars, running sums of close and volume
+    over the window prepare_xgb(df, last_only=True) averages (the seq_len
+    bars before the newest), and running sums of the last `risk_window`
+    simple returns. Sums are recomputed exactly every `resync` bars so
+    float error cannot accumulate.
+    """
+
+    def __init__(self, seq_len: int, risk_window: int = 60, resync: int = 1000):
+        self.seq_len = seq_len
+        self.bars = RingBuffer(seq_len + 1, len(OHLCV_COLUMNS))
+        self.returns = RingBuffer(risk_window, 1, np.float64)
+        self.window_sum = np.zeros(2)
+        self.return_sums = np.zeros(2)
+        self.resync = resync
+        self.last_timestamp = None
+        # Typical time between bars, once known (see StreamingPipeline.prime)
+        self.spacing: Optional[pd.Timedelta] = None
+        self._since_resync = 0
+
+    def push(self, timestamp: pd.Timestamp, row: np.ndarray):
+        bars = self.bars
+        if len(bars):
+            previous = bars.last(1)[0]
+            # The previous newest bar enters the feature window ...
+            self.window_sum += previous[[3, 4]]
+            # ... and the oldest bar leaves it once the window is full
+            if len(bars) == bars.capacity:
+                self.window_sum -= bars.last()[0][[3, 4]]
+            ret = float(row[3]) / float(previous[3]) - 1
+            if len(self.returns) == self.returns.capacity:
+                dropped = float(self.returns.last()[0][0])
+                self.return_sums -= (dropped, dropped * dropped)
+            self.returns.append(ret)
+            self.return_sums += (ret, ret * ret)
+        bars.append(row)
+        self.last_timestamp = timestamp
+
+        self._since_resync += 1
+        if self._since_resync >= self.resync:
+            self._since_resync = 0
+            window = bars.last()[:-1].astype(np.float64)
+            self.window_sum = window[:, [3, 4]].sum(axis=0)
+            rets = self.returns.last()[:, 0]
+            self.return_sums = np.array([rets.sum(), (rets ** 2).sum()])
+
+    @property
+    def ready(self) -> bool:
+        return len(self.bars) == self.bars.capacity
+
+    def xgb_features(self) -> np.ndarray:
+        # Same (1, 2) row as prepare_xgb(df, last_only=True)
+        return (self.window_sum / self.seq_len)[np.newaxis]
+
+    def lstm_window(self) -> torch.Tensor:
+        # Same (1, seq_len, 5) input as prepare_lstm(df, last_only=True), without a copy
+        return torch.from_numpy(self.bars.last()[:-1])[None]
+
+    def risk(self) -> Dict[str, float]:
+        """
+        One-bar parametric (normal) VaR 95/99 and expected shortfall of the
+        rolling returns, on the same return scale as simple_stress_test.
+        """
+        n = len(self.returns)
+        if n < 2:
+            return {}
+        mean = self.return_sums[0] / n
+        std = float(np.sqrt(max(self.return_sums[1] / n - mean * mean, 0.0) * n / (n - 1)))
+        return {
+            'var_95': float(mean + _Z95 * std),
+            'var_99': float(mean + _Z99 * std),
+            'expected_shortfall': float(mean - _ES95 * std),
+            'window': n
+        }
+
+
+class LatencyStats:
+    """
+    Latencies of the last `size` bars, in milliseconds.
+    """
+
+    def __init__(self, size: int = 10_000):
+        self._values = RingBuffer(size, 1, np.float64)
+        self.total = 0
+
+    def add(self, ms: float):
+        self._values.append(ms)
+        self.total += 1
+
+    def summary(self) -> Dict[str, float]:
+        values = self._values.last()[:, 0]
+        if len(values) == 0:
+            return {'count': 0}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {'count': self.total, 'p50_ms': float(p50), 'p95_ms': float(p95),
+                'p99_ms': float(p99), 'max_ms': float(values.max())}
+
+
+class Subscription:
+    """
+    Bounded queue of StreamUpdates for one consumer; iterate it with
+    `async for`. With policy "block" a full queue stalls the pipeline (and
+    through it the source), so no update is lost. With "drop_oldest" the
+    oldest queued update is discarded instead, for consumers that only
+    need the latest state; `dropped` counts them.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, maxsize: int = 256, policy: str = "block"):
+        if policy not in ("block", "drop_oldest"):
+            raise ValueError("Unsupported policy. Choose 'block' or 'drop_oldest'.")
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.policy = policy
+        self.dropped = 0
+
+    async def put(self, update: StreamUpdate):
+        if self.policy == "drop_oldest":
+            while self.queue.full():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(update)
+        else:
+            await self.queue.put(update)
+
+    async def close(self):
+        if self.policy == "drop_oldest" and self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        await self.queue.put(self._CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> StreamUpdate:
+        update = await self.queue.get()
+        if update is self._CLOSED:
+            raise StopAsyncIteration
+        return update
+
+
+class FileReplaySource:
+    """
+    Replays bars from a CSV (ticker,timestamp,open,high,low,close,volume
+    header) or NDJSON file, one line at a time. `speed` paces the replay by
+    bar timestamps (1.0 = real time, 60.0 = a minute per second); None
+    replays as fast as the pipeline consumes.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = None):
+        self.path = path
+        self.speed = speed
+
+    async def __aiter__(self) -> AsyncIterator[Bar]:
+        with open(self.path) as f:
+            first = f.readline()
+            ndjson = first.lstrip().startswith("{")
+            header = None if ndjson else [c.strip() for c in first.split(",")]
+            previous = None
+            for line in itertools.chain([first] if ndjson else [], f):
+                if not line.strip():
+                    continue
+                record = json.loads(line) if ndjson else dict(zip(header, line.rstrip("\n").split(",")))
+                bar = Bar.from_dict(record)
+                if self.speed and previous is not None:
+                    gap = (bar.timestamp - previous).total_seconds() / self.speed
+                    if gap > 0:
+                        await asyncio.sleep(gap)
+                    bar.received_at = time.perf_counter()
+                previous = bar.timestamp
+                yield bar
+                # Let subscribers and other tasks run between bars
+                await asyncio.sleep(0)
+
+
+class SocketSource:
+    """
+    Local socket stand-in for a market data feed: producers connect to a
+    Unix socket (`path`) or TCP port and write NDJSON bars. Incoming bars
+    wait in a queue of at most `max_pending`; when it is full the
+    connection handlers stop reading, so producers are slowed by socket
+    flow control instead of the pipeline buffering without bound.
+    """
+
+    _END = object()
+
+    def __init__(self, path: Optional[str] = None, host: str = "127.0.0.1", port: int = 0,
+                 max_pending: int = 1024):
+        self.path = path
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.errors = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._server = None
+        self._connections = set()
+
+    async def start(self) -> "SocketSource":
+        self._queue = asyncio.Queue(self.max_pending)
+        if self.path:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    bar = Bar.from_dict(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    self.errors += 1
+                    continue
+                await self._queue.put(bar)
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def close(self):
+        """
+        Stop accepting connections. The iterator ends once the connected
+        producers have disconnected and their bars are consumed.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._queue.put(self._END)
+
+    async def __aiter__(self) -> AsyncIterator[Bar]:
+        if self._server is None:
+            await self.start()
+        while True:
+            bar = await self._queue.get()
+            if bar is self._END:
+                return
+            yield bar
+
+
+async def send_bars(bars: Iterable[dict], path: Optional[str] = None,
+                    host: str = "127.0.0.1", port: int = 0):
+    """
+    Write bars to a SocketSource as NDJSON, waiting for the socket to drain
+    so a slow pipeline slows the writer down.
+    """
+    if path:
+        _, writer = await asyncio.open_unix_connection(path)
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+    try:
+        for record in bars:
+            writer.write((json.dumps(record) + "\n").encode("utf-8"))
+            await writer.drain()
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+Models = Union[Mapping[str, SimpleEnsemble], Callable[[str], Optional[SimpleEnsemble]]]
+
+
+class StreamingPipeline:
+    """
+    Bar-by-bar predictions and risk numbers for a stream of OHLCV bars.
+
+    Each ticker keeps a TickerState, so a bar costs one ring-buffer write,
+    a few running-sum updates and one XGBoost and LSTM inference on the
+    latest window, never a rebuild of the series. `models` maps a ticker to
+    its trained SimpleEnsemble (a dict or a callable, e.g. a registry
+    lookup); a model's own history primes the ticker's buffers, and bars
+    for tickers without a model are skipped. `forecast` includes the
+    forecaster slot (cheap for "fourier", tens of ms per bar for Prophet).
+
+    Windows are assumed to be contiguous bars. Live bars at or before the
+    newest primed bar are skipped as overlap; a bar arriving more than
+    `max_gap` typical bar spacings after the previous one (e.g. a model
+    whose history ends days before the stream starts) restarts the
+    ticker's buffers from that bar instead of windowing across the gap.
+
+    Inference runs on one worker thread so the event loop stays free to
+    read the source. The source is only read as fast as updates are
+    processed and handed to subscribers, so a blocking subscriber's full
+    queue propagates back to the source.
+    """
+
+    def __init__(self, models: Models, risk_window: int = 60, forecast: bool = True,
+                 max_gap: float = 5.0):
+        self.models = models
+        self.risk_window = risk_window
+        self.forecast = forecast
+        self.max_gap = max_gap
+        self.states: Dict[str, TickerState] = {}
+        self.subscribers: List[Subscription] = []
+        self.latency = LatencyStats()
+        self.skipped = 0
+        self.gaps = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-infer")
+
+    def _model(self, ticker: str) -> Optional[SimpleEnsemble]:
+        if callable(self.models):
+            return self.models(ticker)
+        return self.models.get(ticker)
+
+    def subscribe(self, maxsize: int = 256, policy: str = "block") -> Subscription:
+        subscription = Subscription(maxsize, policy)
+        self.subscribers.append(subscription)
+        return subscription
+
+    def prime(self, ticker: str, df: pd.DataFrame):
+        """
+        Fill a ticker's buffers from its most recent bars.
+        """
+        model = self._model(ticker)
+        state = TickerState(model.seq_len, self.risk_window)
+        tail = df.tail(max(model.seq_len + 1, self.risk_window + 1))
+        for timestamp, row in zip(tail.index, tail[OHLCV_COLUMNS].to_numpy(dtype=np.float32)):
+            state.push(timestamp, row)
+        if len(tail) > 1:
+            state.spacing = pd.Series(tail.index).diff().median()
+        self.states[ticker] = state
+
+    def process(self, bar: Bar) -> Optional[StreamUpdate]:
+        """
+        Apply one bar and return the resulting update, or None if the bar
+        is skipped (no model, out of order, or the window is not full yet).
+        """
+        model = self._model(bar.ticker)
+        if model is None or not model.is_trained:
+            self.skipped += 1
+            return None
+        state = self.states.get(bar.ticker)
+        if state is None:
+            if model.history is not None:
+                self.prime(bar.ticker, model.history)
+                state = self.states[bar.ticker]
+            else:
+                state = self.states[bar.ticker] = TickerState(model.seq_len, self.risk_window)
+        if state.last_timestamp is not None and bar.timestamp <= state.last_timestamp:
+            self.skipped += 1
+            return None
+        if state.spacing is not None and bar.timestamp - state.last_timestamp > self.max_gap * state.spacing:
+            self.gaps += 1
+            spacing = state.spacing
+            state = self.states[bar.ticker] = TickerState(model.seq_len, self.risk_window)
+            state.spacing = spacing
+
+        start = time.perf_counter()
+        state.push(bar.timestamp, np.array([getattr(bar, c) for c in OHLCV_COLUMNS], dtype=np.float32))
+        if not state.ready:
+            return None
+        features = time.perf_counter()
+        result = model.predict_features(state.xgb_features(), state.lstm_window(),
+                                        bar.timestamp, bar.close, forecast=self.forecast)
+        inference = time.perf_counter()
+        return StreamUpdate(
+            ticker=bar.ticker,
+            timestamp=bar.timestamp,
+            close=bar.close,
+            predictions={'ensemble': result.ensemble, 'xgb': result.xgb,
+                         'lstm': result.lstm, 'prophet': result.prophet},
+            weights=result.weights or {},
+            risk=state.risk(),
+            stages_ms={'queue': (start - bar.received_at) * 1e3,
+                       'features': (features - start) * 1e3,
+                       'inference': (inference - features) * 1e3}
+        )
+
+    async def publish(self, update: StreamUpdate, bar: Bar):
+        update.latency_ms = (time.perf_counter() - bar.received_at) * 1e3
+        self.latency.add(update.latency_ms)
+        for subscription in self.subscribers:
+            await subscription.put(update)
+
+    async def run(self, source: AsyncIterator[Bar]):
+        """
+        Consume `source` until it ends, then close every subscription.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            async for bar in source:
+                update = await loop.run_in_executor(self._executor, self.process, bar)
+                if update is not None:
+                    await self.publish(update, bar)
+        finally:
+            for subscription in self.subscribers:
+                await subscription.close()
+
+    def stats(self) -> dict:
+        return dict(self.latency.summary(), skipped=self.skipped, gaps=self.gaps, tickers=len(self.states),
+                    dropped={i: s.dropped for i, s in enumerate(self.subscribers) if s.dropped})
+
+
+# Example: replay a file and stream over a local socket, with latency stats
+if __name__ == "__main__":
+    import io
+    import os
+    import contextlib
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    tickers, history_rows, live_rows = ["AAPL", "MSFT", "NVDA"], 200, 300
+    models, live = {}, []
+    for i, ticker in enumerate(tickers):
+        rows = history_rows + live_rows
+        close = 100 * np.cumprod(1 + rng.normal(0.0005, 0.015, rows))
+        df = pd.DataFrame({
+            'open': close * (1 + rng.normal(0, 0.003, rows)),
+            'high': close * 1.01,
+            'low': close * 0.99,
+            'close': close,
+            'volume': rng.integers(1_000_000, 5_000_000, rows).astype(float)
+        }, index=pd.date_range("2022-01-03", periods=rows, freq="D"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            model = SimpleEnsemble(seq_len=30, forecaster="fourier")
+            model.train(df.iloc[:history_rows])
+        models[ticker] = model
+        live.extend(dict(ticker=ticker, timestamp=ts.isoformat(), **row)
+                    for ts, row in zip(df.index[history_rows:], df.iloc[history_rows:].to_dict('records')))
+    live.sort(key=lambda r: r['timestamp'])
+
+    async def consume(subscription, name, delay=0.0):
+        count = 0
+        async for update in subscription:
+            count += 1
+            if delay:
+                await asyncio.sleep(delay)
+        print(f"  {name}: {count} updates, {subscription.dropped} dropped")
+
+    async def replay_demo(path):
+        pipeline = StreamingPipeline(models)
+        consumers = [consume(pipeline.subscribe(), "blocking subscriber"),
+                     consume(pipeline.subscribe(maxsize=8, policy="drop_oldest"), "slow latest-only subscriber", 0.01)]
+        start = time.perf_counter()
+        await asyncio.gather(pipeline.run(FileReplaySource(path)), *consumers)
+        elapsed = time.perf_counter() - start
+        print(f"File replay: {len(live)} bars in {elapsed:.2f}s ({len(live) / elapsed:,.0f} bars/s) | {pipeline.stats()}")
+
+    async def socket_demo():
+        pipeline = StreamingPipeline(models)
+        subscription = pipeline.subscribe(maxsize=16)
+        source = await SocketSource(max_pending=64).start()
+        last = {}
+
+        async def watch():
+            async for update in subscription:
+                last[update.ticker] = update
+
+        async def produce():
+            await send_bars(live, port=source.port)
+            await source.close()
+
+        start = time.perf_counter()
+        await asyncio.gather(pipeline.run(source), produce(), watch())
+        elapsed = time.perf_counter() - start
+        print(f"Socket feed: {len(live)} bars in {elapsed:.2f}s | {pipeline.stats()}")
+        update = last["AAPL"]
+        print(f"  AAPL {update.timestamp.date()} close {update.close:.2f} → ensemble {update.predictions['ensemble']:.2f}"
+              f" | VaR95 {update.risk['var_95']:.4f} | stages {({k: round(v, 3) for k, v in update.stages_ms.items()})}")
+
+    path = os.path.join(tempfile.mkdtemp(), "bars.csv")
+    with open(path, "w") as f:
+        f.write("ticker,timestamp," + ",".join(OHLCV_COLUMNS) + "\n")
+        for r in live:
+            f.write(f"{r['ticker']},{r['timestamp']}," + ",".join(str(r[c]) for c in OHLCV_COLUMNS) + "\n")
+
+    asyncio.run(replay_demo(path))
+    asyncio.run(socket_demo())
@@ -1,9 +1,13 @@
 # stress_testing.py
 
+import hashlib
 import numpy as np
 import pandas as pd
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
+
+from ml.prediction.series_frame import SeriesFrame
 
 @dataclass
 class StressTestResult:
@@ -11,39 +15,191 @@ class StressTestResult:
     var_99: float
     expected_shortfall: float
     portfolio_returns: List[float]
+    # Binned simulated returns, when requested instead of the raw list
+    histogram: Optional[Dict[str, list]] = None
+
+
+_FACTOR_CACHE: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_FACTOR_CACHE_SIZE = 16
+
+
+def cholesky_factor(cov: np.ndarray) -> np.ndarray:
+    """
+    Factor L with L @ L.T == cov, cached by the covariance bytes so repeated
+    runs on the same portfolio skip the decomposition. Falls back to an
+    eigen-decomposition when cov is only positive semi-definite.
+    """
+    cov = np.ascontiguousarray(np.atleast_2d(cov), dtype=np.float64)
+    key = f"{cov.shape}:{hashlib.sha1(cov.tobytes()).hexdigest()}"
+    factor = _FACTOR_CACHE.get(key)
+    if factor is not None:
+        _FACTOR_CACHE.move_to_end(key)
+        return factor
+
+    try:
+        factor = np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        vals, vecs = np.linalg.eigh(cov)
+        factor = vecs * np.sqrt(np.clip(vals, 0.0, None))
+
+    _FACTOR_CACHE[key] = factor
+    while len(_FACTOR_CACHE) > _FACTOR_CACHE_SIZE:
+        _FACTOR_CACHE.popitem(last=False)
+    return factor
+
+
+class ReturnHistogram:
+    """
+    Fixed-bin histogram of simulated returns, accumulated chunk by chunk.
+    Bins span `center` +/- `width` standard deviations; returns outside
+    the range are counted in 'below' / 'above'.
+    """
+
+    def __init__(self, bins: int, center: float, scale: float, width: float = 6.0):
+        scale = scale if scale > 0 else 1e-12
+        self.edges = center + scale * np.linspace(-width, width, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+
+    def add(self, chunk: np.ndarray):
+        self.counts += np.histogram(chunk, self.edges)[0]
+        self.below += int((chunk < self.edges[0]).sum())
+        self.above += int((chunk > self.edges[-1]).sum())
+
+    def to_dict(self) -> Dict[str, list]:
+        return {
+            'edges': self.edges.tolist(),
+            'counts': self.counts.tolist(),
+            'below': self.below,
+            'above': self.above
+        }
+
+
+class LowerTail:
+    """
+    Streaming exact lower tail: keeps only the `k` smallest values seen, so
+    low quantiles and expected shortfall can be computed over any number of
+    samples in O(k + chunk) memory.
+    """
+
+    def __init__(self, k: int):
+        self.k = max(1, k)
+        self.values = np.empty(0)
+
+    def add(self, chunk: np.ndarray):
+        if len(self.values) == self.k:
+            chunk = chunk[chunk < self.values.max()]
+            if len(chunk) == 0:
+                return
+        combined = np.concatenate([self.values, chunk])
+        if len(combined) > self.k:
+            combined = np.partition(combined, self.k - 1)[:self.k]
+        self.values = combined
+
+    def percentile(self, q: float, n: int) -> float:
+        """
+        Same value as np.percentile(all_samples, q) (linear interpolation),
+        provided the tail holds the needed order statistics.
+        """
+        ordered = np.sort(self.values)
+        h = (n - 1) * q / 100.0
+        lo = int(np.floor(h))
+        hi = min(lo + 1, n - 1, len(ordered) - 1)
+        return float(ordered[lo] + (h - lo) * (ordered[hi] - ordered[lo]))
+
+    def mean_below(self, threshold: float) -> float:
+        below = self.values[self.values <= threshold]
+        return float(below.mean()) if len(below) else threshold
+
+
+def tail_size(num_simulations: int, q: float) -> int:
+    """
+    Number of smallest samples needed to evaluate the q-th percentile exactly.
+    """
+    return int(np.floor((num_simulations - 1) * q / 100.0)) + 2
+
+
+def monte_carlo_var(mu: np.ndarray, cov: np.ndarray, w: np.ndarray,
+                    num_simulations: int = 5000, seed: Optional[int] = None,
+                    max_chunk_bytes: int = 64 * 2 ** 20,
+                    keep_returns: bool = False,
+                    progress: Optional[Callable[[float, str], None]] = None,
+                    bins: int = 0) -> StressTestResult:
+    """
+    Chunked Monte Carlo VaR / expected shortfall for normal asset returns.
+
+    Draws are generated `chunk` paths at a time as z @ (L.T @ w) with a cached
+    Cholesky factor L, so each chunk is projected straight onto the weights
+    and the paths x assets matrix is never materialized. Only the lower tail
+    needed for VaR 95/99 and ES is retained. Results depend only on `seed`,
+    not on the chunk size. `progress(fraction, message)` is called after
+    every chunk. With `bins` > 0 the simulated returns are also summarized
+    as a ReturnHistogram, a fixed-size alternative to keep_returns.
+    """
+    mu = np.atleast_1d(np.asarray(mu, dtype=np.float64))
+    w = np.asarray(w, dtype=np.float64)
+    projection = cholesky_factor(cov).T @ w
+    drift = float(mu @ w)
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, min(num_simulations, max_chunk_bytes // (8 * len(w))))
+    tail = LowerTail(tail_size(num_simulations, 5))
+    histogram = ReturnHistogram(bins, drift, float(np.sqrt(projection @ projection))) if bins > 0 else None
+    kept = []
+
+    remaining = num_simulations
+    while remaining > 0:
+        n = min(chunk, remaining)
+        port_sim = drift + rng.standard_normal((n, len(w))) @ projection
+        tail.add(port_sim)
+        if histogram is not None:
+            histogram.add(port_sim)
+        if keep_returns:
+            kept.append(port_sim)
+        remaining -= n
+        if progress is not None:
+            progress(1.0 - remaining / num_simulations, "simulating")
+
+    var_95 = tail.percentile(5, num_simulations)
+    var_99 = tail.percentile(1, num_simulations)
+
+    return StressTestResult(
+        var_95=var_95,
+        var_99=var_99,
+        expected_shortfall=tail.mean_below(var_95),
+        portfolio_returns=np.concatenate(kept).tolist() if keep_returns else [],
+        histogram=histogram.to_dict() if histogram is not None else None
+    )
+
 
 def simple_stress_test(prices: pd.DataFrame,
                        weights: Dict[str, float],
-                       num_simulations: int = 5000) -> StressTestResult:
+                       num_simulations: int = 5000,
+                       seed: Optional[int] = None,
+                       keep_returns: bool = True,
+                       progress: Optional[Callable[[float, str], None]] = None,
+                       bins: int = 0) -> StressTestResult:
     """
     Perform a simple Monte Carlo–based stress test on a portfolio.
+    Pass keep_returns=False for large runs to skip the per-path returns list,
+    and bins=N for an N-bin histogram of the simulated returns instead.
     """
-    # Calculate daily returns
-    returns = prices.pct_change().dropna()
-
     tickers = list(weights.keys())
-    rets = returns[tickers].values
+    # Daily returns; `prices` may also be a SeriesFrame of ticker columns
+    if isinstance(prices, SeriesFrame):
+        rets = prices.returns(tickers)
+    else:
+        rets = prices.pct_change().dropna()[tickers].values
     w = np.array([weights[t] for t in tickers])
 
     # Mean & covariance
     mu = np.mean(rets, axis=0)
-    cov = np.cov(rets, rowvar=False)
+    cov = np.atleast_2d(np.cov(rets, rowvar=False))
 
     # Monte Carlo simulation
-    sim_rets = np.random.multivariate_normal(mu, cov, num_simulations)
-    port_sim = sim_rets.dot(w)
-
-    # Risk metrics
-    var_95 = np.percentile(port_sim, 5)
-    var_99 = np.percentile(port_sim, 1)
-    expected_shortfall = port_sim[port_sim <= var_95].mean()
-
-    return StressTestResult(
-        var_95=var_95,
-        var_99=var_99,
-        expected_shortfall=expected_shortfall,
-        portfolio_returns=port_sim.tolist()
-    )
+    return monte_carlo_var(mu, cov, w, num_simulations, seed=seed, keep_returns=keep_returns,
+                           progress=progress, bins=bins)
 
 # Example usage
 if __name__ == "__main__":
@@ -59,4 +215,15 @@ if __name__ == "__main__":
     result = simple_stress_test(prices, weights)
     print(f"VaR 95%: {result.var_95:.2%}")
     print(f"VaR 99%: {result.var_99:.2%}")
-    print(f"Expected Shortfall: {result.expected_shortfall:.2%}")
\ No newline at end of file
+    print(f"Expected Shortfall: {result.expected_shortfall:.2%}")
+
+    # Large run in bounded memory
+    import time
+    num_assets = 500
+    rng = np.random.default_rng(0)
+    A = rng.standard_normal((num_assets, num_assets)) * 0.01
+    cov = A @ A.T / num_assets
+    w = np.full(num_assets, 1 / num_assets)
+    start = time.perf_counter()
+    big = monte_carlo_var(np.zeros(num_assets), cov, w, num_simulations=10_000_000, seed=42, keep_returns=False)
+    print(f"10M paths x {num_assets} assets: VaR 95% {big.var_95:.4%} in {time.perf_counter() - start:.1f}s")
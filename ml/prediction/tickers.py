@@ -0,0 +1,26 @@
+# tickers.py
+
+import re
+from typing import List
+
+# Tickers become directory names in the model and OHLCV stores, so only
+# symbol characters are allowed (e.g. BRK.B, ^GSPC, EURUSD=X, BTC-USD)
+TICKER_PATTERN = re.compile(r"^[A-Z0-9.^=-]{1,15}$")
+
+
+def normalize_ticker(ticker) -> str:
+    """
+    Upper-cased `ticker`, or ValueError unless it matches TICKER_PATTERN.
+    """
+    if not isinstance(ticker, str) or not TICKER_PATTERN.match(ticker.upper()) or set(ticker) == {"."}:
+        raise ValueError(f"Invalid ticker: {ticker!r}")
+    return ticker.upper()
+
+
+def normalize_tickers(tickers) -> List[str]:
+    """
+    normalize_ticker() applied to a non-empty list, duplicates removed.
+    """
+    if not isinstance(tickers, list) or not tickers:
+        raise ValueError("'tickers' must be a non-empty list of ticker symbols")
+    return list(dict.fromkeys(normalize_ticker(t) for t in tickers))
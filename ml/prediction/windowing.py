@@ -0,0 +1,90 @@
+# windowing.py
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+def window_means(values: np.ndarray, seq_len: int, last_only: bool = False) -> np.ndarray:
+    """
+    Means of every trailing window of `seq_len` rows, matching
+    [values[i - seq_len:i].mean(axis=0) for i in range(seq_len, len(values))].
+
+    Built on a cumulative sum, so the cost is O(n) regardless of seq_len.
+    With last_only=True only the final window is reduced.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+    if n <= seq_len:
+        return np.empty((0,) + values.shape[1:])
+
+    if last_only:
+        return values[n - 1 - seq_len:n - 1].mean(axis=0, keepdims=True)
+
+    csum = np.cumsum(values, axis=0)
+    sums = csum[seq_len - 1:n - 1].copy()
+    sums[1:] -= csum[:n - 1 - seq_len]
+    return sums / seq_len
+
+
+def sliding_windows(values: np.ndarray, seq_len: int, last_only: bool = False) -> np.ndarray:
+    """
+    Zero-copy (n - seq_len, seq_len, features) view of trailing windows,
+    matching np.array([values[i - seq_len:i] for i in range(seq_len, len(values))]).
+
+    The view shares memory with `values`, so callers must not write to it.
+    """
+    values = np.ascontiguousarray(values)
+    n = values.shape[0]
+    if n <= seq_len:
+        return np.empty((0, seq_len) + values.shape[1:], dtype=values.dtype)
+
+    if last_only:
+        return values[n - 1 - seq_len:n - 1][np.newaxis]
+
+    row_stride = values.strides[0]
+    return as_strided(
+        values,
+        shape=(n - seq_len, seq_len) + values.shape[1:],
+        strides=(row_stride,) + values.strides
+    )
+
+
+# Benchmark against the original per-row loops
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+
+    seq_len = 30
+    for rows in (10_000, 100_000, 1_000_000):
+        data = np.random.rand(rows, 5) * 100
+        df = pd.DataFrame(data, columns=['open', 'high', 'low', 'close', 'volume'])
+
+        if rows <= 100_000:
+            t0 = time.perf_counter()
+            loop_means = np.array([
+                [df['close'].iloc[i - seq_len:i].mean(), df['volume'].iloc[i - seq_len:i].mean()]
+                for i in range(seq_len, rows)
+            ])
+            loop_xgb = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            loop_windows = np.array([data[i - seq_len:i] for i in range(seq_len, rows)], dtype=np.float32)
+            loop_lstm = time.perf_counter() - t0
+        else:
+            loop_means = loop_windows = None
+            loop_xgb = loop_lstm = float('nan')
+
+        t0 = time.perf_counter()
+        fast_means = window_means(df[['close', 'volume']].values, seq_len)
+        fast_xgb = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        fast_windows = sliding_windows(data.astype(np.float32), seq_len)
+        fast_lstm = time.perf_counter() - t0
+
+        if loop_means is not None:
+            assert np.allclose(loop_means, fast_means)
+            assert np.array_equal(loop_windows, fast_windows)
+
+        print(f"{rows:>9} rows | xgb loop {loop_xgb:8.3f}s vectorized {fast_xgb:8.4f}s"
+              f" | lstm loop {loop_lstm:8.3f}s view {fast_lstm:8.5f}s")
@@ -1,100 +1,572 @@
 #ml_api.py
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, copy_current_request_context, stream_with_context
 from flask_cors import CORS
 import sys
 import os
+import functools
+import json
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from jobs import JobManager
+from ml.prediction.tickers import normalize_ticker, normalize_tickers
 
 # Add ml folder to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'ml'))
 
-try:
-    from ml.prediction.ensemble_model import SimpleEnsemble
-    from ml.prediction.stress_testing import simple_stress_test
-    from ml.explainable_ai.shap_explainer import SHAPExplainer
-    from ml.nlp.finBert import FinBertSentiment
-    print("✅ ML modules imported successfully")
-except ImportError as e:
-    print(f"⚠️ Warning: Could not import ML modules: {e}")
-    print("Continuing with fallback mode...")
-
-import pandas as pd
-import numpy as np
-from datetime import datetime
+# Heavy ML libraries (torch, xgboost, prophet, transformers, shap) are only
+# imported when a model is first needed, so the server starts serving
+# /health immediately and each endpoint pays only for what it uses.
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:5173", "http://localhost:3000"])
 
-# Initialize models
-ensemble_model = None
-finbert_model = None
 
-try:
-    ensemble_model = SimpleEnsemble(seq_len=30)
-    finbert_model = FinBertSentiment()
-    print("✅ ML models initialized")
-except Exception as e:
-    print(f"⚠️ Could not initialize models: {e}")
+class LazyModel:
+    """
+    Builds a model with `factory()` on first use, once, from any thread.
+    A failed build is remembered so the endpoint falls back instead of
+    retrying on every request.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.value = None
+        self.error = None
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.loaded:
+            return self.value
+        with self._lock:
+            if not self.loaded:
+                try:
+                    self.value = self.factory()
+                    print(f"✅ {self.name} ready")
+                except Exception as e:
+                    self.error = str(e)
+                    print(f"⚠️ Could not initialize {self.name}: {e}")
+                self.loaded = True
+        return self.value
+
+    def status(self):
+        if not self.loaded:
+            return 'loading' if self._lock.locked() else 'not_loaded'
+        return 'ready' if self.error is None else 'failed'
+
+
+def _load_registry():
+    from ml.prediction.model_registry import get_registry
+    return get_registry()
+
+def _load_finbert():
+    from ml.nlp.finBert import FinBertSentiment
+    from ml.nlp.micro_batcher import MicroBatcher
+    from ml.nlp.sentiment_cache import SentimentCache
+    finbert = FinBertSentiment(
+        backend=os.environ.get("VANTAGE_FINBERT_BACKEND", "torch"),
+        cache=SentimentCache(
+            db_path=os.environ.get("VANTAGE_SENTIMENT_CACHE", "sentiment_cache.sqlite"),
+            lowercase=True
+        )
+    )
+    # Concurrent /ml/nlp-analysis requests share one forward pass; past
+    # VANTAGE_SENTIMENT_QUEUE waiting texts new requests get a 503
+    return MicroBatcher(finbert.predict_batch, max_batch_size=64, max_latency_ms=10,
+                        max_pending=int(os.environ.get("VANTAGE_SENTIMENT_QUEUE", "512"))), finbert
+
+def _load_stress():
+    from ml.prediction.stress_testing import simple_stress_test
+    from ml.prediction.scenario_engine import multi_horizon_var
+    return simple_stress_test, multi_horizon_var
+
+registry_model = LazyModel('ensemble registry', _load_registry)
+sentiment_model = LazyModel('FinBERT', _load_finbert)
+stress_model = LazyModel('stress testing', _load_stress)
+MODELS = [registry_model, sentiment_model, stress_model]
+
+class BoundedPool:
+    """
+    Per-process thread pool for CPU-heavy endpoints. At most `workers`
+    requests run and `max_queue` wait; anything beyond that is rejected
+    immediately so clients can back off instead of piling up.
+    """
+
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure(self):
+        # Created lazily (and again after fork) because threads do not
+        # survive into pre-forked worker processes
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix="cpu-bound")
+                    self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+                    self._in_flight = 0
+                    self._pid = os.getpid()
+
+    def try_acquire(self):
+        """
+        Take a slot without submitting work, e.g. for a streamed response
+        whose work runs after the view returns. Pair with release().
+        """
+        self._ensure()
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._in_flight += 1
+        return True
+
+    def try_submit(self, fn, *args, **kwargs):
+        if not self.try_acquire():
+            return None
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda _: self.release())
+        return future
+
+    def step(self, iterator, default=None):
+        """
+        next(iterator, default) computed on a pool thread, for a caller
+        that already holds a slot from try_acquire().
+        """
+        self._ensure()
+        return self._executor.submit(next, iterator, default).result()
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def depth(self):
+        return self._in_flight if self._pid == os.getpid() else 0
+
+cpu_pool = BoundedPool(
+    workers=int(os.environ.get("VANTAGE_CPU_THREADS", "2")),
+    max_queue=int(os.environ.get("VANTAGE_MAX_QUEUE", "8"))
+)
+
+def cpu_bound(view):
+    """
+    Run a view on the bounded CPU pool, answering 503 with Retry-After
+    when the pool's queue is full.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        future = cpu_pool.try_submit(copy_current_request_context(view), *args, **kwargs)
+        if future is None:
+            return busy_response()
+        return future.result()
+    return wrapper
+
+def busy_response():
+    return jsonify({
+        'error': 'Server busy, retry later',
+        'queue_depth': cpu_pool.depth()
+    }), 503, {'Retry-After': '1'}
+
+def start_warmup(models=None):
+    """
+    Load models on a background thread so the first real request does
+    not pay for them. Readiness is reported by /health/ready.
+    """
+    def warm():
+        for model in models or MODELS:
+            model.get()
+    thread = threading.Thread(target=warm, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
 
 @app.route('/health', methods=['GET'])
 def health_check():
+    finbert = sentiment_model.value[1] if sentiment_model.value else None
     return jsonify({
         'status': 'healthy',
-        'models_loaded': ensemble_model is not None,
+        'models_loaded': all(m.status() == 'ready' for m in MODELS),
+        'models': {m.name: m.status() for m in MODELS},
+        'sentiment_cache': finbert.cache.stats() if finbert and finbert.cache else None,
+        'cpu_queue_depth': cpu_pool.depth(),
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/health/live', methods=['GET'])
+def liveness():
+    # The process is up and serving requests
+    return jsonify({'status': 'alive'})
+
+@app.route('/health/ready', methods=['GET'])
+def readiness():
+    # Every model has finished loading (or failed and will use fallbacks)
+    ready = all(m.loaded for m in MODELS)
+    return jsonify({
+        'ready': ready,
+        'models': {m.name: m.status() for m in MODELS}
+    }), 200 if ready else 503
+
+def sample_ohlcv(ticker, periods=100):
+    """
+    Sample OHLCV series, seeded per ticker and day so the trained model can
+    be reused from the registry between requests.
+    """
+    import numpy as np
+    import pandas as pd
+    from ml.prediction.series_frame import SeriesFrame
+    today = datetime.now().date()
+    rng = np.random.default_rng(zlib.crc32(f"{ticker}:{today.isoformat()}".encode()))
+    dates = pd.date_range(end=today, periods=periods, freq='D')
+    return SeriesFrame.from_arrays(dates, {
+        'open': rng.random(periods) * 100 + 100,
+        'high': rng.random(periods) * 100 + 110,
+        'low': rng.random(periods) * 100 + 90,
+        'close': rng.random(periods) * 100 + 100,
+        'volume': rng.integers(1000, 5000, periods)
+    })
+
+def predict_sample(ticker):
+    try:
+        from ml.prediction.model_registry import get_registry
+        df = sample_ohlcv(ticker)
+        result = get_registry().get_or_train(ticker, df, seq_len=30).predict(df)
+        return {
+            'ticker': ticker,
+            'ensemble': float(result.ensemble),
+            'xgb': float(result.xgb),
+            'lstm': float(result.lstm),
+            'prophet': float(result.prophet),
+            'weights': result.weights,
+            'timestamp': result.timestamp.isoformat()
+        }
+    except Exception as e:
+        return {'ticker': ticker, 'error': str(e)}
+
+STREAM_FORMATS = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+def stream_format(data):
+    """
+    'ndjson' or 'sse' when the client asked for a streamed response, via
+    the body's "stream" field or the Accept header; otherwise None.
+    """
+    requested = data.get('stream')
+    if requested in STREAM_FORMATS:
+        return requested
+    accept = request.accept_mimetypes
+    for name, mimetype in STREAM_FORMATS.items():
+        if accept.best == mimetype:
+            return name
+    return None
+
+def stream_records(records, fmt, event='prediction'):
+    """
+    Encode dicts from `records` as NDJSON lines or SSE events as they are
+    produced, then a final 'done' record with the count and elapsed time.
+    """
+    start = time.perf_counter()
+    count = 0
+    for record in records:
+        count += 1
+        record = dict(record, elapsed_ms=round((time.perf_counter() - start) * 1e3, 1))
+        yield f"event: {event}\ndata: {json.dumps(record)}\n\n" if fmt == 'sse' else json.dumps(record) + "\n"
+    done = {'done': True, 'count': count, 'elapsed_ms': round((time.perf_counter() - start) * 1e3, 1)}
+    yield f"event: done\ndata: {json.dumps(done)}\n\n" if fmt == 'sse' else json.dumps(done) + "\n"
+
+_DONE = object()
+
+def pooled(records):
+    """
+    Yield from `records`, computing each item on a cpu_pool thread so a
+    stream competes for the same `workers` threads as every other
+    CPU-bound request.
+    """
+    iterator = iter(records)
+    try:
+        while True:
+            record = cpu_pool.step(iterator, _DONE)
+            if record is _DONE:
+                return
+            yield record
+    finally:
+        if hasattr(iterator, 'close'):
+            iterator.close()
+
+def streamed(records, fmt):
+    # The work happens while the body is sent, after the view has returned
+    # its pool slot, so the stream holds a slot of its own until it closes
+    # and runs each step on the pool's threads
+    if not cpu_pool.try_acquire():
+        return busy_response()
+    response = Response(stream_with_context(stream_records(pooled(records), fmt)),
+                        mimetype=STREAM_FORMATS[fmt],
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(cpu_pool.release)
+    return response
+
+def fallback_predictions(tickers):
+    return [{
+        'ticker': ticker,
+        'ensemble': 150.25,
+        'xgb': 148.50,
+        'lstm': 151.30,
+        'prophet': 150.95,
+        'timestamp': datetime.now().isoformat()
+    } for ticker in tickers]
+
+# Batches up to this size run in-process on the warm registry; a fresh
+# process pool would start with empty model caches and cost more than it saves
+IN_PROCESS_BATCH = int(os.environ.get("VANTAGE_IN_PROCESS_BATCH", "8"))
+MAX_PREDICT_TIMEOUT = float(os.environ.get("VANTAGE_MAX_PREDICT_TIMEOUT", "300"))
+
+def batch_options(data):
+    """
+    predict_many's max_workers and timeout from a request body, capped at
+    the CPU count and MAX_PREDICT_TIMEOUT. Raises ValueError on bad values.
+    """
+    cpus = os.cpu_count() or 1
+    max_workers = int(data.get('max_workers') or cpus)
+    timeout = float(data.get('timeout') or MAX_PREDICT_TIMEOUT)
+    if max_workers < 1 or timeout <= 0:
+        raise ValueError("'max_workers' and 'timeout' must be positive")
+    return {'max_workers': min(max_workers, cpus), 'timeout': min(timeout, MAX_PREDICT_TIMEOUT)}
+
+def iter_predictions(tickers, options):
+    """
+    Predictions in completion order: small batches in-process, larger ones
+    on predict_many's process pool.
+    """
+    if len(tickers) <= IN_PROCESS_BATCH:
+        for ticker in tickers:
+            yield predict_sample(ticker)
+        return
+    from real_predictions import predict_many
+    yield from predict_many(tickers, predict_fn=predict_sample, **options)
+
+PREDICTION_MODES = ('ensemble', 'batched')
+_batched_models = OrderedDict()
+_batched_lock = threading.Lock()
+# Training lock per ticker set, so only requests for the same portfolio wait
+_batched_training = {}
+
+def batched_predictions(tickers, max_models=8):
+    """
+    LSTM predictions for a whole portfolio from one BatchedLSTMForecaster:
+    one model shared by the tickers and one forward pass for all of them.
+    The forecaster is trained once per (tickers, data) and kept in a small
+    LRU, like the registry does for single-ticker ensembles.
+    """
+    from ml.prediction.batched_lstm import BatchedLSTMForecaster
+    from ml.prediction.model_registry import data_fingerprint
+    frames = {ticker: sample_ohlcv(ticker).to_frame() for ticker in dict.fromkeys(tickers)}
+    key = tuple((ticker, data_fingerprint(df)) for ticker, df in frames.items())
+    with _batched_lock:
+        forecaster = _batched_models.get(key)
+        training = _batched_training.setdefault(tuple(frames), threading.Lock())
+    if forecaster is None:
+        with training:
+            with _batched_lock:
+                forecaster = _batched_models.get(key)
+            if forecaster is None:
+                forecaster = BatchedLSTMForecaster(seq_len=30).fit(frames)
+    with _batched_lock:
+        _batched_models[key] = forecaster
+        _batched_models.move_to_end(key)
+        while len(_batched_models) > max_models:
+            evicted, _ = _batched_models.popitem(last=False)
+            tickers_evicted = tuple(ticker for ticker, _ in evicted)
+            if all(tuple(ticker for ticker, _ in k) != tickers_evicted for k in _batched_models):
+                _batched_training.pop(tickers_evicted, None)
+    preds = forecaster.predict(frames)
+    timestamp = datetime.now().isoformat()
+    return [{'ticker': ticker, 'mode': 'batched', 'lstm': preds[ticker], 'timestamp': timestamp}
+            if ticker in preds else {'ticker': ticker, 'error': 'Not enough data'}
+            for ticker in frames]
+
 @app.route('/ml/predictions', methods=['POST'])
+@cpu_bound
 def get_predictions():
+    """
+    Ensemble predictions for `tickers`. With "stream": "ndjson" or "sse"
+    (or the matching Accept header) each ticker is sent as soon as it
+    finishes, followed by a 'done' record; otherwise one JSON response.
+    "mode": "batched" returns LSTM-only predictions for the whole list from
+    one cross-ticker model (see batched_predictions).
+    """
     try:
         data = request.json
-        tickers = data.get('tickers', ['AAPL'])
-        
-        # Generate sample data
-        dates = pd.date_range(end=datetime.now(), periods=100, freq='D')
-        df = pd.DataFrame({
-            'open': np.random.rand(100) * 100 + 100,
-            'high': np.random.rand(100) * 100 + 110,
-            'low': np.random.rand(100) * 100 + 90,
-            'close': np.random.rand(100) * 100 + 100,
-            'volume': np.random.randint(1000, 5000, 100)
-        }, index=dates)
-        
-        if ensemble_model:
-            ensemble_model.train(df)
-            result = ensemble_model.predict(df)
-            
+        try:
+            tickers = normalize_tickers(data.get('tickers', ['AAPL']))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        fmt = stream_format(data)
+        mode = data.get('mode', 'ensemble')
+        if mode not in PREDICTION_MODES:
+            return jsonify({'error': f"'mode' must be one of {list(PREDICTION_MODES)}"}), 400
+        try:
+            options = batch_options(data)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+
+        if mode == 'batched':
+            if fmt is not None:
+                return streamed(batched_predictions(tickers), fmt)
+            return jsonify({'success': True, 'predictions': batched_predictions(tickers)})
+
+        if fmt is not None:
+            if registry_model.get():
+                return streamed(iter_predictions(tickers, options), fmt)
+            return streamed(fallback_predictions(tickers), fmt)
+
+        if registry_model.get():
+            order = {ticker: i for i, ticker in enumerate(tickers)}
+            predictions = sorted(iter_predictions(tickers, options), key=lambda p: order[p['ticker']])
+
             return jsonify({
                 'success': True,
-                'predictions': [{
-                    'ticker': tickers[0],
-                    'ensemble': float(result.ensemble),
-                    'xgb': float(result.xgb),
-                    'lstm': float(result.lstm),
-                    'prophet': float(result.prophet),
-                    'timestamp': result.timestamp.isoformat()
-                }]
+                'predictions': predictions
             })
         else:
             # Fallback
             return jsonify({
                 'success': True,
-                'predictions': [{
-                    'ticker': tickers[0],
-                    'ensemble': 150.25,
-                    'xgb': 148.50,
-                    'lstm': 151.30,
-                    'prophet': 150.95,
-                    'timestamp': datetime.now().isoformat()
-                }]
+                'predictions': fallback_predictions(tickers)
             })
             
     except Exception as e:
         print(f"Error in predictions: {e}")
         return jsonify({'error': str(e)}), 500
 
+FEATURE_LABELS = {'close_mean': 'Price Trend', 'volume_mean': 'Volume'}
+
+class ExplanationCache:
+    """
+    SHAP explainers keyed by model version (ticker, data fingerprint and
+    the registry entry's training time, so a retrained model on the same
+    data is a new version) and finished explanations keyed by
+    (version, rows), both LRU-bounded.
+    """
+
+    def __init__(self, max_explainers=32, max_results=256):
+        self.max_explainers = max_explainers
+        self.max_results = max_results
+        self._explainers = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get(store, key):
+        if key in store:
+            store.move_to_end(key)
+            return store[key]
+        return None
+
+    @staticmethod
+    def _put(store, key, value, limit):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > limit:
+            store.popitem(last=False)
+
+    def explainer(self, version, model):
+        from ml.explainable_ai.shap_explainer import SHAPExplainer
+        with self._lock:
+            explainer = self._get(self._explainers, version)
+            if explainer is None:
+                explainer = SHAPExplainer(model, ['open', 'high', 'low', 'close', 'volume'])
+                self._put(self._explainers, version, explainer, self.max_explainers)
+            return explainer
+
+    def result(self, key):
+        with self._lock:
+            return self._get(self._results, key)
+
+    def store(self, key, payload):
+        with self._lock:
+            self._put(self._results, key, payload, self.max_results)
+
+explanation_cache = ExplanationCache()
+
+def explain_ticker(ticker, rows=(-1,)):
+    """
+    Exact XGBoost attributions for the requested feature windows of a
+    ticker's model, from cache when this model version was explained before.
+    """
+    df = sample_ohlcv(ticker)
+    entry = registry_model.get().get_or_train_entry(ticker, df)
+    version = (ticker, entry.fingerprint, entry.trained_at)
+    cached = explanation_cache.result((version, rows))
+    if cached is not None:
+        return dict(cached, cached=True)
+
+    model = entry.model
+    shap_df = explanation_cache.explainer(version, model).explain_xgb(df, rows=rows)
+    contribs = shap_df[list(FEATURE_LABELS)]
+    importance = contribs.abs().mean()
+    importance = importance / importance.sum() if importance.sum() > 0 else importance
+    top = FEATURE_LABELS[importance.idxmax()]
+
+    payload = {
+        'success': True,
+        'ticker': ticker,
+        'model_version': version[1],
+        'base_value': float(shap_df['bias'].iloc[0]),
+        'rows': [{
+            'date': date.isoformat(),
+            'prediction': float(row.sum()),
+            'contributions': {name: float(row[name]) for name in FEATURE_LABELS}
+        } for date, row in shap_df.iterrows()],
+        'feature_importance': {FEATURE_LABELS[name]: float(v) for name, v in importance.items()},
+        'explanation': f"XGBoost prediction is driven mostly by {top.lower()} "
+                       f"({importance.max():.0%} of attribution)."
+    }
+    explanation_cache.store((version, rows), payload)
+    return dict(payload, cached=False)
+
+def explanation_plot(ticker, rows):
+    # Rendered off-screen and only on request; shap is imported here
+    import base64
+    import io
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    df = sample_ohlcv(ticker)
+    entry = registry_model.get().get_or_train_entry(ticker, df)
+    version = (ticker, entry.fingerprint, entry.trained_at)
+    explanation_cache.explainer(version, entry.model).explain_xgb(df, rows=rows, plot=True, show=False)
+    buf = io.BytesIO()
+    plt.gcf().savefig(buf, format='png', bbox_inches='tight')
+    plt.close('all')
+    return base64.b64encode(buf.getvalue()).decode('ascii')
+
 @app.route('/ml/explainable-ai', methods=['POST'])
+@cpu_bound
 def explain_predictions():
     try:
+        data = request.json or {}
+        try:
+            ticker = normalize_ticker(data.get('ticker', 'AAPL'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        rows = tuple(int(r) for r in data.get('rows', [-1]))
+
+        if registry_model.get():
+            try:
+                response = explain_ticker(ticker, rows)
+            except IndexError as e:
+                return jsonify({'error': str(e)}), 400
+            if data.get('plot'):
+                response['plot_png'] = explanation_plot(ticker, rows)
+            return jsonify(response)
+
+        # Fallback
         return jsonify({
             'success': True,
             'feature_importance': {
@@ -112,11 +584,33 @@ def explain_predictions():
 @app.route('/ml/nlp-analysis', methods=['POST'])
 def analyze_sentiment():
     try:
-        data = request.json
+        data = request.json or {}
+        texts = data.get('texts')
         text = data.get('text', 'Stock market shows positive growth')
+        sentiment_batcher = sentiment_model.get()[0] if sentiment_model.get() else None
         
-        if finbert_model:
-            sentiment, confidence = finbert_model.predict(text)
+        if texts is not None:
+            if not isinstance(texts, list) or not all(isinstance(t, str) and t.strip() for t in texts):
+                return jsonify({'error': "'texts' must be a list of non-empty strings"}), 400
+            if sentiment_batcher and len(texts) > sentiment_batcher.max_pending:
+                return jsonify({'error': f"At most {sentiment_batcher.max_pending} texts per request"}), 400
+            if sentiment_batcher:
+                scores = [f.result() for f in sentiment_batcher.submit_many(texts)]
+            else:
+                scores = [('Positive', 0.75)] * len(texts)
+            return jsonify({
+                'success': True,
+                'results': [{
+                    'sentiment': sentiment,
+                    'confidence': float(confidence),
+                    'text_analyzed': t
+                } for t, (sentiment, confidence) in zip(texts, scores)]
+            })
+
+        if not isinstance(text, str) or not text.strip():
+            return jsonify({'error': "'text' must be a non-empty string"}), 400
+        if sentiment_batcher:
+            sentiment, confidence = sentiment_batcher.submit(text).result()
             return jsonify({
                 'success': True,
                 'sentiment': sentiment,
@@ -130,41 +624,210 @@ def analyze_sentiment():
                 'confidence': 0.75,
                 'text_analyzed': text
             })
+    except queue.Full:
+        return busy_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Upper bounds on the request-sized parts of a stress test
+STRESS_LIMITS = {'num_simulations': 100_000, 'num_paths': 200_000, 'bins': 500,
+                 'horizons': 10, 'horizon_days': 2520}
+
+def bounded_int(data, name, default, limit=None):
+    """Integer field `name` of `data` in [1, limit or STRESS_LIMITS[name]], else ValueError."""
+    limit = limit or STRESS_LIMITS[name]
+    try:
+        value = int(data.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer")
+    if not 1 <= value <= limit:
+        raise ValueError(f"'{name}' must be between 1 and {limit}, got {value}")
+    return value
+
+def run_stress_test(data, progress=None):
+    """
+    Stress test for a request payload; shared by the endpoint and the
+    'stress' job kind. `progress(fraction, message)` follows both stages.
+    Requests with a `seed` are reproducible, including the input prices.
+    """
+    from jobs import scaled
+    simple_stress_test, multi_horizon_var = stress_model.get()
+    import numpy as np
+    import pandas as pd
+    from ml.prediction.series_frame import SeriesFrame
+
+    weights = data.get('weights', {'AAPL': 0.5, 'GOOGL': 0.5})
+    seed = data.get('seed')
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        raise ValueError("'seed' must be a non-negative integer")
+    num_simulations = bounded_int(data, 'num_simulations', 5000)
+    bins = bounded_int(data, 'bins', 50)
+    horizons = data.get('horizons')
+    if horizons:
+        if not isinstance(horizons, list) or len(horizons) > STRESS_LIMITS['horizons']:
+            raise ValueError(f"'horizons' must be a list of at most {STRESS_LIMITS['horizons']} day counts")
+        horizons = [bounded_int({'horizon': h}, 'horizon', None, STRESS_LIMITS['horizon_days'])
+                    for h in horizons]
+        num_paths = bounded_int(data, 'num_paths', 20000)
+
+    # The seed also draws the prices: the simulations alone being seeded
+    # would still give different results for the same request
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=datetime.now(), periods=100, freq='D')
+    prices = SeriesFrame(dates, rng.random((100, len(weights))) * 150 + 100, list(weights))
+
+    report = progress or (lambda fraction, message: None)
+    split = 0.5 if horizons else 1.0
+    result = simple_stress_test(
+        prices, weights,
+        num_simulations=num_simulations,
+        seed=seed,
+        keep_returns=False,
+        progress=scaled(report, 0.0, split),
+        bins=bins
+    )
+
+    response = {
+        'success': True,
+        'var_95': float(result.var_95),
+        'var_99': float(result.var_99),
+        'expected_shortfall': float(result.expected_shortfall)
+    }
+    if result.histogram is not None:
+        response['histogram'] = result.histogram
+
+    if horizons:
+        horizon_risk = multi_horizon_var(
+            prices, weights,
+            horizons=horizons,
+            num_paths=num_paths,
+            method=data.get('method', 'normal'),
+            seed=seed,
+            workers=1,
+            progress=scaled(report, split, 1.0)
+        )
+        response['horizons'] = {
+            str(h): {
+                'var_95': r.var_95,
+                'var_99': r.var_99,
+                'expected_shortfall': r.expected_shortfall
+            } for h, r in horizon_risk.items()
+        }
+    return response
+
 @app.route('/ml/stress-testing', methods=['POST'])
+@cpu_bound
 def stress_test():
     try:
-        data = request.json
-        weights = data.get('weights', {'AAPL': 0.5, 'GOOGL': 0.5})
-        
-        dates = pd.date_range(end=datetime.now(), periods=100, freq='D')
-        prices = pd.DataFrame({
-            ticker: np.random.rand(100) * 150 + 100
-            for ticker in weights.keys()
-        }, index=dates)
-        
-        result = simple_stress_test(prices, weights)
-        
-        return jsonify({
-            'success': True,
-            'var_95': float(result.var_95),
-            'var_99': float(result.var_99),
-            'expected_shortfall': float(result.expected_shortfall)
-        })
+        if stress_model.get() is None:
+            return jsonify({'error': f"Stress testing unavailable: {stress_model.error}"}), 503
+        return jsonify(run_stress_test(request.json))
+    except ValueError as e:
+        # Invalid parameters, e.g. a non-positive horizon or unknown method
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Job kinds run on the job pool's worker processes
+def train_job(params, progress):
+    from jobs import scaled
+    registry = registry_model.get()
+    if registry is None:
+        raise RuntimeError(f"Model registry unavailable: {registry_model.error}")
+    tickers = params['tickers']
+    trained = []
+    for i, ticker in enumerate(tickers):
+        df = sample_ohlcv(ticker)
+        model = registry.get_or_train(
+            ticker, df, seq_len=int(params.get('seq_len', 30)),
+            progress=scaled(progress, i / len(tickers), (i + 1) / len(tickers))
+        )
+        progress((i + 1) / len(tickers), ticker)
+        trained.append({'ticker': ticker, 'trained': bool(model.is_trained)})
+    return {'success': True, 'models': trained}
+
+def stress_job(params, progress):
+    if stress_model.get() is None:
+        raise RuntimeError(f"Stress testing unavailable: {stress_model.error}")
+    return run_stress_test(params, progress)
+
+job_manager = JobManager(max_workers=int(os.environ.get("VANTAGE_JOB_WORKERS", "1")))
+# Longest a single /ml/jobs/<id>/events stream stays open, in seconds
+JOB_EVENTS_TIMEOUT = float(os.environ.get("VANTAGE_JOB_EVENTS_TIMEOUT", "300"))
+job_manager.register('train', train_job)
+job_manager.register('stress', stress_job)
+
+@app.route('/ml/jobs', methods=['POST'])
+def submit_job():
+    data = request.json or {}
+    kind = data.get('kind')
+    params = data.get('params', {})
+    try:
+        if kind == 'train':
+            tickers = params.get('tickers') or [params.get('ticker', 'AAPL')]
+            params = {'tickers': normalize_tickers(tickers), 'seq_len': int(params.get('seq_len', 30))}
+        job_id, deduplicated = job_manager.submit(kind, params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'job_id': job_id,
+        'deduplicated': deduplicated,
+        'status_url': f"/ml/jobs/{job_id}",
+        'events_url': f"/ml/jobs/{job_id}/events",
+        'result_url': f"/ml/jobs/{job_id}/result"
+    }), 202
+
+@app.route('/ml/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(status)
+
+@app.route('/ml/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if status['state'] != 'succeeded':
+        return jsonify({'error': f"Job is {status['state']}", 'status': status}), 409
+    return jsonify(job_manager.result(job_id))
+
+@app.route('/ml/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    if job_manager.status(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    def stream():
+        # Bounded so abandoned streams don't hold a server thread forever;
+        # EventSource clients reconnect and resume from the current status
+        for status in job_manager.events(job_id, timeout=JOB_EVENTS_TIMEOUT):
+            yield f"data: {json.dumps(status)}\n\n"
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+@app.route('/ml/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    status = job_manager.cancel(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(status)
+
 if __name__ == '__main__':
     print("=" * 50)
     print("🚀 ML API Server Starting")
     print("=" * 50)
     print("Endpoints:")
     print("  GET  /health")
+    print("  GET  /health/live")
+    print("  GET  /health/ready")
     print("  POST /ml/predictions")
     print("  POST /ml/explainable-ai")
     print("  POST /ml/nlp-analysis")
     print("  POST /ml/stress-testing")
+    print("  POST /ml/jobs  (GET/DELETE /ml/jobs/<id>, /result, /events)")
     print("=" * 50)
+    # The debug reloader runs this module twice; only warm up in the serving child
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warmup()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
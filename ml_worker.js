@@ -0,0 +1,100 @@
+// ml_worker.js - Client for the persistent Python prediction worker (worker.py)
+const { spawn } = require("child_process");
+const readline = require("readline");
+const path = require("path");
+
+// One long-lived `python worker.py` speaking line-delimited JSON-RPC over
+// stdin/stdout. Requests carry ids, so several can be in flight at once;
+// the worker is restarted automatically if it exits.
+class PythonWorker {
+  constructor({ pythonPath = "python", script = path.join(__dirname, "worker.py"), timeout = 120000 } = {}) {
+    this.pythonPath = pythonPath;
+    this.script = script;
+    this.timeout = timeout;
+    this.nextId = 1;
+    this.pending = new Map();
+    this.proc = null;
+    this.ready = null;
+  }
+
+  start() {
+    if (this.proc) return this.ready;
+
+    const proc = spawn(this.pythonPath, [this.script], { cwd: path.dirname(this.script) });
+    this.proc = proc;
+    this.ready = new Promise((resolve, reject) => {
+      this.onReady = resolve;
+      this.onFailed = reject;
+    });
+    // Callers see the failure through request(); don't crash on an unawaited start()
+    this.ready.catch(() => {});
+
+    proc.stderr.on("data", (chunk) => process.stderr.write(chunk));
+    readline.createInterface({ input: proc.stdout }).on("line", (line) => this.handleLine(line));
+
+    const fail = (reason) => {
+      if (this.proc !== proc) return;
+      console.error(` Python worker stopped: ${reason}`);
+      this.proc = null;
+      this.onFailed(new Error(`Python worker stopped: ${reason}`));
+      for (const [id, call] of this.pending) {
+        clearTimeout(call.timer);
+        call.reject(new Error("Python worker exited"));
+        this.pending.delete(id);
+      }
+    };
+    proc.on("exit", (code, signal) => fail(signal || `exit code ${code}`));
+    proc.on("error", (err) => fail(err.message));
+
+    return this.ready;
+  }
+
+  handleLine(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (err) {
+      return console.error(" Worker sent invalid JSON:", line);
+    }
+
+    if (message.method === "ready") {
+      console.log(`🐍 Python worker ready (pid ${message.params.pid}, ${message.params.startup_s}s)`);
+      return this.onReady(message.params);
+    }
+    if (message.method === "partial") {
+      const call = this.pending.get(message.params.id);
+      if (call && call.onPartial) call.onPartial(message.params.result);
+      return;
+    }
+
+    const call = this.pending.get(message.id);
+    if (!call) return;
+    this.pending.delete(message.id);
+    clearTimeout(call.timer);
+    if (message.error) call.reject(new Error(message.error.message));
+    else call.resolve(message.result);
+  }
+
+  async request(method, params = {}, { timeout = this.timeout, onPartial } = {}) {
+    await this.start();
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Worker request '${method}' timed out after ${timeout} ms`));
+      }, timeout);
+      this.pending.set(id, { resolve, reject, onPartial, timer });
+      this.proc.stdin.write(JSON.stringify({ jsonrpc: "2.0", id, method, params }) + "\n");
+    });
+  }
+
+  predict(tickers, options = {}) {
+    return this.request("predict", { tickers, stream: Boolean(options.onPartial) }, options);
+  }
+
+  stop() {
+    if (this.proc) this.proc.stdin.end(JSON.stringify({ jsonrpc: "2.0", id: 0, method: "shutdown" }) + "\n");
+  }
+}
+
+module.exports = { PythonWorker };
@@ -0,0 +1,196 @@
+# ohlcv_store.py
+import os
+import json
+import time
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from typing import Callable, Optional
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+DEFAULT_STORE_DIR = os.environ.get(
+    "VANTAGE_OHLCV_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ohlcv_cache")
+)
+
+# provider(ticker, start, end, interval) -> DataFrame with OHLCV_COLUMNS
+Provider = Callable[[str, pd.Timestamp, pd.Timestamp, str], pd.DataFrame]
+
+
+class OHLCVStore:
+    """
+    On-disk columnar cache of OHLCV bars keyed by (ticker, interval).
+
+    Each series is stored as two NumPy files, an int64 nanosecond index and
+    a float64 (rows x 5) value block, which are opened memory-mapped and
+    sliced without copying. Reads only ask the provider for the bars that
+    are missing: the head before the earliest cached bar, and the tail from
+    the last cached bar onwards (the last bar is re-fetched because it may
+    have been partial).
+
+    Every save writes a new version directory and then switches the
+    series' CURRENT pointer file to it with one os.replace, so a concurrent
+    reader always sees an index, values and meta.json from the same save.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, min_refresh: float = 60.0):
+        self.root = os.path.abspath(root)
+        self.min_refresh = min_refresh
+        self._lock = threading.Lock()
+        self._series_locks = {}
+
+    def _series_lock(self, ticker: str, interval: str) -> threading.Lock:
+        with self._lock:
+            return self._series_locks.setdefault((ticker.upper(), interval), threading.Lock())
+
+    def _series_dir(self, ticker: str, interval: str) -> str:
+        return os.path.join(self.root, ticker.upper(), interval)
+
+    @staticmethod
+    def _current(path: str) -> str:
+        # The published version directory (or the series directory itself
+        # for series saved before versioning)
+        try:
+            with open(os.path.join(path, "CURRENT")) as f:
+                return os.path.join(path, f.read().strip())
+        except FileNotFoundError:
+            return path
+
+    def load(self, ticker: str, interval: str = '1d'):
+        """
+        Return (frame, meta) for a cached series, or (None, None). The frame's
+        values are a read-only memory map of the cache file.
+        """
+        path = self._current(self._series_dir(ticker, interval))
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None, None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            index = np.load(os.path.join(path, "index.npy"), mmap_mode='r')
+            values = np.load(os.path.join(path, "values.npy"), mmap_mode='r')
+            dates = pd.DatetimeIndex(np.asarray(index).view('datetime64[ns]')).tz_localize("UTC")
+            if meta.get("tz"):
+                dates = dates.tz_convert(meta["tz"])
+            else:
+                dates = dates.tz_localize(None)
+            return pd.DataFrame(values, index=dates, columns=OHLCV_COLUMNS, copy=False), meta
+        except Exception as e:
+            print(f"⚠️ Could not read cached data for {ticker}: {e}")
+            return None, None
+
+    def save(self, ticker: str, interval: str, df: pd.DataFrame, meta: dict):
+        path = self._series_dir(ticker, interval)
+        os.makedirs(path, exist_ok=True)
+
+        dates = pd.DatetimeIndex(df.index)
+        meta = dict(meta, tz=str(dates.tz) if dates.tz is not None else None, rows=len(df))
+        if dates.tz is None:
+            dates = dates.tz_localize("UTC")
+        index = dates.tz_convert("UTC").tz_localize(None).values.astype('datetime64[ns]').view(np.int64)
+
+        # Written under a .tmp name, renamed once complete, then published
+        version = f"v-{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+        tmp_dir = os.path.join(path, version + ".tmp")
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "index.npy"), index)
+        np.save(os.path.join(tmp_dir, "values.npy"), df[OHLCV_COLUMNS].to_numpy(dtype=np.float64))
+        self._write_meta(tmp_dir, meta)
+        os.rename(tmp_dir, os.path.join(path, version))
+
+        pointer = os.path.join(path, f"CURRENT.tmp-{os.getpid()}-{threading.get_ident()}")
+        with open(pointer, "w") as f:
+            f.write(version)
+        previous = self._current(path)
+        os.replace(pointer, os.path.join(path, "CURRENT"))
+        self._prune(path, keep={version, os.path.basename(previous)})
+
+    @staticmethod
+    def _prune(path: str, keep):
+        # Older versions go; the one just replaced stays for readers that
+        # resolved CURRENT before the switch, and in-progress saves are skipped
+        for name in os.listdir(path):
+            if name.startswith("v-") and ".tmp" not in name and name not in keep:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+            elif name in ("index.npy", "values.npy", "meta.json"):
+                os.remove(os.path.join(path, name))  # pre-versioning layout
+
+    @staticmethod
+    def _write_meta(path: str, meta: dict):
+        tmp_path = os.path.join(path, f"meta.json.tmp-{os.getpid()}-{threading.get_ident()}")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+    def read(self, ticker: str, start, end, provider: Provider, interval: str = '1d') -> pd.DataFrame:
+        """
+        Bars for [start, end), fetching only what the cache does not hold yet.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        with self._series_lock(ticker, interval):
+            cached, meta = self.load(ticker, interval)
+
+            if cached is None or cached.empty:
+                df = provider(ticker, start, end, interval)
+                if df is None or df.empty:
+                    return pd.DataFrame(columns=OHLCV_COLUMNS)
+                df = df[OHLCV_COLUMNS].sort_index()
+                self.save(ticker, interval, df, {
+                    "fetched_at": time.time(),
+                    "requested_from": start.isoformat()
+                })
+                return self._slice(df, start, end)
+
+            parts = [cached]
+            requested_from = pd.Timestamp(meta.get("requested_from", _naive(cached.index[0]).isoformat()))
+            if start < requested_from:
+                head = provider(ticker, start, _naive(cached.index[0]), interval)
+                if head is not None and not head.empty:
+                    parts.insert(0, head[OHLCV_COLUMNS])
+                requested_from = start
+
+            fetched_at = meta.get("fetched_at", 0)
+            if time.time() - fetched_at >= self.min_refresh:
+                tail = provider(ticker, _naive(cached.index[-1]), end, interval)
+                if tail is not None and not tail.empty:
+                    parts.append(tail[OHLCV_COLUMNS])
+                fetched_at = time.time()
+
+            new_meta = dict(meta, fetched_at=fetched_at, requested_from=requested_from.isoformat())
+            if len(parts) > 1:
+                merged = pd.concat(parts)
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                self.save(ticker, interval, merged, new_meta)
+                cached = merged
+            elif new_meta != meta:
+                self._write_meta(self._current(self._series_dir(ticker, interval)), new_meta)
+
+            return self._slice(cached, start, end)
+
+    @staticmethod
+    def _slice(df: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        # Rows are sorted, so [start, end) is one positional range and the
+        # result is a view (of the memory map for cached series)
+        index = pd.DatetimeIndex(df.index)
+        naive = index.tz_localize(None) if index.tz is not None else index
+        lo = naive.searchsorted(_naive(start), side='left')
+        hi = naive.searchsorted(_naive(end), side='left')
+        return df.iloc[lo:hi]
+
+
+def _naive(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+_default_store: Optional[OHLCVStore] = None
+
+
+def get_store() -> OHLCVStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = OHLCVStore()
+    return _default_store
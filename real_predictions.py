@@ -2,9 +2,13 @@
 import sys
 import os
 import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 sys.path.append(os.path.join(os.path.dirname(__file__), 'ml'))
 
-from ml.prediction.ensemble_model import SimpleEnsemble
+from ml.prediction.model_registry import get_registry
 from fetch_real_data import fetch_stock_data
 
 def predict_stock(ticker='AAPL', period='6mo'):
@@ -13,8 +17,7 @@ def predict_stock(ticker='AAPL', period='6mo'):
         if df is None or df.empty:
             return {"ticker": ticker, "error": "No data"}
 
-        model = SimpleEnsemble(seq_len=30)
-        model.train(df)
+        model = get_registry().get_or_train(ticker, df, seq_len=30)
         result = model.predict(df)
         current_price = float(df['close'].iloc[-1])
 
@@ -27,6 +30,7 @@ def predict_stock(ticker='AAPL', period='6mo'):
                 "lstm": float(result.lstm),
                 "prophet": float(result.prophet)
             },
+            "weights": result.weights,
             "change_percent": {
                 "ensemble": float((result.ensemble - current_price) / current_price * 100),
                 "xgboost": float((result.xgb - current_price) / current_price * 100),
@@ -39,18 +43,148 @@ def predict_stock(ticker='AAPL', period='6mo'):
     except Exception as e:
         return {"ticker": ticker, "error": str(e)}
 
+def _terminate(executor):
+    # shutdown() cannot stop a task that is already running, so the worker
+    # processes are killed first; the pool is unusable afterwards
+    processes = getattr(executor, "_processes", None) or {}
+    for process in list(processes.values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def predict_many(tickers, max_workers=None, timeout=None, predict_fn=predict_stock, **kwargs):
+    """
+    Run `predict_fn(ticker, **kwargs)` for many tickers on a process pool and
+    yield each result dict as soon as it finishes (completion order).
+
+    At most `max_workers` tickers are in flight and `timeout` (seconds) is
+    counted from when a ticker starts running. A ticker that times out,
+    raises or crashes its worker is reported as {"ticker": ..., "error": ...}
+    and the rest of the batch carries on. A timed-out ticker cannot be
+    interrupted inside its worker, so the pool is terminated and rebuilt and
+    the other in-flight tickers are started again on the new one.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return
+    max_workers = max_workers or min(len(tickers), os.cpu_count() or 1)
+
+    queue = iter(tickers)
+    restarts = deque()
+    suspects = deque()
+    in_flight = {}
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(ticker, isolated=False):
+        future = executor.submit(predict_fn, ticker, **kwargs)
+        # [ticker, started, isolated]; started is set once the future runs
+        in_flight[future] = [ticker, None, isolated]
+
+    def refill():
+        # After a worker crash the affected tickers are re-run one at a
+        # time, so the ticker that kills its worker is identified exactly.
+        if suspects:
+            if not in_flight:
+                submit(suspects.popleft(), isolated=True)
+            return
+        while len(in_flight) < max_workers:
+            ticker = restarts.popleft() if restarts else next(queue, None)
+            if ticker is None:
+                return
+            submit(ticker)
+
+    def rebuild():
+        nonlocal executor
+        _terminate(executor)
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    try:
+        refill()
+        while in_flight:
+            wait_for = None
+            if timeout:
+                now = time.monotonic()
+                for future, state in in_flight.items():
+                    if state[1] is None and (future.running() or future.done()):
+                        state[1] = now
+                started = [state[1] for state in in_flight.values() if state[1] is not None]
+                waiting = len(started) < len(in_flight)
+                wait_for = max(0.0, min(started) + timeout - now) if started else None
+                if waiting:
+                    # Poll until every in-flight ticker has started its clock
+                    wait_for = 0.05 if wait_for is None else min(wait_for, 0.05)
+            done, _ = wait(list(in_flight), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            broken = False
+            for future in done:
+                ticker, _, isolated = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    if isolated:
+                        yield {"ticker": ticker, "error": "Worker process crashed"}
+                    else:
+                        suspects.append(ticker)
+                except Exception as e:
+                    yield {"ticker": ticker, "error": str(e)}
+
+            if broken:
+                # A dead worker takes the whole pool down with it
+                suspects.extend(ticker for ticker, _, _ in in_flight.values())
+                in_flight.clear()
+                rebuild()
+
+            if timeout:
+                now = time.monotonic()
+                expired = [future for future, (_, started, _) in in_flight.items()
+                           if started is not None and now - started >= timeout and not future.done()]
+                if expired:
+                    for future in expired:
+                        ticker, _, _ = in_flight.pop(future)
+                        yield {"ticker": ticker, "error": f"Timed out after {timeout}s"}
+                    # The hung worker would otherwise hold its slot; the
+                    # bystanders lose their workers with it and start again
+                    for ticker, _, isolated in in_flight.values():
+                        (suspects if isolated else restarts).appendleft(ticker)
+                    in_flight.clear()
+                    rebuild()
+
+            refill()
+    finally:
+        _terminate(executor)
+
+
 if __name__ == "__main__":
+    out = sys.stdout
     try:
         args = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
         tickers = args.get("tickers", ["AAPL", "GOOGL", "MSFT"])
 
-        results = []
-        for ticker in tickers:
-            results.append(predict_stock(ticker))
+        if args.get("stream"):
+            # The NDJSON goes to a private copy of stdout; fd 1 itself now
+            # points at stderr, so training prints from this process and the
+            # pool's workers (which inherit it) can't interleave with it
+            out = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+            sys.stdout.flush()
+            os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+            # One JSON line per ticker as it completes, then a summary line
+            count = 0
+            for result in predict_many(tickers, max_workers=args.get("max_workers"), timeout=args.get("timeout")):
+                print(json.dumps(result), file=out, flush=True)
+                count += 1
+            print(json.dumps({"success": True, "done": True, "count": count}), file=out, flush=True)
+            sys.exit(0)
+
+        order = {ticker: i for i, ticker in enumerate(tickers)}
+        results = sorted(
+            predict_many(tickers, max_workers=args.get("max_workers"), timeout=args.get("timeout")),
+            key=lambda r: order.get(r["ticker"], len(order))
+        )
 
         # ✅ Only output one clean JSON line
         print(json.dumps({"success": True, "predictions": results}))
         sys.exit(0)
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
+        print(json.dumps({"success": False, "error": str(e)}), file=out, flush=True)
         sys.exit(1)
\ No newline at end of file
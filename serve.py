@@ -0,0 +1,94 @@
+# serve.py
+"""
+Production entry point for the ML API: a pre-fork gunicorn server.
+
+Models, including every fresh ensemble in the model store, are loaded
+once in the master process and the workers are forked from it afterwards,
+so every worker shares the same read-only weights through copy-on-write
+pages instead of loading its own copy. Each worker runs a few request
+threads; CPU-heavy endpoints go through ml_api's bounded pool, and
+sentiment requests through a bounded FinBERT batcher, and answer 503 when
+their queue is full.
+
+Usage:
+    python serve.py --workers 4 --threads 8 --bind 0.0.0.0:5000
+
+Environment:
+    VANTAGE_WORKERS, VANTAGE_THREADS, VANTAGE_BIND  defaults for the flags
+    VANTAGE_CPU_THREADS  concurrent CPU-heavy requests per worker (default 2)
+    VANTAGE_MAX_QUEUE    CPU-heavy requests allowed to wait per worker (default 8)
+    VANTAGE_SENTIMENT_QUEUE  texts allowed to wait for FinBERT per worker (default 512)
+"""
+
+import os
+
+# Keep BLAS/OpenMP from starting one thread per core in every worker;
+# parallelism comes from the worker processes instead. Must be set
+# before numpy/torch are imported.
+for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+import argparse
+import gc
+
+from gunicorn.app.base import BaseApplication
+
+
+def post_fork(server, worker):
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+class VantageServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        import ml_api
+
+        print("📦 Loading models before fork...")
+        for model in ml_api.MODELS:
+            model.get()
+            print(f"  {model.name}: {model.status()}")
+        registry = ml_api.registry_model.get()
+        if registry is not None:
+            print(f"  stored ensembles: {registry.preload()} loaded from {registry.root}")
+
+        # Move everything allocated so far out of the GC's reach so that
+        # collections in the workers don't touch (and copy) shared pages
+        gc.collect()
+        gc.freeze()
+        return ml_api.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork production server for the ML API")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("VANTAGE_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int,
+                        default=int(os.environ.get("VANTAGE_THREADS", "8")))
+    parser.add_argument("--bind", default=os.environ.get("VANTAGE_BIND", "0.0.0.0:5000"))
+    parser.add_argument("--timeout", type=int, default=120)
+    args = parser.parse_args()
+
+    VantageServer({
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "preload_app": True,
+        "timeout": args.timeout,
+        "post_fork": post_fork,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
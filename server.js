@@ -1,6 +1,6 @@
 const express = require("express");
 const axios = require('axios');
-const { PythonShell } = require('python-shell');
+const { PythonWorker } = require('./ml_worker');
 const cors = require("cors");
 const bodyParser = require("body-parser");
 const bcrypt = require("bcryptjs");
@@ -27,6 +27,10 @@ app.use(cookieParser());
 
 connectDB();
 
+// One warm Python process serves every ML request instead of a spawn per call
+const mlWorker = new PythonWorker({ pythonPath: "python" });
+mlWorker.start();
+
 // --- AUTHENTICATION MIDDLEWARE ---
 const authenticate = (req, res, next) => {
   const token = req.cookies.token;
@@ -197,37 +201,17 @@ app.post("/api/predictions-ml", authenticate, async (req, res) => {
 
     console.log(" Fetching live stock data for:", tickers);
 
-    let pyshell = new PythonShell('real_predictions.py', {
-      mode: 'text',
-      pythonPath: 'python',
-      scriptPath: './',
-      args: [JSON.stringify({ tickers })],
-    });
-
-    let output = "";
-
-    pyshell.on('message', (message) => {
-      output += message;
-    });
-
-    pyshell.end((err) => {
-      if (err) {
-        console.error(" Python error:", err);
-        return res.status(500).json({
-          success: false,
-          message: "Python script failed.",
-        });
-      }
-
-      try {
-        const parsed = JSON.parse(output);
-        console.log(" Python output received:", parsed);
-        res.json(parsed);
-      } catch (parseErr) {
-        console.error(" JSON parse error:", parseErr);
-        res.status(500).json({ success: false, error: "Invalid JSON output" });
-      }
-    });
+    try {
+      const result = await mlWorker.predict(tickers);
+      console.log(" Python output received:", result);
+      res.json(result);
+    } catch (workerErr) {
+      console.error(" Python error:", workerErr.message);
+      res.status(500).json({
+        success: false,
+        message: "Python script failed.",
+      });
+    }
   } catch (err) {
     console.error("ML API execution error:", err);
     res.status(500).json({ error: "Prediction failed - internal server error." });
@@ -348,29 +332,21 @@ app.post("/api/run-ml", authenticate, async (req, res) => {
     const tickers = portfolio ? portfolio.tickers : ["AAPL"];
     console.log("Running ML for tickers:", tickers);
 
-    let options = {
-      mode: "text",
-      pythonPath: "python",
-      scriptPath: "./",
-      args: [JSON.stringify({ tickers: tickers })],
-    };
-
-    PythonShell.run("real_predictions.py", options, function (err, results) {
-      if (err) {
-        console.error(" ML Execution Error:", err);
-        return res.status(500).json({
-          success: false,
-          error: "Python script failed",
-          logs: err.message || "Unknown Python error"
-        });
-      }
-
+    try {
+      const result = await mlWorker.predict(tickers);
       console.log("Python Output Received");
       res.json({
         success: true,
-        logs: results || [],
+        logs: [JSON.stringify(result)],
       });
-    });
+    } catch (workerErr) {
+      console.error(" ML Execution Error:", workerErr.message);
+      res.status(500).json({
+        success: false,
+        error: "Python script failed",
+        logs: workerErr.message || "Unknown Python error"
+      });
+    }
   } catch (err) {
     console.error("ML Playground error:", err);
     res.status(500).json({ success: false, error: "Internal Server Error running ML" });
@@ -105,6 +105,603 @@ try:
 except Exception as e:
     print(f"❌ Failed with stress testing: {e}")
 
+# Test 7: ML API startup time
+print("\n7. Testing ML API Startup Time...")
+try:
+    import subprocess
+    import time
+
+    IMPORT_BUDGET_SECONDS = 3.0
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "import ml_api; ml_api.app.test_client().get('/health/live')"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+        capture_output=True
+    )
+    elapsed = time.perf_counter() - start
+    if elapsed <= IMPORT_BUDGET_SECONDS:
+        print(f"✅ ml_api imported and served /health/live in {elapsed:.2f}s (budget {IMPORT_BUDGET_SECONDS:.1f}s)")
+    else:
+        print(f"❌ ml_api startup took {elapsed:.2f}s (budget {IMPORT_BUDGET_SECONDS:.1f}s)")
+
+except Exception as e:
+    print(f"❌ Failed measuring startup: {e}")
+
+# Test 8: Streaming responses
+print("\n8. Testing Streaming Responses...")
+try:
+    import json
+    import ml_api
+
+    client = ml_api.app.test_client()
+    tickers = ['AAPL', 'MSFT', 'TSLA']
+    client.post('/ml/predictions', json={'tickers': tickers})  # trains the models once
+
+    start = time.perf_counter()
+    whole = client.post('/ml/predictions', json={'tickers': tickers})
+    whole_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    streamed = client.post('/ml/predictions', json={'tickers': tickers, 'stream': 'ndjson'}, buffered=False)
+    first_time, lines = None, []
+    for chunk in streamed.response:
+        first_time = first_time or time.perf_counter() - start
+        lines.extend(json.loads(line) for line in chunk.decode().splitlines())
+    streamed.close()
+    stream_time = time.perf_counter() - start
+    if lines[-1].get('done') and lines[-1]['count'] == len(tickers):
+        print(f"✅ NDJSON predictions: first result after {first_time * 1e3:.0f} ms, all {len(tickers)}"
+              f" in {stream_time * 1e3:.0f} ms (single response: {whole_time * 1e3:.0f} ms)")
+    else:
+        print(f"❌ NDJSON stream ended without a complete 'done' record: {lines[-1]}")
+
+    raw = simple_stress_test(prices, weights, keep_returns=True)
+    binned = client.post('/ml/stress-testing', json={'weights': weights, 'bins': 50})
+    raw_size = len(json.dumps({'var_95': raw.var_95, 'portfolio_returns': raw.portfolio_returns}))
+    print(f"✅ Stress payload: {len(binned.data):,} bytes with a 50-bin histogram"
+          f" vs {raw_size:,} bytes with the raw 5,000 returns")
+
+except Exception as e:
+    print(f"❌ Failed testing streaming responses: {e}")
+
+# Test 9: Persistent worker
+print("\n9. Testing Persistent Worker...")
+try:
+    worker = subprocess.Popen(
+        [sys.executable, "worker.py"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    ready = json.loads(worker.stdout.readline())
+    start = time.perf_counter()
+    for i in range(20):
+        worker.stdin.write((json.dumps({'jsonrpc': '2.0', 'id': i, 'method': 'ping'}) + "\n").encode())
+    worker.stdin.write(b'{"jsonrpc": "2.0", "id": "bye", "method": "shutdown"}\n')
+    worker.stdin.flush()
+    replies = [json.loads(line) for line in worker.stdout]
+    round_trip = (time.perf_counter() - start) / 20
+    worker.wait(timeout=30)
+    if ready['method'] == 'ready' and len(replies) == 21 and all('result' in r for r in replies):
+        print(f"✅ Worker ready in {ready['params']['startup_s']:.2f}s, then {round_trip * 1e3:.2f} ms per request")
+    else:
+        print(f"❌ Unexpected worker replies: {replies}")
+
+except Exception as e:
+    print(f"❌ Failed testing persistent worker: {e}")
+
+# Test 10: OHLCV store
+print("\n10. Testing OHLCV Store...")
+try:
+    import tempfile
+    from ohlcv_store import OHLCVStore, OHLCV_COLUMNS
+
+    calls = []
+
+    def stub_provider(ticker, start, end, interval):
+        calls.append((start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        days = pd.date_range(start, end, freq='D', inclusive='left').normalize()
+        return pd.DataFrame({c: np.arange(len(days), dtype=float) for c in OHLCV_COLUMNS}, index=days)
+
+    store = OHLCVStore(tempfile.mkdtemp(), min_refresh=0)
+    store.read('TEST', '2024-03-01', '2024-04-01', stub_provider)
+    bars = store.read('TEST', '2024-02-01', '2024-04-10', stub_provider)
+    expected_calls = [('2024-03-01', '2024-04-01'), ('2024-02-01', '2024-03-01'), ('2024-03-31', '2024-04-10')]
+    if calls == expected_calls and len(bars) == 69 and bars.index.is_unique:
+        print(f"✅ Incremental reads fetched only the head and tail: {calls[1:]}")
+    else:
+        print(f"❌ Unexpected provider calls {calls} or {len(bars)} rows")
+
+    cached, _ = store.load('TEST')
+    window = store._slice(cached, pd.Timestamp('2024-02-10'), pd.Timestamp('2024-03-05'))
+    if len(window) == 24 and np.shares_memory(window.to_numpy(), cached.to_numpy()):
+        print("✅ Cached range read as a view of the memory map")
+    else:
+        print("❌ Cached range read copied the data")
+
+    # Second-resolution, timezone-aware bars must come back at the same instants
+    stamps = pd.DatetimeIndex(np.array(['2024-01-02T14:30', '2024-01-03T14:30'], dtype='datetime64[s]'))
+    hourly = pd.DataFrame(np.ones((2, 5)), index=stamps.tz_localize('America/New_York'), columns=OHLCV_COLUMNS)
+    store.save('TEST', '1h', hourly, {})
+    if store.load('TEST', '1h')[0].index.equals(hourly.index):
+        print("✅ Non-nanosecond timezone-aware index round-trips")
+    else:
+        print(f"❌ Index changed on round trip: {store.load('TEST', '1h')[0].index}")
+
+except Exception as e:
+    print(f"❌ Failed testing OHLCV store: {e}")
+
+# Test 11: Concurrent multi-ticker fetch
+print("\n11. Testing Multi-Ticker Fetch...")
+try:
+    from fetch_real_data import fetch_many
+    from ohlcv_store import OHLCV_COLUMNS
+
+    attempts = {}
+
+    def flaky_provider(ticker, start, end, interval):
+        attempts[ticker] = attempts.get(ticker, 0) + 1
+        if ticker == 'BAD' or (ticker == 'FLAKY' and attempts[ticker] < 3):
+            raise ConnectionError('boom')
+        days = pd.date_range(end=pd.Timestamp(end).normalize(), periods=180 if ticker == 'FLAKY' else 120, freq='D')
+        return pd.DataFrame({c: np.ones(len(days)) for c in OHLCV_COLUMNS}, index=days)
+
+    import io
+    import contextlib
+    with contextlib.redirect_stdout(io.StringIO()):  # the expected BAD failure is logged
+        panel = fetch_many(['FLAKY', 'SHORT', 'BAD'], provider=flaky_provider, retries=3, backoff=0, use_cache=False)
+    short_close = panel.frame[('SHORT', 'close')]
+    checks = {
+        'errors': panel.errors == {'BAD': 'boom'},
+        'retries': attempts == {'FLAKY': 3, 'SHORT': 1, 'BAD': 3},
+        'shape': panel.frame.shape == (180, 10),
+        'padding': short_close.isna().sum() == 60 and short_close.iloc[-120:].notna().all(),
+        'ticker': len(panel.ticker('SHORT')) == 120
+    }
+    if all(checks.values()):
+        print(f"✅ Panel {panel.frame.shape} with errors {panel.errors} after {attempts['FLAKY']} FLAKY attempts")
+    else:
+        print(f"❌ Multi-ticker fetch checks failed: {[name for name, ok in checks.items() if not ok]}")
+
+except Exception as e:
+    print(f"❌ Failed testing multi-ticker fetch: {e}")
+
+# Test 12: Micro-batcher
+print("\n12. Testing Micro-Batcher...")
+try:
+    from ml.nlp.micro_batcher import MicroBatcher
+
+    doubler = MicroBatcher(lambda items: [2 * x for x in items], max_batch_size=4, max_latency_ms=5)
+    doubled = [f.result(timeout=5) for f in doubler.submit_many(list(range(10)))]
+    doubler.close()
+
+    # A batch_fn that drops results must fail its callers, not leave them waiting
+    lossy = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_latency_ms=5)
+    outcomes = []
+    for future in lossy.submit_many([1, 2, 3]):
+        try:
+            outcomes.append(future.result(timeout=5))
+        except RuntimeError as e:
+            outcomes.append(type(e).__name__)
+    lossy.close()
+
+    # One caller's bad item must not fail the valid items merged into its batch
+    upper = MicroBatcher(lambda items: [t.upper() for t in items], max_batch_size=8, max_latency_ms=50)
+    valid, invalid = upper.submit('w1 w2 w3'), upper.submit(None)
+    isolated = valid.result(timeout=5) == 'W1 W2 W3' and isinstance(invalid.exception(timeout=5), AttributeError)
+    upper.close()
+
+    if doubled == [2 * x for x in range(10)] and outcomes == ['RuntimeError'] * 3 and isolated:
+        print("✅ Batched results in order; short results and bad items fail only their own futures")
+    else:
+        print(f"❌ Unexpected batcher results: {doubled}, {outcomes}, isolated={isolated}")
+
+except Exception as e:
+    print(f"❌ Failed testing micro-batcher: {e}")
+
+# Test 13: Streaming pipeline
+print("\n13. Testing Streaming Pipeline...")
+try:
+    import io
+    import contextlib
+    import numpy as np
+    import pandas as pd
+    import torch
+    from ml.prediction.ensemble_model import SimpleEnsemble
+    from ml.prediction.series_frame import OHLCV_COLUMNS
+    from ml.prediction.streaming import Bar, StreamingPipeline, TickerState
+
+    rng = np.random.default_rng(0)
+    close = 100 * np.cumprod(1 + rng.normal(0.0005, 0.015, 160))
+    df = pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                       'volume': rng.integers(1_000_000, 5_000_000, 160).astype(float)},
+                      index=pd.date_range("2024-01-01", periods=160, freq="D"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = SimpleEnsemble(seq_len=30, forecaster="fourier")
+        model.train(df.iloc[:120])
+
+    # Incremental features match the batch prep methods after every bar
+    state = TickerState(30, resync=7)
+    for i, (ts, row) in enumerate(zip(df.index, df[OHLCV_COLUMNS].to_numpy(dtype=np.float32))):
+        state.push(ts, row)
+        if i >= 30:
+            upto = df.iloc[:i + 1]
+            assert np.allclose(state.xgb_features(), model.prepare_xgb(upto, last_only=True), rtol=1e-5), i
+            assert torch.equal(state.lstm_window(), model.prepare_lstm(upto, last_only=True)), i
+
+    def bar(ts, row):
+        return Bar(ticker='AAPL', timestamp=ts, **{c: float(row[c]) for c in OHLCV_COLUMNS})
+
+    pipeline = StreamingPipeline({'AAPL': model})
+    overlap = pipeline.process(bar(df.index[119], df.iloc[119]))
+    contiguous = pipeline.process(bar(df.index[120], df.iloc[120]))
+    assert overlap is None and contiguous is not None and pipeline.skipped == 1
+    # A bar 30 days on must not be windowed together with the stale bars
+    gapped = pipeline.process(bar(df.index[150], df.iloc[150]))
+    assert gapped is None and pipeline.gaps == 1 and len(pipeline.states['AAPL'].bars) == 1
+    print("✅ Incremental features match prepare_xgb/prepare_lstm; overlap skipped, gap restarts buffers")
+
+except Exception as e:
+    print(f"❌ Failed testing streaming pipeline: {e!r}")
+
+# Test 14: Vectorized windowing
+print("\n14. Testing Vectorized Windowing...")
+try:
+    import numpy as np
+    import pandas as pd
+    import torch
+    from ml.prediction.ensemble_model import SimpleEnsemble
+    from ml.prediction.series_frame import OHLCV_COLUMNS, SeriesFrame
+
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.random((50, 5)) * 100 + 50, columns=OHLCV_COLUMNS,
+                      index=pd.date_range("2024-01-01", periods=50, freq="D"))
+    model = SimpleEnsemble(seq_len=10, forecaster="fourier")
+
+    # The per-window loops the prep methods replaced
+    loop_xgb = np.array([[df['close'].iloc[i - 10:i].mean(), df['volume'].iloc[i - 10:i].mean()]
+                         for i in range(10, len(df))])
+    values = df[OHLCV_COLUMNS].values
+    loop_lstm = torch.tensor(np.array([values[i - 10:i] for i in range(10, len(df))]), dtype=torch.float32)
+
+    for frame in (df, SeriesFrame.from_frame(df)):
+        assert np.allclose(model.prepare_xgb(frame), loop_xgb, rtol=1e-6)
+        assert torch.equal(model.prepare_lstm(frame), loop_lstm)
+        assert np.allclose(model.prepare_xgb(frame, last_only=True), loop_xgb[-1:], rtol=1e-6)
+        assert torch.equal(model.prepare_lstm(frame, last_only=True), loop_lstm[-1:])
+    assert model.prepare_xgb(df.iloc[:10]).shape == (0, 2) and model.prepare_lstm(df.iloc[:10]).numel() == 0
+    print(f"✅ prepare_xgb {loop_xgb.shape} and prepare_lstm {tuple(loop_lstm.shape)} match the loop versions")
+
+except Exception as e:
+    print(f"❌ Failed testing vectorized windowing: {e!r}")
+
+# Test 15: Sentiment cache
+print("\n15. Testing Sentiment Cache...")
+try:
+    import os
+    import tempfile
+    from ml.nlp.finBert import tiny_finbert
+    from ml.nlp.sentiment_cache import SentimentCache
+
+    db_path = os.path.join(tempfile.mkdtemp(), "sentiment.db")
+    texts = ["w1 w2 w3", "w4 w5", "w1 w2 w3", "w6 w7 w8 w9"]
+    cache = SentimentCache(db_path=db_path)
+    finbert = tiny_finbert(seed=0, cache=cache)
+
+    first = finbert.predict_batch(texts)
+    assert cache.stats()['misses'] == 3 and cache.stats()['hits'] == 0, cache.stats()
+    # Whitespace variants normalize to the cached keys
+    again = finbert.predict_batch(["w1  w2 w3", " w4 w5 ", "w6 w7 w8 w9"])
+    assert cache.stats()['hits'] == 3 and again == [first[0], first[1], first[3]], cache.stats()
+    assert first == tiny_finbert(seed=0).predict_batch(texts)
+
+    # Results are versioned by model and backend, so another backend misses
+    tiny_finbert(seed=0, backend="int8", cache=cache).predict_batch(texts)
+    assert cache.stats()['misses'] == 6, cache.stats()
+
+    # A new process-level cache on the same file starts warm
+    reopened = SentimentCache(db_path=db_path)
+    assert tiny_finbert(seed=0, cache=reopened).predict_batch(texts) == first
+    assert reopened.stats()['hits'] == 3 and reopened.stats()['misses'] == 0, reopened.stats()
+    cache.close()
+    reopened.close()
+    print("✅ Cache hits on normalized repeats, misses on a new backend, persists in SQLite")
+
+except Exception as e:
+    print(f"❌ Failed testing sentiment cache: {e!r}")
+
+# Test 16: Quantized / ONNX FinBERT backends
+print("\n16. Testing FinBERT Backends...")
+try:
+    import random
+    from ml.nlp.finBert import tiny_finbert
+    from ml.nlp.finbert_backends import check_parity
+
+    rng = random.Random(0)
+    texts = [" ".join(f"w{rng.randrange(1000)}" for _ in range(rng.randint(5, 60))) for _ in range(64)]
+    reference = tiny_finbert(seed=0)
+    # int8 rounds weights, ONNX Runtime should match fp32 to float precision
+    tolerances = {'int8': 0.02, 'onnx': 1e-4}
+    for backend, tolerance in tolerances.items():
+        try:
+            parity = check_parity(reference, tiny_finbert(seed=0, backend=backend), texts)
+        except ImportError as e:
+            print(f"⚠️ Skipping {backend} backend: {e}")
+            continue
+        assert parity['max_abs_diff'] < tolerance and parity['label_agreement'] >= 0.95, (backend, parity)
+        print(f"✅ {backend} backend within {tolerance} of fp32 "
+              f"(max |dp| {parity['max_abs_diff']:.2e}, {parity['label_agreement']:.0%} label agreement)")
+
+except Exception as e:
+    print(f"❌ Failed testing FinBERT backends: {e!r}")
+
+# Test 17: TreeSHAP
+print("\n17. Testing TreeSHAP...")
+try:
+    import io
+    import contextlib
+    import numpy as np
+    import pandas as pd
+    import xgboost as xgb
+    from ml.prediction.ensemble_model import SimpleEnsemble
+    from ml.explainable_ai.shap_explainer import SHAPExplainer
+
+    rng = np.random.default_rng(2)
+    close = 100 * np.cumprod(1 + rng.normal(0.0005, 0.015, 120))
+    df = pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                       'volume': rng.integers(1_000_000, 5_000_000, 120).astype(float)},
+                      index=pd.date_range("2024-01-01", periods=120, freq="D"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = SimpleEnsemble(seq_len=30, forecaster="fourier")
+        model.train(df)
+
+    explainer = SHAPExplainer(model, ['open', 'high', 'low', 'close', 'volume'])
+    features, _ = explainer.xgb_rows(df)
+    assert np.allclose(features, model.prepare_xgb(df))
+    shap_df = explainer.explain_xgb(df)
+    predictions = explainer.booster.predict(xgb.DMatrix(features))
+    # Exact TreeSHAP: each row's contributions plus the bias sum to its prediction
+    assert np.allclose(shap_df.sum(axis=1).values, predictions, atol=1e-3)
+    assert np.allclose(explainer.explain_xgb(df, rows=[0, -1]).values, shap_df.iloc[[0, -1]].values)
+
+    # Explainers are cached per model version; a retrain is a new version
+    from ml_api import ExplanationCache
+    cache = ExplanationCache(max_explainers=2)
+    version = ('TEST', 'fingerprint', 1.0)
+    assert cache.explainer(version, model) is cache.explainer(version, model)
+    assert cache.explainer(('TEST', 'fingerprint', 2.0), model) is not cache.explainer(version, model)
+    print(f"✅ TreeSHAP values for {len(shap_df)} windows sum to the XGBoost predictions; explainers cached per version")
+
+except Exception as e:
+    print(f"❌ Failed testing TreeSHAP: {e!r}")
+
+# Test 18: Integrated Gradients for the LSTM
+print("\n18. Testing LSTM Integrated Gradients...")
+try:
+    import numpy as np
+    import pandas as pd
+    import torch
+    from ml.prediction.ensemble_model import SimpleEnsemble
+    from ml.prediction.series_frame import OHLCV_COLUMNS
+    from ml.explainable_ai.gradient_attribution import LSTMGradientExplainer
+
+    torch.manual_seed(0)
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(rng.normal(size=(60, 5)), columns=OHLCV_COLUMNS,
+                      index=pd.date_range("2024-01-01", periods=60, freq="D"))
+    model = SimpleEnsemble(seq_len=10, forecaster="fourier")  # attributions need no training
+
+    explainer = LSTMGradientExplainer(model, steps=64, max_rows=20)
+    attributions = explainer.explain(df)
+    windows = model.prepare_lstm(df)[-20:]
+    with torch.no_grad():
+        model.lstm.eval()
+        gap = (model.lstm(windows) - model.lstm(model.prepare_lstm(df).mean(dim=0, keepdim=True))).numpy().ravel()
+    # Completeness: attributions sum to f(window) - f(baseline)
+    assert attributions.shape == (20, 50) and explainer.completeness_error < 1e-3
+    assert np.allclose(attributions.sum(axis=1).values, gap, atol=1e-3)
+    per_channel = explainer.explain(df, group="channel")
+    assert list(per_channel.columns) == OHLCV_COLUMNS
+    assert np.allclose(per_channel.sum(axis=1).values, attributions.sum(axis=1).values, atol=1e-5)
+    print(f"✅ Attributions for 20 windows sum to the prediction gap (error {explainer.completeness_error:.1e})")
+
+except Exception as e:
+    print(f"❌ Failed testing Integrated Gradients: {e!r}")
+
+# Test 19: Batched LIME
+print("\n19. Testing Batched LIME...")
+try:
+    import numpy as np
+    from ml.explainable_ai.lime_explainer import LimeExplainer
+
+    rng = np.random.default_rng(4)
+    X = rng.normal(size=(500, 4))
+    coefficients = np.array([5.0, -1.0, 0.5, 0.0])
+    calls = []
+
+    def linear_predict(rows):
+        calls.append(len(rows))
+        return rows @ coefficients
+
+    explainer = LimeExplainer(feature_names=['a', 'b', 'c', 'd'])
+    explainer.fit(X, random_state=0)
+    samples = X[:6]
+    serial = explainer.explain_many(linear_predict, samples, num_samples=500, seed=11, workers=1)
+    assert calls == [6 * 500], calls
+    parallel = explainer.explain_many(linear_predict, samples, num_samples=500, seed=11, workers=2)
+    assert parallel == serial
+    assert np.allclose([e['predicted_value'] for e in serial], samples @ coefficients)
+    # The dominant coefficient is the top feature of every explanation
+    assert all('a' in e['explanation'][0][0].split() for e in serial)
+    print(f"✅ {len(samples)} samples explained from one predict call; 1 and 2 workers agree for a fixed seed")
+
+except Exception as e:
+    print(f"❌ Failed testing batched LIME: {e!r}")
+
+# Test 20: Walk-forward backtest and hyperparameter search
+print("\n20. Testing Backtest and Search...")
+try:
+    import io
+    import os
+    import contextlib
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from ml.prediction.backtest import best_weights, combine, search, walk_forward
+
+    rng = np.random.default_rng(5)
+    close = 100 * np.cumprod(1 + rng.normal(0.0005, 0.015, 150))
+    df = pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                       'volume': rng.integers(1_000_000, 5_000_000, 150).astype(float)},
+                      index=pd.date_range("2024-01-01", periods=150, freq="B"))
+    params = {'seq_len': 10, 'n_estimators': 10, 'lstm_epochs': 2, 'forecaster': 'fourier'}
+    checkpoint = os.path.join(tempfile.mkdtemp(), "search.jsonl")
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = walk_forward(df, params, initial=100, step=25)
+        grid = {'n_estimators': [5, 10], 'seq_len': [10], 'lstm_epochs': [2], 'forecaster': ['fourier']}
+        results = search(df, grid, checkpoint=checkpoint, workers=1, initial=100, step=25)
+        resumed = search(df, grid, checkpoint=checkpoint, workers=1, initial=100, step=25)
+
+    predictions = result.predictions
+    # Every test bar is predicted once, one step ahead of its previous close
+    assert predictions.index.equals(df.index[100:]) and list(predictions['fold'].unique()) == [0, 1]
+    assert np.allclose(predictions['previous'].values, df['close'].values[99:-1])
+    weights = best_weights(predictions)
+    rmse = lambda w: np.sqrt(np.mean((combine(predictions, w) - predictions['actual'].values) ** 2))
+    assert rmse(weights) <= rmse((1, 1, 1)) + 1e-9
+    with open(checkpoint) as f:
+        assert len(f.readlines()) == 2  # the rerun trained nothing new
+    assert [r.params for r in resumed] == [r.params for r in results]
+    assert results[0].metrics['ensemble']['rmse'] <= results[1].metrics['ensemble']['rmse']
+    print(f"✅ {len(predictions)} out-of-sample bars over 2 folds; search ranked 2 configs and resumed from its checkpoint")
+
+except Exception as e:
+    print(f"❌ Failed testing backtest and search: {e!r}")
+
+# Test 21: Performance-weighted combiner
+print("\n21. Testing Inverse-Error Combiner...")
+try:
+    import json
+    from ml.prediction.combiner import InverseErrorCombiner
+
+    combiner = InverseErrorCombiner(min_observations=5, revisit_after=10)
+    assert combiner.weights() == {'xgb': 1 / 3, 'lstm': 1 / 3, 'prophet': 1 / 3}
+    # Constant errors of 1, 2 and 10: weights follow 1 / squared error
+    for _ in range(5):
+        combiner.observe({'xgb': 101.0, 'lstm': 102.0, 'prophet': 110.0}, 100.0)
+    weights = combiner.weights()
+    assert not combiner.is_active('prophet') and abs(weights['xgb'] - 0.8) < 1e-9 and abs(weights['lstm'] - 0.2) < 1e-9
+    value, used = combiner.combine({'xgb': 10.0, 'lstm': None, 'prophet': 20.0})
+    assert value == 10.0 and used == {'xgb': 1.0}
+
+    restored = InverseErrorCombiner.from_dict(json.loads(json.dumps(combiner.to_dict())))
+    assert restored.weights() == weights and restored.skipped == combiner.skipped
+    for _ in range(10):
+        combiner.observe({'xgb': 101.0, 'lstm': 102.0}, 100.0)
+    assert combiner.is_active('prophet') and combiner.counts['prophet'] == 0
+    print(f"✅ Weights {weights} from residuals; weak prophet skipped, state round-trips, revisited after 10 bars")
+
+except Exception as e:
+    print(f"❌ Failed testing combiner: {e!r}")
+
+# Test 22: Fourier trend/seasonality forecaster
+print("\n22. Testing Fourier Forecaster...")
+try:
+    import json
+    import numpy as np
+    import pandas as pd
+    from ml.prediction.forecasters import FourierTrendForecaster, make_forecaster
+
+    dates = pd.date_range("2023-01-01", periods=134, freq="D")
+    t = np.arange(len(dates))
+    weekly = np.sin(2 * np.pi * dates.dayofweek / 7)
+    frames = {name: pd.DataFrame({'ds': dates, 'y': 100 + slope * t + 2 * weekly})
+              for name, slope in (('UP', 0.3), ('DOWN', -0.2))}
+    train = {name: df.iloc[:120] for name, df in frames.items()}
+
+    model = FourierTrendForecaster().fit(train['UP'])
+    forecast = model.predict(frames['UP'].iloc[120:])['yhat'].values
+    # Trend plus weekly cycle is in the model family, so 14 days out stays close
+    assert np.abs(forecast - frames['UP']['y'].values[120:]).max() < 0.5
+    many = FourierTrendForecaster.fit_many(train)
+    assert np.allclose(many['UP'].predict(frames['UP'].iloc[120:])['yhat'].values, forecast)
+    restored = FourierTrendForecaster.from_dict(json.loads(json.dumps(many['DOWN'].to_dict())))
+    assert np.allclose(restored.predict(frames['DOWN'])['yhat'].values,
+                       many['DOWN'].predict(frames['DOWN'])['yhat'].values)
+    try:
+        make_forecaster("arima")
+        raise AssertionError("unknown forecaster accepted")
+    except ValueError:
+        pass
+    print(f"✅ 14-day forecast within {np.abs(forecast - frames['UP']['y'].values[120:]).max():.3f};"
+          " fit_many matches fit and state round-trips")
+
+except Exception as e:
+    print(f"❌ Failed testing Fourier forecaster: {e!r}")
+
+# Test 23: SeriesFrame round trip
+print("\n23. Testing SeriesFrame...")
+try:
+    import numpy as np
+    import pandas as pd
+    from ml.prediction.model_registry import data_fingerprint
+    from ml.prediction.series_frame import OHLCV_COLUMNS, SeriesFrame
+
+    rng = np.random.default_rng(6)
+    df = pd.DataFrame(rng.random((40, 5)) * 100 + 1, columns=OHLCV_COLUMNS,
+                      index=pd.date_range("2024-03-01", periods=40, freq="h", tz="America/New_York"))
+    series = SeriesFrame.from_frame(df)
+    back = series.to_frame()
+
+    assert series.values.dtype == np.float32 and series.values.flags['C_CONTIGUOUS']
+    assert back.index.equals(df.index.tz_convert("UTC").tz_localize(None))
+    assert np.allclose(back.values, df.values, rtol=1e-6) and list(back.columns) == OHLCV_COLUMNS
+    # Columns, row ranges and tensors are views of the one block
+    assert np.shares_memory(series['close'], series.values)
+    assert np.shares_memory(series.select(OHLCV_COLUMNS[1:4]), series.values)
+    assert np.shares_memory(series.rows(5, 10).values, series.values) and len(series.tail(3)) == 3
+    assert series.torch().data_ptr() == series.values.ctypes.data
+    assert np.allclose(series.returns(['close']), df[['close']].astype(np.float32).pct_change().dropna().values)
+    assert data_fingerprint(series) == data_fingerprint(back)
+    print(f"✅ {series.shape} float32 block ({series.nbytes} bytes) round-trips through DataFrame with views, not copies")
+
+except Exception as e:
+    print(f"❌ Failed testing SeriesFrame: {e!r}")
+
+# Test 24: Warm-start model updates
+print("\n24. Testing Warm-Start Updates...")
+try:
+    import io
+    import copy
+    import contextlib
+    import numpy as np
+    import pandas as pd
+    from ml.prediction.ensemble_model import SimpleEnsemble
+
+    rng = np.random.default_rng(7)
+    close = 100 * np.cumprod(1 + rng.normal(0.0005, 0.015, 130))
+    df = pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                       'volume': rng.integers(1_000_000, 5_000_000, 130).astype(float)},
+                      index=pd.date_range("2024-01-01", periods=130, freq="D"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = SimpleEnsemble(seq_len=30, n_estimators=20, forecaster="fourier")
+        model.train(df.iloc[:120])
+        lstm_before = copy.deepcopy(model.lstm.state_dict())
+        model.update(df.iloc[118:123], xgb_rounds=10)  # two overlapping bars are ignored
+        warm_rounds = model.xgb.get_booster().num_boosted_rounds()
+        model.update(df.iloc[123:126], xgb_rounds=15)  # 30 + 15 > 2 * 20: refit from scratch
+        refit_rounds = model.xgb.get_booster().num_boosted_rounds()
+        prediction = model.predict(model.history)
+
+    assert model.history.index.equals(df.index[:126])
+    assert warm_rounds == 30 and refit_rounds == 20, (warm_rounds, refit_rounds)
+    assert any(not np.array_equal(lstm_before[k], v) for k, v in model.lstm.state_dict().items())
+    assert np.isfinite(prediction.ensemble)
+    print(f"✅ Updates append new bars only; booster {warm_rounds} trees after a warm start, {refit_rounds} after the cap refit")
+
+except Exception as e:
+    print(f"❌ Failed testing warm-start updates: {e!r}")
+
 print("\n" + "=" * 50)
 print("🎯 Test Complete!")
 print("=" * 50)
\ No newline at end of file
@@ -0,0 +1,301 @@
+# worker.py - Persistent prediction worker for the Node backend
+"""
+Long-lived alternative to spawning real_predictions.py per call.
+
+Speaks line-delimited JSON-RPC 2.0 over stdin/stdout (default) or a Unix
+socket (--socket PATH). Each request line is
+
+    {"jsonrpc": "2.0", "id": 1, "method": "predict", "params": {"tickers": ["AAPL"]}}
+
+and is answered by one line with the same id, {"result": ...} or
+{"error": {"code", "message"}}. Requests run concurrently, so responses
+can arrive out of order. With params {"stream": true}, "predict" also
+sends a {"method": "partial", "params": {"id", "result"}} notification per
+ticker as it completes. Methods: predict, ping, stats, shutdown.
+
+Trained models stay in the registry's memory cache and OHLCV data in the
+local store between calls, so only the first call for a ticker pays for
+loading or training. In stdio mode anything else written to stdout (library
+logs, progress prints) is redirected to stderr to keep the protocol clean.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor, as_completed
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ml'))
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class RPCError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class Worker:
+    """
+    Method implementations plus the pools they run on. Requests are
+    dispatched on `request_pool`; per-ticker predictions share
+    `ticker_pool`, so at most `max_concurrency` tickers are computed at
+    once however many requests are in flight.
+    """
+
+    def __init__(self, max_concurrency=2, max_requests=32):
+        self.started = time.time()
+        self.request_pool = ThreadPoolExecutor(max_workers=max_requests, thread_name_prefix="rpc")
+        self.ticker_pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="predict")
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.counts = {'requests': 0, 'errors': 0, 'in_flight': 0}
+
+    def warm(self, tickers=()):
+        # Heavy imports (torch, xgboost, prophet) happen once, here
+        from real_predictions import predict_stock
+        for ticker in tickers:
+            predict_stock(ticker)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.counts[name] += delta
+
+    def call(self, method, params, notify):
+        handler = getattr(self, f"rpc_{method}", None)
+        if handler is None:
+            raise RPCError(METHOD_NOT_FOUND, f"Unknown method '{method}'")
+        return handler(params, notify)
+
+    def rpc_ping(self, params, notify):
+        return {'pong': True, 'pid': os.getpid()}
+
+    def rpc_stats(self, params, notify):
+        with self._lock:
+            counts = dict(self.counts)
+        return dict(counts, pid=os.getpid(), uptime_s=round(time.time() - self.started, 1))
+
+    def rpc_predict(self, params, notify):
+        from real_predictions import predict_stock
+        tickers = params.get('tickers', ['AAPL', 'GOOGL', 'MSFT'])
+        if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+            raise RPCError(INVALID_PARAMS, "tickers must be a list of strings")
+        tickers = list(dict.fromkeys(tickers))
+        period = params.get('period', '6mo')
+
+        futures = {self.ticker_pool.submit(predict_stock, ticker, period): ticker for ticker in tickers}
+        results = {}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                results[ticker] = future.result()
+            except Exception as e:
+                results[ticker] = {'ticker': ticker, 'error': str(e)}
+            if params.get('stream'):
+                notify(results[ticker])
+        return {'success': True, 'predictions': [results[t] for t in tickers]}
+
+
+class Session:
+    """
+    One client connection: reads request lines from `reader` and writes
+    each response to `writer` (binary streams) as soon as it is ready.
+    """
+
+    def __init__(self, worker, reader, writer):
+        self.worker = worker
+        self.reader = reader
+        self.writer = writer
+        self._write_lock = threading.Lock()
+        self._pending = set()
+
+    def send(self, message):
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        with self._write_lock:
+            self.writer.write(data)
+            self.writer.flush()
+
+    def error(self, request_id, code, message):
+        self.worker._count(errors=1)
+        self.send({'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}})
+
+    def _run(self, request_id, method, params):
+        notify = lambda result: self.send({'jsonrpc': '2.0', 'method': 'partial',
+                                           'params': {'id': request_id, 'result': result}})
+        try:
+            result = self.worker.call(method, params, notify)
+            self.send({'jsonrpc': '2.0', 'id': request_id, 'result': result})
+        except RPCError as e:
+            self.error(request_id, e.code, str(e))
+        except Exception as e:
+            self.error(request_id, SERVER_ERROR, str(e))
+        finally:
+            self.worker._count(in_flight=-1)
+
+    def serve(self):
+        for line in self.reader:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.error(None, PARSE_ERROR, "Invalid JSON")
+                continue
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                self.error(request.get('id') if isinstance(request, dict) else None,
+                           INVALID_REQUEST, "Expected an object with a 'method'")
+                continue
+
+            request_id, method = request.get('id'), request['method']
+            params = request.get('params') or {}
+            self.worker._count(requests=1, in_flight=1)
+            if method == 'shutdown':
+                self.worker._count(in_flight=-1)
+                self.worker.stopping.set()
+                self.send({'jsonrpc': '2.0', 'id': request_id, 'result': {'stopping': True}})
+                break
+            future = self.worker.request_pool.submit(self._run, request_id, method, params)
+            self._pending.add(future)
+            future.add_done_callback(self._pending.discard)
+
+        # Let requests already read finish before the connection goes away
+        for future in list(self._pending):
+            future.result()
+
+
+def serve_stdio(worker, warm=()):
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    session = Session(worker, sys.stdin.buffer, protocol)
+    start = time.perf_counter()
+    worker.warm(warm)
+    session.send({'jsonrpc': '2.0', 'method': 'ready',
+                  'params': {'pid': os.getpid(), 'startup_s': round(time.perf_counter() - start, 3)}})
+    session.serve()
+
+
+def serve_socket(worker, path, warm=()):
+    worker.warm(warm)
+    if os.path.exists(path):
+        os.remove(path)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            Session(worker, self.rfile, self.wfile).serve()
+            if worker.stopping.is_set():
+                threading.Thread(target=server.shutdown, daemon=True).start()
+
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        print(f"🚀 Prediction worker listening on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(path)
+
+
+def benchmark(calls=5, tickers=("AAPL", "MSFT")):
+    """
+    Per-call latency of spawning real_predictions.py against one
+    persistent worker, on synthetic bars preloaded into a temporary OHLCV
+    store (no network) with a temporary model store.
+    """
+    import subprocess
+    import tempfile
+    import numpy as np
+    import pandas as pd
+
+    root = tempfile.mkdtemp()
+    env = dict(os.environ, VANTAGE_OHLCV_DIR=os.path.join(root, "ohlcv"),
+               VANTAGE_MODEL_DIR=os.path.join(root, "models"))
+    os.environ.update(env)
+    from ohlcv_store import OHLCVStore
+
+    store = OHLCVStore(env["VANTAGE_OHLCV_DIR"], min_refresh=24 * 3600)
+    rng = np.random.default_rng(0)
+    dates = pd.date_range(end=pd.Timestamp.now().normalize(), periods=400, freq="D")
+    for ticker in tickers:
+        close = 100 * np.cumprod(1 + rng.normal(0.0005, 0.015, len(dates)))
+        df = pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                           'volume': rng.integers(1_000_000, 5_000_000, len(dates)).astype(float)}, index=dates)
+        store.save(ticker, '1d', df, {"fetched_at": time.time() + 24 * 3600,
+                                      "requested_from": dates[0].isoformat()})
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    args = json.dumps({"tickers": list(tickers)})
+    spawn_times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "real_predictions.py", args], cwd=here, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        spawn_times.append(time.perf_counter() - start)
+    result = json.loads(out.strip().splitlines()[-1])
+    assert result["success"] and all("error" not in p for p in result["predictions"]), result
+
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "worker.py"], cwd=here, env=env,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    ready = json.loads(proc.stdout.readline())
+    startup = time.perf_counter() - start
+
+    def rpc(requests):
+        for request in requests:
+            proc.stdin.write((json.dumps(request) + "\n").encode())
+        proc.stdin.flush()
+        responses = {}
+        while len(responses) < len(requests):
+            message = json.loads(proc.stdout.readline())
+            if "id" in message:
+                responses[message["id"]] = message
+        return responses
+
+    worker_times = []
+    for i in range(calls):
+        start = time.perf_counter()
+        response = rpc([{"jsonrpc": "2.0", "id": i, "method": "predict", "params": {"tickers": list(tickers)}}])[i]
+        worker_times.append(time.perf_counter() - start)
+        assert "result" in response, response
+
+    start = time.perf_counter()
+    rpc([{"jsonrpc": "2.0", "id": 100 + i, "method": "predict", "params": {"tickers": [t]}}
+         for i, t in enumerate(tickers * 4)])
+    concurrent = time.perf_counter() - start
+    stats = rpc([{"jsonrpc": "2.0", "id": "s", "method": "stats"}])["s"]["result"]
+    rpc([{"jsonrpc": "2.0", "id": "bye", "method": "shutdown"}])
+    proc.wait(timeout=30)
+
+    print(f"{len(tickers)} tickers per call, {calls} calls")
+    print(f"  spawn real_predictions.py : first {spawn_times[0]:6.2f}s, then median {np.median(spawn_times[1:]):6.2f}s per call")
+    print(f"  persistent worker         : startup {startup:6.2f}s (reported {ready['params']['startup_s']}s),"
+          f" first {worker_times[0]:6.3f}s, then median {np.median(worker_times[1:]) * 1e3:7.1f} ms per call")
+    print(f"  {len(tickers) * 4} concurrent single-ticker requests: {concurrent * 1e3:.1f} ms | stats {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent JSON-RPC prediction worker")
+    parser.add_argument("--socket", help="Serve on this Unix socket path instead of stdin/stdout")
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get("VANTAGE_WORKER_CONCURRENCY", "2")),
+                        help="Tickers computed at once")
+    parser.add_argument("--warm", default="", help="Comma-separated tickers to load before serving")
+    parser.add_argument("--benchmark", action="store_true", help="Compare against spawning real_predictions.py")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        sys.exit(0)
+
+    worker = Worker(max_concurrency=args.concurrency)
+    warm = [t for t in args.warm.split(",") if t]
+    if args.socket:
+        serve_socket(worker, args.socket, warm)
+    else:
+        serve_stdio(worker, warm)